@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase import metrics
+
+log = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ckanext-showcase'
+
+
+def _connect():
+    from ckan.lib.redis import connect_to_redis
+    return connect_to_redis()
+
+
+def _generation_key(namespace):
+    return '{0}:{1}:generation'.format(KEY_PREFIX, namespace)
+
+
+def get_or_set(namespace, key, func, ttl):
+    '''
+    Return the JSON serializable value cached in Redis for `key` in
+    `namespace`, calling `func` and caching its result on a miss.
+
+    Entries are shared by all the processes of the site and expire after
+    `ttl` seconds, or as soon as the namespace is invalidated. If Redis is
+    not available the value is computed on every call.
+    '''
+    if not ttl:
+        return func()
+
+    try:
+        redis_conn = _connect()
+        generation = redis_conn.get(_generation_key(namespace)) or b'0'
+        if isinstance(generation, bytes):
+            generation = generation.decode('utf-8')
+        cache_key = '{0}:{1}:{2}:{3}'.format(
+            KEY_PREFIX, namespace, generation, key)
+        cached = redis_conn.get(cache_key)
+    except Exception as e:
+        log.warning('Showcase cache unavailable: %r', e)
+        return func()
+
+    if cached is not None:
+        metrics.inc('showcase_cache_requests_total',
+                    {'cache': namespace, 'result': 'hit'})
+        return json.loads(cached)
+
+    metrics.inc('showcase_cache_requests_total',
+                {'cache': namespace, 'result': 'miss'})
+    value = func()
+    try:
+        redis_conn.setex(cache_key, ttl, json.dumps(value))
+    except Exception as e:
+        log.warning('Could not store %s in the showcase cache: %r',
+                    cache_key, e)
+    return value
+
+
+def invalidate(namespace):
+    '''
+    Invalidate all the cached values of `namespace`.
+
+    Rather than deleting keys, the namespace generation is bumped so stale
+    entries are never read again and simply expire.
+    '''
+    try:
+        _connect().incr(_generation_key(namespace))
+    except Exception as e:
+        log.warning('Could not invalidate the showcase cache %s: %r',
+                    namespace, e)
+
+
+def get_ttl(option, default):
+    return tk.asint(tk.config.get(option, default))
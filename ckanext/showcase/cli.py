@@ -2,8 +2,6 @@
 
 import click
 
-from ckanext.showcase import utils
-
 # Click commands for CKAN 2.9 and above
 
 
@@ -19,8 +17,169 @@ def markdown_to_html():
     '''
         showcase markdown-to-html
     '''
+    from ckanext.showcase import utils
     utils.markdown_to_html()
 
 
+@showcase.command()
+@click.option('--showcases', default=100, show_default=True,
+              help='Number of showcases to create.')
+@click.option('--datasets', default=500, show_default=True,
+              help='Number of datasets to create.')
+@click.option('--associations', default=10, show_default=True,
+              help='Number of datasets added to each showcase.')
+@click.option('--prefix', default='loadtest', show_default=True,
+              help='Prefix of the names of the created objects.')
+def seed(showcases, datasets, associations, prefix):
+    '''
+        showcase seed - create showcases and datasets to load test
+    '''
+    if datasets < 1:
+        raise click.BadParameter('At least one dataset is needed.',
+                                 param_hint='--datasets')
+    from ckanext.showcase import utils
+    result = utils.seed_load_test_data(
+        showcases, datasets, associations, prefix)
+    click.secho(
+        'Seeded {0} showcases and {1} datasets in organization {2}'.format(
+            len(result['showcases']), len(result['datasets']),
+            result['organization']['name']), fg='green')
+
+
+@showcase.command()
+@click.option('--fix', is_flag=True,
+              help='Delete or repair the invalid associations.')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of associations fixed per transaction.')
+@click.option('--limit', default=10, show_default=True,
+              help='Number of examples listed per problem.')
+def check(fix, batch_size, limit):
+    '''
+        showcase check - find (and fix) invalid showcase associations
+    '''
+    from ckanext.showcase import consistency
+
+    problems = consistency.find_problems(limit=limit)
+    total = sum(problem['count'] for problem in problems.values())
+    for name, problem in problems.items():
+        click.echo('{0}: {1}'.format(problem['description'],
+                                     problem['count']))
+        for row in problem['rows']:
+            click.echo('  ' + ' '.join(
+                '{0}={1}'.format(k, v) for k, v in sorted(row.items())))
+
+    if not total:
+        click.secho('No problems found', fg='green')
+        return
+    if not fix:
+        click.secho('Run with --fix to repair them', fg='yellow')
+        raise click.exceptions.Exit(1)
+
+    fixed = consistency.fix_problems(batch_size=batch_size)
+    click.secho('Fixed {0} associations'.format(sum(fixed.values())),
+                fg='green')
+
+
+@showcase.command()
+@click.option('--showcases', 'all_showcases', is_flag=True,
+              help='Reindex all the showcases.')
+@click.option('--datasets-of', multiple=True, metavar='SHOWCASE',
+              help='Reindex the datasets of this showcase (repeatable).')
+@click.option('--since', type=click.DateTime(),
+              help='Reindex the showcases, and their datasets, modified '
+                   'since this date (UTC).')
+@click.option('--batch-size', default=100, show_default=True,
+              help='Number of datasets indexed per batch.')
+@click.option('--workers', default=1, show_default=True,
+              help='Number of batches indexed in parallel.')
+def reindex(all_showcases, datasets_of, since, batch_size, workers):
+    '''
+        showcase reindex - reindex showcases and their datasets in Solr
+    '''
+    from ckanext.showcase import indexing
+
+    if sum([all_showcases, bool(datasets_of), bool(since)]) != 1:
+        raise click.UsageError(
+            'Use one of --showcases, --datasets-of or --since')
+
+    if all_showcases:
+        package_ids = indexing.showcase_ids()
+    elif datasets_of:
+        try:
+            package_ids = indexing.dataset_ids_for_showcases(datasets_of)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--datasets-of')
+    else:
+        package_ids = indexing.ids_modified_since(since)
+
+    total = len(package_ids)
+    click.echo('Reindexing {0} datasets and showcases'.format(total))
+
+    def progress(done):
+        click.echo('{0}/{1}'.format(done, total))
+
+    indexed, failed = indexing.reindex(package_ids, batch_size=batch_size,
+                                       workers=workers, progress=progress)
+    click.secho('Reindexed {0} datasets and showcases'.format(indexed),
+                fg='green')
+    if failed:
+        click.secho('Could not index {0} of them: {1}'.format(
+            len(failed), ', '.join(failed)), fg='red')
+        raise click.exceptions.Exit(1)
+
+
+@showcase.command()
+@click.option('--max', 'max_related', type=int,
+              help='Number of related showcases kept for each showcase '
+                   '(default: ckanext.showcase.related.max, or 20).')
+def build_related(max_related):
+    '''
+        showcase build-related - compute the related showcases of every
+        showcase
+    '''
+    from ckanext.showcase import related
+
+    count = related.build(max_related=max_related)
+    click.secho('Stored {0} related showcases'.format(count), fg='green')
+
+
+@showcase.command()
+def update_popular():
+    '''
+        showcase update-popular - rank the most viewed showcases
+    '''
+    from ckanext.showcase import popularity
+
+    showcases = popularity.update()
+    click.secho('Ranked {0} popular showcases'.format(len(showcases)),
+                fg='green')
+
+
+@showcase.command()
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--format', 'format_', default='csv', show_default=True,
+              type=click.Choice(['csv', 'parquet']),
+              help='Format of the files, Parquet needs pyarrow.')
+@click.option('--batch-size', default=10000, show_default=True,
+              help='Number of rows read from the database at a time.')
+def export_graph(directory, format_, batch_size):
+    '''
+        showcase export-graph DIRECTORY - export the showcase, dataset and
+        organization graph as an edge list and node tables
+    '''
+    from ckanext.showcase import export
+
+    def progress(name, count):
+        click.echo('{0}: {1} rows'.format(name, count))
+
+    try:
+        export.export_graph(directory, format=format_,
+                            batch_size=batch_size, progress=progress)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--format')
+    click.secho('Exported the showcase graph to {0}'.format(directory),
+                fg='green')
+
+
 def get_commands():
     return [showcase]
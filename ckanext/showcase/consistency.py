@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import OrderedDict
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import aliased
+
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase import cache
+from ckanext.showcase.model import (ShowcasePackageAssociation,
+                                    ShowcaseAssociationEvent)
+from ckanext.showcase.utils import DATASET_TYPE_NAME
+
+log = logging.getLogger(__name__)
+
+
+def _associations(*columns):
+    return model.Session.query(ShowcasePackageAssociation.package_id,
+                               ShowcasePackageAssociation.showcase_id,
+                               ShowcasePackageAssociation.organization_id,
+                               *columns)
+
+
+def _deleted_showcase():
+    showcase = aliased(model.Package)
+    return _associations() \
+        .join(showcase, showcase.id == ShowcasePackageAssociation.showcase_id) \
+        .filter(showcase.state == 'deleted')
+
+
+def _deleted_package():
+    package = aliased(model.Package)
+    return _associations() \
+        .join(package, package.id == ShowcasePackageAssociation.package_id) \
+        .filter(package.state == 'deleted')
+
+
+def _not_a_showcase():
+    showcase = aliased(model.Package)
+    return _associations() \
+        .join(showcase, showcase.id == ShowcasePackageAssociation.showcase_id) \
+        .filter(showcase.type != DATASET_TYPE_NAME)
+
+
+def _organization_mismatch():
+    package = aliased(model.Package)
+    return _associations(package.owner_org) \
+        .join(package, package.id == ShowcasePackageAssociation.package_id) \
+        .filter(ShowcasePackageAssociation.organization_id.is_distinct_from(
+            package.owner_org))
+
+
+# name: (description, query, fix). Checks are fixed in this order, so rows
+# deleted by one check are not updated by a later one.
+CHECKS = OrderedDict([
+    ('deleted_showcase', (
+        'Associations with a deleted showcase', _deleted_showcase, 'delete')),
+    ('deleted_package', (
+        'Associations with a deleted dataset', _deleted_package, 'delete')),
+    ('not_a_showcase', (
+        'Associations whose showcase_id is not a showcase', _not_a_showcase,
+        'delete')),
+    ('organization_mismatch', (
+        "Associations whose organization_id is not the dataset's owner_org",
+        _organization_mismatch, 'update')),
+])
+
+
+def _checks():
+    '''
+    The checks to run. When soft deleting showcases, their associations are
+    kept on purpose, so they are not reported.
+    '''
+    soft_delete = tk.asbool(
+        tk.config.get('ckanext.showcase.soft_delete', False))
+    return OrderedDict(
+        (name, check) for name, check in CHECKS.items()
+        if not (soft_delete and name == 'deleted_showcase'))
+
+
+def find_problems(limit=10):
+    '''
+    Run every check and return an OrderedDict of check name to a dict with
+    its ``description``, the ``count`` of offending associations and up to
+    `limit` of them as dicts under ``rows``.
+
+    An association can be reported by more than one check.
+    '''
+    problems = OrderedDict()
+    for name, (description, query, fix) in _checks().items():
+        count = query().count()
+        rows = query().limit(limit).all() if count and limit else []
+        problems[name] = {
+            'description': description,
+            'count': count,
+            'rows': [row._asdict() for row in rows],
+        }
+    return problems
+
+
+def _delete_batch(rows):
+    ShowcaseAssociationEvent.record('delete', [row._asdict() for row in rows])
+    keys = [(row.package_id, row.showcase_id) for row in rows]
+    return model.Session.query(ShowcasePackageAssociation) \
+        .filter(tuple_(ShowcasePackageAssociation.package_id,
+                       ShowcasePackageAssociation.showcase_id).in_(keys)) \
+        .delete(synchronize_session=False)
+
+
+def _update_batch(rows):
+    # One UPDATE per owner organization in the batch
+    by_owner_org = {}
+    for row in rows:
+        by_owner_org.setdefault(row.owner_org, []).append(
+            (row.package_id, row.showcase_id))
+
+    updated = 0
+    for owner_org, keys in by_owner_org.items():
+        updated += model.Session.query(ShowcasePackageAssociation) \
+            .filter(tuple_(ShowcasePackageAssociation.package_id,
+                           ShowcasePackageAssociation.showcase_id).in_(keys)) \
+            .update({'organization_id': owner_org},
+                    synchronize_session=False)
+    return updated
+
+
+def fix_problems(batch_size=1000, reindex=True):
+    '''
+    Delete the associations of deleted datasets or showcases, and of
+    showcase ids that are not showcases, and set organization_id to the
+    dataset's owner_org where they differ.
+
+    Rows are fixed `batch_size` at a time, committing after each batch. The
+    affected datasets and showcases are then reindexed, with a single
+    commit. Returns an OrderedDict of check name to number of rows fixed.
+    '''
+    fixed = OrderedDict()
+    package_ids = set()
+    for name, (description, query, fix) in _checks().items():
+        fixed[name] = 0
+        while True:
+            rows = query().limit(batch_size).all()
+            if not rows:
+                break
+            if fix == 'delete':
+                count = _delete_batch(rows)
+            else:
+                count = _update_batch(rows)
+            model.repo.commit()
+
+            for row in rows:
+                package_ids.update([row.package_id, row.showcase_id])
+            fixed[name] += count
+            log.info('%s: fixed %d associations', name, fixed[name])
+            if not count:
+                # Nothing could be changed, avoid looping forever
+                break
+
+    if package_ids:
+        cache.invalidate('autocomplete')
+        if reindex:
+            from ckan.lib import search
+            search.rebuild(package_ids=list(package_ids), defer_commit=True)
+            search.commit()
+    return fixed
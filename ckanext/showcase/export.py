@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import logging
+import os
+from collections import OrderedDict
+
+from sqlalchemy import and_, exists
+from sqlalchemy.orm import aliased
+
+import ckan.model as model
+
+from ckanext.showcase.model import ShowcasePackageAssociation
+from ckanext.showcase.utils import DATASET_TYPE_NAME
+
+log = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'parquet')
+
+
+def _edges():
+    '''One row per association of an active dataset with an active
+    showcase.'''
+    showcase = aliased(model.Package)
+    dataset = aliased(model.Package)
+    return model.Session.query(
+        showcase.id.label('showcase_id'),
+        dataset.id.label('dataset_id'),
+        dataset.owner_org.label('organization_id')) \
+        .select_from(ShowcasePackageAssociation) \
+        .join(showcase, showcase.id == ShowcasePackageAssociation.showcase_id) \
+        .join(dataset, dataset.id == ShowcasePackageAssociation.package_id) \
+        .filter(showcase.type == DATASET_TYPE_NAME) \
+        .filter(showcase.state == 'active') \
+        .filter(dataset.state == 'active')
+
+
+def _in_a_showcase():
+    '''Whether the dataset is in at least one active showcase.'''
+    showcase = aliased(model.Package)
+    return exists().where(and_(
+        ShowcasePackageAssociation.package_id == model.Package.id,
+        showcase.id == ShowcasePackageAssociation.showcase_id,
+        showcase.type == DATASET_TYPE_NAME,
+        showcase.state == 'active'))
+
+
+def _showcases():
+    return model.Session.query(
+        model.Package.id, model.Package.name, model.Package.title) \
+        .filter(model.Package.type == DATASET_TYPE_NAME) \
+        .filter(model.Package.state == 'active')
+
+
+def _datasets():
+    '''The active datasets in at least one active showcase.'''
+    return model.Session.query(
+        model.Package.id, model.Package.name, model.Package.title,
+        model.Package.owner_org.label('organization_id'),
+        model.Package.private) \
+        .filter(model.Package.type != DATASET_TYPE_NAME) \
+        .filter(model.Package.state == 'active') \
+        .filter(_in_a_showcase())
+
+
+def _organizations():
+    '''The organizations of the datasets in at least one active
+    showcase.'''
+    owner_orgs = model.Session.query(model.Package.owner_org) \
+        .filter(model.Package.type != DATASET_TYPE_NAME) \
+        .filter(model.Package.state == 'active') \
+        .filter(_in_a_showcase())
+    return model.Session.query(
+        model.Group.id, model.Group.name, model.Group.title) \
+        .filter(model.Group.is_organization.is_(True)) \
+        .filter(model.Group.id.in_(owner_orgs))
+
+
+# file name: query. The edge list links showcases to datasets, and datasets
+# to organizations; the other files are the node tables.
+TABLES = OrderedDict([
+    ('edges', _edges),
+    ('showcases', _showcases),
+    ('datasets', _datasets),
+    ('organizations', _organizations),
+])
+
+
+def _stream(query, batch_size):
+    '''
+    Yield lists of up to `batch_size` rows of `query`, read through a server
+    side cursor, so only one batch is held in memory at a time.
+    '''
+    rows = query.execution_options(stream_results=True) \
+        .yield_per(batch_size)
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_csv(path, columns, batches):
+    count = 0
+    with io.open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+
+def _write_parquet(path, columns, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.bool_() if column == 'private' else pa.string())
+        for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pydict(OrderedDict(
+                (column, [row[i] for row in batch])
+                for i, column in enumerate(columns)), schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_graph(directory, format='csv', batch_size=10000, progress=None):
+    '''
+    Write the graph of showcases, datasets and organizations to
+    `directory`: an edge list (``edges``) with the showcase, dataset and
+    organization ids of each association, and the ``showcases``,
+    ``datasets`` and ``organizations`` node tables, as CSV or Parquet
+    files.
+
+    Rows are streamed `batch_size` at a time, so memory use doesn't depend
+    on the size of the graph. Parquet needs pyarrow. `progress` is called
+    with the name of each file and its number of rows once written.
+    Returns an OrderedDict of file name to number of rows.
+    '''
+    if format not in FORMATS:
+        raise ValueError('Unknown format: {0}'.format(format))
+    if format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError('pyarrow is needed to export to Parquet')
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    write = _write_csv if format == 'csv' else _write_parquet
+    counts = OrderedDict()
+    for name, query in TABLES.items():
+        query = query()
+        columns = [c['name'] for c in query.column_descriptions]
+        path = os.path.join(directory, '{0}.{1}'.format(name, format))
+        counts[name] = write(path, columns, _stream(query, batch_size))
+        log.info('Exported %d rows to %s', counts[name], path)
+        if progress:
+            progress(name, counts[name])
+    return counts
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase.model import (ShowcasePackageAssociation,
+                                    ShowcaseAssociationEvent)
+from ckanext.showcase.utils import DATASET_TYPE_NAME
+
+log = logging.getLogger(__name__)
+
+
+def showcase_ids():
+    '''Ids of all the active showcases.'''
+    query = model.Session.query(model.Package.id) \
+        .filter(model.Package.type == DATASET_TYPE_NAME) \
+        .filter(model.Package.state == 'active')
+    return [id for (id,) in query]
+
+
+def dataset_ids_for_showcases(showcases):
+    '''
+    Ids of the datasets in the showcases with the given ids or names.
+
+    Raises ValueError if a showcase doesn't exist.
+    '''
+    ids = []
+    for id_or_name in showcases:
+        showcase = model.Package.get(id_or_name)
+        if showcase is None or showcase.type != DATASET_TYPE_NAME:
+            raise ValueError('Showcase not found: {0}'.format(id_or_name))
+        ids.append(showcase.id)
+
+    query = model.Session.query(ShowcasePackageAssociation.package_id) \
+        .filter(ShowcasePackageAssociation.showcase_id.in_(ids)) \
+        .distinct()
+    return [id for (id,) in query]
+
+
+def ids_modified_since(since):
+    '''
+    Ids of the showcases modified since the `since` datetime, and of both
+    the showcase and the dataset of every association created since then,
+    deleted since then (as recorded in the association events) or where
+    either of them was modified since then.
+    '''
+    showcase = aliased(model.Package)
+    package = aliased(model.Package)
+
+    showcases = model.Session.query(model.Package.id) \
+        .filter(model.Package.type == DATASET_TYPE_NAME) \
+        .filter(model.Package.metadata_modified >= since)
+    associations = model.Session.query(
+        ShowcasePackageAssociation.showcase_id,
+        ShowcasePackageAssociation.package_id) \
+        .join(showcase, showcase.id == ShowcasePackageAssociation.showcase_id) \
+        .join(package, package.id == ShowcasePackageAssociation.package_id) \
+        .filter(or_(showcase.metadata_modified >= since,
+                    package.metadata_modified >= since,
+                    ShowcasePackageAssociation.created >= since))
+    events = model.Session.query(
+        ShowcaseAssociationEvent.showcase_id,
+        ShowcaseAssociationEvent.package_id) \
+        .filter(ShowcaseAssociationEvent.timestamp >= since) \
+        .distinct()
+
+    ids = set(id for (id,) in showcases)
+    for showcase_id, package_id in associations:
+        ids.update([showcase_id, package_id])
+
+    # Events outlive purged datasets and showcases, skip those
+    event_ids = set()
+    for showcase_id, package_id in events:
+        event_ids.update([showcase_id, package_id])
+    event_ids -= ids
+    if event_ids:
+        ids.update(id for (id,) in model.Session.query(model.Package.id)
+                   .filter(model.Package.id.in_(event_ids)))
+    return sorted(ids)
+
+
+def _batches(ids, batch_size):
+    for i in range(0, len(ids), batch_size):
+        yield ids[i:i + batch_size]
+
+
+def _index_batch(package_ids):
+    '''
+    Index `package_ids` without committing, and return the ids that could
+    not be indexed. If the batch fails, its ids are indexed one at a time
+    to find the failing ones.
+    '''
+    from ckan.lib import search
+
+    try:
+        search.rebuild(package_ids=package_ids, defer_commit=True)
+        return []
+    except (search.SearchIndexError, tk.ObjectNotFound) as e:
+        if len(package_ids) == 1:
+            log.error('Error indexing %s: %r', package_ids[0], e)
+            return list(package_ids)
+
+    failed = []
+    for package_id in package_ids:
+        failed.extend(_index_batch([package_id]))
+    return failed
+
+
+def _index_batch_in_thread(app, package_ids):
+    try:
+        if app is None:
+            return _index_batch(package_ids)
+        with app.test_request_context():
+            return _index_batch(package_ids)
+    finally:
+        model.Session.remove()
+
+
+def reindex(package_ids, batch_size=100, workers=1, progress=None):
+    '''
+    Reindex the given datasets and showcases, `batch_size` at a time and
+    with `workers` batches in parallel, committing to Solr once at the end.
+
+    Errors indexing a dataset are logged and don't stop the rest.
+    `progress` is called with the number of packages processed so far after
+    each batch. Returns the number of packages indexed and the list of ids
+    that could not be indexed.
+    '''
+    from ckan.lib import search
+
+    package_ids = list(package_ids)
+    batches = _batches(package_ids, batch_size)
+    done = 0
+    failed = []
+
+    if workers <= 1:
+        results = map(_index_batch, batches)
+    else:
+        try:
+            import flask
+            app = flask.current_app._get_current_object()
+        except RuntimeError:
+            # Not in an application context
+            app = None
+        executor = ThreadPoolExecutor(max_workers=workers)
+        results = executor.map(
+            lambda batch: _index_batch_in_thread(app, batch), batches)
+
+    for batch, batch_failed in zip(_batches(package_ids, batch_size),
+                                   results):
+        done += len(batch)
+        failed.extend(batch_failed)
+        if progress:
+            progress(done)
+    if workers > 1:
+        executor.shutdown()
+
+    search.commit()
+    log.info('Reindexed %d packages, %d failed', done - len(failed),
+             len(failed))
+    return done - len(failed), failed
+
+
+def remove_from_index(package_ids, batch_size=500):
+    '''
+    Remove the Solr documents of the given packages, with one delete by
+    query per `batch_size` ids, and commit once.
+    '''
+    from ckan.lib import search
+    from ckan.lib.search.common import make_connection
+
+    package_ids = list(package_ids)
+    if not package_ids:
+        return
+
+    conn = make_connection()
+    for batch in _batches(package_ids, batch_size):
+        query = '+entity_type:package +site_id:"{0}" +id:({1})'.format(
+            tk.config.get('ckan.site_id'),
+            ' OR '.join('"{0}"'.format(id) for id in batch))
+        conn.delete(q=query, commit=False)
+    search.commit()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import logging
+import threading
+import time
+
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase import metrics
+
+log = logging.getLogger(__name__)
+
+_local = threading.local()
+_sql_listener_registered = False
+
+
+def is_enabled():
+    return tk.asbool(
+        tk.config.get('ckanext.showcase.instrumentation', False))
+
+
+def _counters():
+    if not hasattr(_local, 'sql'):
+        _local.sql = 0
+        _local.package_search = 0
+    return _local
+
+
+def _count_statement(conn, cursor, statement, *args):
+    _counters().sql += 1
+
+
+def count_package_search():
+    '''Called by the plugin on every package_search.'''
+    _counters().package_search += 1
+
+
+def _register_sql_listener():
+    global _sql_listener_registered
+    if _sql_listener_registered:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    event.listen(Engine, 'before_cursor_execute', _count_statement)
+    _sql_listener_registered = True
+
+
+def _request_timings():
+    '''Per request list of (name, duration) pairs, if in a request.'''
+    try:
+        return tk.g.setdefault('showcase_timings', [])
+    except (RuntimeError, TypeError, AttributeError):
+        # Outside of a request context, eg on the command line
+        return None
+
+
+def instrument(name, func, kind='action', log_calls=True,
+               record_metrics=False):
+    '''
+    Wrap an action or auth function so each call logs its wall time and the
+    number of SQL statements and package_search calls it issued, and/or
+    records its duration in the showcase metrics.
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counters = _counters()
+        sql_before = counters.sql
+        package_search_before = counters.package_search
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            if record_metrics:
+                metrics.observe('showcase_{0}_duration_seconds'.format(kind),
+                                duration, {kind: name})
+            if log_calls:
+                log.info(
+                    'showcase_%s name=%s duration_ms=%.2f sql=%d '
+                    'package_search=%d', kind, name, duration * 1000,
+                    counters.sql - sql_before,
+                    counters.package_search - package_search_before)
+                timings = _request_timings()
+                if timings is not None:
+                    timings.append((name, duration * 1000))
+    return wrapper
+
+
+def instrument_all(functions, kind):
+    '''
+    Return the dict of action or auth functions, wrapped with `instrument`
+    if ``ckanext.showcase.instrumentation`` is enabled, or if
+    ``ckanext.showcase.metrics`` is and they are actions.
+    '''
+    log_calls = is_enabled()
+    record_metrics = kind == 'action' and metrics.is_enabled()
+    if not (log_calls or record_metrics):
+        return functions
+    if log_calls:
+        _register_sql_listener()
+    return dict((name, instrument(name, func, kind, log_calls,
+                                  record_metrics))
+                for name, func in functions.items())
+
+
+def before_request():
+    if not is_enabled():
+        return
+    counters = _counters()
+    tk.g.showcase_request_start = (
+        time.perf_counter(), counters.sql, counters.package_search)
+
+
+def after_request(response):
+    '''
+    Add a Server-Timing header with the total time, the number of SQL
+    statements and package_search calls, and the time spent in each
+    showcase action or auth function during the request.
+    '''
+    start = getattr(tk.g, 'showcase_request_start', None)
+    if not start:
+        return response
+    started, sql_before, package_search_before = start
+    counters = _counters()
+
+    metrics = [
+        'total;dur={0:.2f}'.format((time.perf_counter() - started) * 1000),
+        'sql;desc="{0} statements"'.format(counters.sql - sql_before),
+        'package-search;desc="{0} calls"'.format(
+            counters.package_search - package_search_before),
+    ]
+
+    durations = {}
+    for name, duration in getattr(tk.g, 'showcase_timings', []):
+        durations[name] = durations.get(name, 0) + duration
+    for name, duration in durations.items():
+        metrics.append('{0};dur={1:.2f}'.format(name, duration))
+
+    response.headers['Server-Timing'] = ', '.join(metrics)
+    return response
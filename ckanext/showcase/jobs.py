@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase import cache
+
+log = logging.getLogger(__name__)
+
+
+def use_background_jobs():
+    '''
+    Whether the non-essential work following an association change should be
+    enqueued as a background job instead of being run within the request.
+    '''
+    return tk.asbool(
+        tk.config.get('ckanext.showcase.background_jobs', False))
+
+
+def refresh_association(showcase_id, package_ids):
+    '''
+    Bring everything derived from the associations of a showcase up to date
+    after datasets have been added to or removed from it.
+
+    Both the showcase (whose indexed dict carries ``num_datasets``) and the
+    affected datasets are reindexed in Solr with a single commit at the end,
+    and the related showcases of the showcase and its neighbours are
+    recomputed.
+    '''
+    from ckanext.showcase import related
+
+    ids = [showcase_id] + [id for id in package_ids if id != showcase_id]
+    reindex_packages(ids)
+    related.refresh(showcase_id)
+
+
+def reindex_packages(package_ids):
+    '''
+    Reindex the given datasets in Solr, with a single commit at the end.
+
+    Datasets that can't be indexed, eg as they have been purged since the
+    job was enqueued, are logged and skipped, so they don't stop the others
+    from being reindexed.
+    '''
+    from ckanext.showcase import indexing
+
+    indexed, failed = indexing.reindex(package_ids)
+    if failed:
+        log.error('Could not reindex %s', ', '.join(failed))
+
+
+def _run_or_enqueue(func, args, title):
+    if use_background_jobs():
+        tk.enqueue_job(
+            func, args, title=title,
+            queue=tk.config.get('ckanext.showcase.background_jobs.queue',
+                                u'default'))
+    else:
+        func(*args)
+
+
+def after_association_change(context, showcase_id, package_ids):
+    '''
+    Run, or enqueue, the maintenance needed after showcase/package
+    associations changed.
+
+    Nothing is done when ``defer_commit`` is set in the context, as the
+    changes are not visible yet; the caller is then responsible for calling
+    this once the transaction has been committed.
+    '''
+    if context.get('defer_commit'):
+        return
+
+    cache.invalidate('autocomplete')
+
+    _run_or_enqueue(refresh_association,
+                    [showcase_id, list(package_ids)],
+                    title=u'Refresh showcase {0}'.format(showcase_id))
+
+
+def after_showcases_deleted(context, showcase_ids, package_ids):
+    '''
+    Remove the showcases with ids `showcase_ids`, which have been deleted,
+    from the search index, and run, or enqueue, the reindexing of the
+    datasets that were in them, `package_ids`, so they no longer list them.
+
+    As with `after_association_change`, nothing is done when
+    ``defer_commit`` is set in the context, and callers deleting showcases
+    with ``defer_commit`` must call this, without it, once the transaction
+    has been committed.
+    '''
+    from ckanext.showcase import indexing
+
+    if context.get('defer_commit'):
+        return
+
+    indexing.remove_from_index(showcase_ids)
+    cache.invalidate('autocomplete')
+    cache.invalidate('popular')
+
+    package_ids = list(package_ids)
+    if package_ids:
+        _run_or_enqueue(reindex_packages, [package_ids],
+                        title=u'Reindex datasets of deleted showcases')
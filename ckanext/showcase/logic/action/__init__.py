@@ -2,6 +2,7 @@ import ckanext.showcase.logic.action.create
 import ckanext.showcase.logic.action.delete
 import ckanext.showcase.logic.action.update
 import ckanext.showcase.logic.action.get
+from ckanext.showcase import instrumentation
 
 
 def get_actions():
@@ -12,18 +13,32 @@ def get_actions():
             ckanext.showcase.logic.action.update.showcase_update,
         'ckanext_showcase_delete':
             ckanext.showcase.logic.action.delete.showcase_delete,
+        'ckanext_showcase_bulk_delete':
+            ckanext.showcase.logic.action.delete.showcase_bulk_delete,
         'ckanext_showcase_show':
             ckanext.showcase.logic.action.get.showcase_show,
+        'ckanext_showcase_show_many':
+            ckanext.showcase.logic.action.get.showcase_show_many,
         'ckanext_showcase_list':
             ckanext.showcase.logic.action.get.showcase_list,
+        'ckanext_showcase_autocomplete':
+            ckanext.showcase.logic.action.get.showcase_autocomplete,
+        'ckanext_showcase_association_changes':
+            ckanext.showcase.logic.action.get.showcase_association_changes,
+        'ckanext_showcase_related':
+            ckanext.showcase.logic.action.get.showcase_related,
         'ckanext_showcase_package_association_create':
             ckanext.showcase.logic.action.create.showcase_package_association_create,
         'ckanext_showcase_package_association_delete':
             ckanext.showcase.logic.action.delete.showcase_package_association_delete,
         'ckanext_showcase_package_list':
             ckanext.showcase.logic.action.get.showcase_package_list,
+        'ckanext_showcase_package_reorder':
+            ckanext.showcase.logic.action.update.showcase_package_reorder,
         'ckanext_package_showcase_list':
             ckanext.showcase.logic.action.get.package_showcase_list,
+        'ckanext_package_showcase_page':
+            ckanext.showcase.logic.action.get.package_showcase_page,
         'ckanext_organization_showcase_list':
             ckanext.showcase.logic.action.get.organization_showcase_list,
         'ckanext_showcase_admin_add':
@@ -35,4 +50,4 @@ def get_actions():
         'ckanext_showcase_upload':
             ckanext.showcase.logic.action.create.showcase_upload,
     }
-    return action_functions
+    return instrumentation.instrument_all(action_functions, 'action')
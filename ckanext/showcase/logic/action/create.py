@@ -1,6 +1,7 @@
 import logging
+import os
+import time
 
-import ckan.lib.uploader as uploader
 import ckan.lib.helpers as h
 import ckan.plugins.toolkit as toolkit
 from ckan.logic.converters import convert_user_name_or_id_to_id
@@ -8,7 +9,9 @@ from ckan.lib.navl.dictization_functions import validate
 
 import ckanext.showcase.logic.converters as showcase_converters
 import ckanext.showcase.logic.schema as showcase_schema
-from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseAdmin
+from ckanext.showcase.model import (ShowcasePackageAssociation, ShowcaseAdmin,
+                                    ShowcaseAssociationEvent)
+from ckanext.showcase import jobs, metrics
 
 convert_package_name_or_id_to_title_or_name = \
     showcase_converters.convert_package_name_or_id_to_title_or_name
@@ -24,6 +27,8 @@ def showcase_create(context, data_dict):
 
     # force type to 'showcase'
     data_dict['type'] = 'showcase'
+    import ckan.lib.uploader as uploader
+
     upload = uploader.get_uploader('showcase')
 
     upload.update_data_dict(data_dict, 'image_url',
@@ -71,10 +76,26 @@ def showcase_package_association_create(context, data_dict):
         raise toolkit.ValidationError("ShowcasePackageAssociation with package_id '{0}' and showcase_id '{1}' already exists.".format(package_id, showcase_id),
                                       error_summary=u"The dataset, {0}, is already in the showcase".format(convert_package_name_or_id_to_title_or_name(package_id, context)))
 
-    # create the association
-    return ShowcasePackageAssociation.create(package_id=package_id,
-                                             showcase_id=showcase_id,
-                                             organization_id=organization_id)
+    creator = context['model'].User.get(context.get('user') or '')
+
+    # create the association, after the datasets already in the showcase
+    association_dict = ShowcasePackageAssociation.create(
+        package_id=package_id,
+        showcase_id=showcase_id,
+        organization_id=organization_id,
+        creator_user_id=creator.id if creator else None,
+        position=ShowcasePackageAssociation.get_next_position(showcase_id),
+        defer_commit=True)
+    ShowcaseAssociationEvent.record('create', [association_dict],
+                                    context.get('user'))
+    if not context.get('defer_commit'):
+        context['model'].repo.commit()
+
+    metrics.inc('showcase_association_writes_total',
+                {'operation': 'create'})
+    jobs.after_association_change(context, showcase_id, [package_id])
+
+    return association_dict
 
 
 def showcase_admin_add(context, data_dict):
@@ -104,7 +125,9 @@ def showcase_admin_add(context, data_dict):
                                       error_summary=u"User '{0}' is already a Showcase Admin.".format(username))
 
     # create showcase admin entry
-    return ShowcaseAdmin.create(user_id=user_id)
+    return ShowcaseAdmin.create(
+        user_id=user_id,
+        defer_commit=context.get('defer_commit', False))
 
 
 def showcase_upload(context, data_dict):
@@ -113,11 +136,21 @@ def showcase_upload(context, data_dict):
     '''
     toolkit.check_access('ckanext_showcase_upload', context, data_dict)
 
+    import ckan.lib.uploader as uploader
+
     upload = uploader.get_uploader('showcase_image')
 
+    start = time.perf_counter()
+    upload_size = _file_size(data_dict.get('upload'))
+
     upload.update_data_dict(data_dict, 'image_url', 'upload', 'clear_upload')
     upload.upload(uploader.get_max_image_size())
 
+    metrics.observe('showcase_upload_duration_seconds',
+                    time.perf_counter() - start)
+    if upload_size is not None:
+        metrics.observe('showcase_upload_bytes', upload_size)
+
     image_url = data_dict.get('image_url')
     if image_url and image_url[0:6] not in {'http:/', 'https:'}:
         image_url = h.url_for_static(
@@ -125,3 +158,18 @@ def showcase_upload(context, data_dict):
             qualified=True
         )
     return {'url': image_url}
+
+
+def _file_size(file_storage):
+    '''Return the size of an uploaded file, or None if there isn't one.'''
+    stream = getattr(file_storage, 'stream', None)
+    if stream is None:
+        return None
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+    except (AttributeError, IOError, ValueError):
+        return None
+    return size
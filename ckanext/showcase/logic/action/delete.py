@@ -1,5 +1,7 @@
 import logging
 
+from sqlalchemy import or_
+
 import ckan.plugins.toolkit as toolkit
 from ckan.logic.converters import convert_user_name_or_id_to_id
 import ckan.lib.navl.dictization_functions
@@ -8,19 +10,92 @@ from ckanext.showcase.logic.schema import (
     showcase_package_association_delete_schema,
     showcase_admin_remove_schema)
 
-from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseAdmin
+from ckanext.showcase.model import (ShowcasePackageAssociation, ShowcaseAdmin,
+                                    ShowcaseAssociationEvent)
+from ckanext.showcase import jobs, metrics
 
 validate = ckan.lib.navl.dictization_functions.validate
 
 log = logging.getLogger(__name__)
 
 
+def _purge_requested(data_dict):
+    '''
+    Whether showcases should be purged, rather than marked as deleted, which
+    is the default unless ``ckanext.showcase.soft_delete`` is enabled.
+    '''
+    if 'purge' in data_dict:
+        return toolkit.asbool(data_dict['purge'])
+    return not toolkit.asbool(
+        toolkit.config.get('ckanext.showcase.soft_delete', False))
+
+
+def _delete_showcases(context, showcase_ids, purge):
+    '''
+    Purge, or mark as deleted, the showcases with the given ids.
+
+    Purging deletes all their associations with a single statement, in one
+    transaction. Soft deleted showcases keep their associations, which are
+    then hidden, and are deleted one at a time with ``package_delete``, so
+    their activity is recorded and the IPackageController hooks run; as
+    ``package_delete`` commits, ``defer_commit`` only applies to purges.
+    Either way a delete event is recorded for each association, the
+    showcases are removed from the search index, and the datasets they
+    contained are reindexed, see `jobs.after_showcases_deleted`.
+    '''
+    model = context['model']
+
+    associations = [
+        association._asdict() for association in
+        model.Session.query(ShowcasePackageAssociation.package_id,
+                            ShowcasePackageAssociation.showcase_id,
+                            ShowcasePackageAssociation.organization_id)
+        .filter(ShowcasePackageAssociation.showcase_id.in_(showcase_ids))]
+    package_ids = set(a['package_id'] for a in associations)
+
+    if purge:
+        ShowcaseAssociationEvent.record('delete', associations,
+                                        context.get('user'))
+        model.Session.query(ShowcasePackageAssociation) \
+            .filter(ShowcasePackageAssociation.showcase_id.in_(showcase_ids)) \
+            .delete(synchronize_session=False)
+        for showcase in model.Session.query(model.Package) \
+                .filter(model.Package.id.in_(showcase_ids)):
+            showcase.purge()
+        if context.get('defer_commit'):
+            return
+        model.repo.commit()
+    else:
+        # Access to the showcases has been checked by the caller
+        delete_context = dict(context, ignore_auth=True)
+        delete_context.pop('defer_commit', None)
+        for showcase_id in showcase_ids:
+            # Recorded along with the deletion, which package_delete commits
+            ShowcaseAssociationEvent.record(
+                'delete',
+                [a for a in associations if a['showcase_id'] == showcase_id],
+                context.get('user'))
+            toolkit.get_action('package_delete')(
+                delete_context, {'id': showcase_id})
+
+    jobs.after_showcases_deleted(
+        dict(context, defer_commit=False), showcase_ids, package_ids)
+
+
 def showcase_delete(context, data_dict):
     '''Delete a showcase. Showcase delete cascades to
     ShowcasePackageAssociation objects.
 
     :param id: the id or name of the showcase to delete
     :type id: string
+    :param purge: remove the showcase and its associations from the
+        database, rather than marking it as deleted (optional, defaults to
+        True unless ``ckanext.showcase.soft_delete`` is enabled)
+    :type purge: bool
+
+    With ``defer_commit`` in the context a purge is not committed, and the
+    caller must call ``ckanext.showcase.jobs.after_showcases_deleted`` once
+    it is, to update the search index. Soft deletes are always committed.
     '''
 
     model = context['model']
@@ -33,8 +108,53 @@ def showcase_delete(context, data_dict):
 
     toolkit.check_access('ckanext_showcase_delete', context, data_dict)
 
-    entity.purge()
-    model.repo.commit()
+    _delete_showcases(context, [entity.id], _purge_requested(data_dict))
+
+
+def showcase_bulk_delete(context, data_dict):
+    '''Delete several showcases at once.
+
+    When purging, associations are deleted with a single statement, the
+    showcases in one transaction and their search index documents with one
+    query.
+
+    :param ids: the ids or names of the showcases to delete
+    :type ids: list of strings
+    :param purge: remove the showcases and their associations from the
+        database, rather than marking them as deleted (optional, defaults to
+        True unless ``ckanext.showcase.soft_delete`` is enabled)
+    :type purge: bool
+
+    As with ``ckanext_showcase_delete``, with ``defer_commit`` in the
+    context the caller must call
+    ``ckanext.showcase.jobs.after_showcases_deleted`` after committing a
+    purge. Soft deleted showcases are committed one at a time.
+    '''
+
+    model = context['model']
+
+    toolkit.check_access('ckanext_showcase_bulk_delete', context, data_dict)
+
+    ids = toolkit.aslist(toolkit.get_or_bust(data_dict, 'ids'))
+    if not ids:
+        raise toolkit.ValidationError({'ids': ['Missing value']})
+
+    showcases = model.Session.query(model.Package.id, model.Package.name) \
+        .filter(model.Package.type == 'showcase') \
+        .filter(or_(model.Package.id.in_(ids),
+                    model.Package.name.in_(ids))) \
+        .all()
+
+    found = set()
+    for showcase in showcases:
+        found.update([showcase.id, showcase.name])
+    missing = [id for id in ids if id not in found]
+    if missing:
+        raise toolkit.ObjectNotFound(
+            'Showcases not found: {0}'.format(', '.join(missing)))
+
+    _delete_showcases(context, [showcase.id for showcase in showcases],
+                      _purge_requested(data_dict))
 
 
 def showcase_package_association_delete(context, data_dict):
@@ -70,8 +190,16 @@ def showcase_package_association_delete(context, data_dict):
         raise toolkit.ObjectNotFound("ShowcasePackageAssociation with package_id '{0}' and showcase_id '{1}' doesn't exist.".format(package_id, showcase_id))
 
     # delete the association
+    ShowcaseAssociationEvent.record(
+        'delete', [showcase_package_association.as_dict()],
+        context.get('user'))
     showcase_package_association.delete()
-    model.repo.commit()
+    if not context.get('defer_commit'):
+        model.repo.commit()
+
+    metrics.inc('showcase_association_writes_total',
+                {'operation': 'delete'})
+    jobs.after_association_change(context, showcase_id, [package_id])
 
 
 def showcase_admin_remove(context, data_dict):
@@ -102,4 +230,5 @@ def showcase_admin_remove(context, data_dict):
         raise toolkit.ObjectNotFound("ShowcaseAdmin with user_id '{0}' doesn't exist.".format(user_id))
 
     showcase_admin_to_remove.delete()
-    model.repo.commit()
+    if not context.get('defer_commit'):
+        model.repo.commit()
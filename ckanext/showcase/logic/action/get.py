@@ -1,57 +1,360 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from sqlalchemy import func, or_, tuple_
+
 import ckan.plugins.toolkit as toolkit
-import ckan.lib.dictization.model_dictize as model_dictize
 from ckan.lib.navl.dictization_functions import validate
 
+from ckanext.showcase import cache
 from ckanext.showcase.logic.schema import (showcase_package_list_schema,
                                            package_showcase_list_schema,
-                                           organization_showcase_list_schema)
-from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseAdmin
+                                           package_showcase_page_schema,
+                                           organization_showcase_list_schema,
+                                           showcase_list_schema,
+                                           showcase_autocomplete_schema,
+                                           showcase_association_changes_schema,
+                                           showcase_related_schema,
+                                           showcase_show_many_schema)
+from ckanext.showcase.model import (ShowcasePackageAssociation, ShowcaseAdmin,
+                                    ShowcaseAssociationEvent)
 
 import logging
 log = logging.getLogger(__name__)
 
 
+def _showcase_show_from_index(context, data_dict):
+    '''
+    Return the pkg_dict of a showcase as stored in the search index, with
+    the showcase display fields added, or None if it is not a showcase, is
+    not indexed or was modified after it was indexed.
+    '''
+    from ckan.lib import search
+    from ckanext.showcase.utils import add_showcase_display_fields
+
+    model = context['model']
+    pkg = model.Package.get(data_dict.get('id', ''))
+    if pkg is None or pkg.type != 'showcase':
+        return None
+
+    context['package'] = pkg
+    toolkit.check_access('package_show', context, data_dict)
+
+    try:
+        pkg_dict = json.loads(search.show(pkg.id)['validated_data_dict'])
+    except (search.SearchError, KeyError, ValueError):
+        return None
+
+    if pkg_dict.get('metadata_modified') != pkg.metadata_modified.isoformat():
+        log.debug('Showcase %s is stale in the search index', pkg.id)
+        return None
+
+    num_datasets = ShowcasePackageAssociation.count_datasets(
+        [pkg.id]).get(pkg.id, 0)
+    return add_showcase_display_fields(pkg_dict, num_datasets)
+
+
 @toolkit.side_effect_free
 def showcase_show(context, data_dict):
     '''Return the pkg_dict for a showcase (package).
 
     :param id: the id or name of the showcase
     :type id: string
+
+    :param use_cache: return the showcase as stored in the search index
+        when it is up to date, instead of reading it from the database.
+        Plugins changing package dicts after they are read only see them
+        when they are indexed (optional, default: False)
+    :type use_cache: bool
     '''
 
     toolkit.check_access('ckanext_showcase_show', context, data_dict)
 
+    data_dict = dict(data_dict)
+    if toolkit.asbool(data_dict.pop('use_cache', False)):
+        pkg_dict = _showcase_show_from_index(context, data_dict)
+        if pkg_dict is not None:
+            return pkg_dict
+
     pkg_dict = toolkit.get_action('package_show')(context, data_dict)
 
     return pkg_dict
 
 
+SHOW_MANY_MAX_IDS = 100
+
+
+@toolkit.side_effect_free
+def showcase_show_many(context, data_dict):
+    '''Return the pkg_dicts of several showcases at once.
+
+    The showcases are read from the search index with a single search, and
+    their number of datasets counted with a single query, so this is much
+    faster than calling ``ckanext_showcase_show`` for each of them.
+
+    :param ids: the ids or names of the showcases (maximum: 100)
+    :type ids: list of strings
+
+    :rtype: dictionary with the list of showcases under ``results``, in the
+        order they were asked for, and the ids or names of the showcases
+        that don't exist or can't be seen by the user under ``missing``
+    '''
+    from ckanext.showcase.utils import add_showcase_display_fields
+
+    toolkit.check_access('ckanext_showcase_show_many', context, data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(data_dict,
+                                           showcase_show_many_schema(),
+                                           context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    ids = validated_data_dict['ids']
+    if len(ids) > SHOW_MANY_MAX_IDS:
+        raise toolkit.ValidationError({'ids': [
+            'At most {0} showcases can be shown at once'.format(
+                SHOW_MANY_MAX_IDS)]})
+
+    model = context['model']
+
+    # resolve the ids and names with a single query
+    id_for = {}
+    for id, name in model.Session.query(model.Package.id,
+                                        model.Package.name) \
+            .filter(model.Package.type == 'showcase') \
+            .filter(or_(model.Package.id.in_(ids),
+                        model.Package.name.in_(ids))):
+        id_for[id] = id
+        id_for[name] = id
+
+    showcase_ids = sorted(set(id_for.values()))
+    showcases = {}
+    if showcase_ids:
+        # search with the user's permissions, returning the indexed dicts
+        # as they are, to add the display fields to all of them at once
+        results = toolkit.get_action('package_search')(context, {
+            'q': 'id:(' + ' OR '.join(showcase_ids) + ')',
+            'fq': '+dataset_type:showcase',
+            'fl': ['id', 'validated_data_dict'],
+            'rows': len(showcase_ids),
+            'include_private': True})['results']
+        num_datasets = ShowcasePackageAssociation.count_datasets(
+            [result['id'] for result in results])
+        for result in results:
+            pkg_dict = json.loads(result['validated_data_dict'])
+            showcases[result['id']] = add_showcase_display_fields(
+                pkg_dict, num_datasets.get(result['id'], 0))
+
+    found = []
+    missing = []
+    for id_or_name in ids:
+        showcase = showcases.get(id_for.get(id_or_name))
+        if showcase:
+            found.append(showcase)
+        else:
+            missing.append(id_or_name)
+
+    return {'results': found, 'missing': missing}
+
+
+SHOWCASE_LIST_ORDERS = ('recent', 'popular')
+
+
 @toolkit.side_effect_free
 def showcase_list(context, data_dict):
-    '''Return a list of all showcases in the site.'''
+    '''Return a list of all showcases in the site, most recently modified
+    first, or the most viewed showcases.
+
+    The showcases are read from the search index, with a single query
+    whatever their number.
+
+    :param limit: if given, only return this number of showcases (optional)
+    :type limit: int
+
+    :param order_by: ``recent`` for all the showcases, most recently
+        modified first, or ``popular`` for the ones with the most recent
+        views, most viewed first, with their number of views as
+        ``views_recent``. Popular showcases are ranked periodically by
+        ``ckan showcase update-popular``, which needs tracking enabled
+        (optional, default: ``recent``)
+    :type order_by: string
+    '''
 
     toolkit.check_access('ckanext_showcase_list', context, data_dict)
 
-    model = context["model"]
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(data_dict or {},
+                                           showcase_list_schema(),
+                                           context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    order_by = validated_data_dict.get('order_by', 'recent')
+    if order_by not in SHOWCASE_LIST_ORDERS:
+        raise toolkit.ValidationError({'order_by': [
+            'Must be one of: {0}'.format(', '.join(SHOWCASE_LIST_ORDERS))]})
+
+    limit = validated_data_dict.get('limit')
 
+    if order_by == 'popular':
+        from ckanext.showcase import popularity
+        ranked = popularity.get_popular(limit)
+        views = dict((id, count) for id, count in ranked)
+        showcases = _search_showcases(
+            context, [id for id, count in ranked], include_private=True)
+        for showcase in showcases:
+            showcase['views_recent'] = views[showcase['id']]
+        return showcases
+
+    model = context["model"]
     q = model.Session.query(model.Package) \
         .filter(model.Package.type == 'showcase') \
-        .filter(model.Package.state == 'active')
+        .filter(model.Package.state == 'active') \
+        .order_by(model.Package.metadata_modified.desc())
+    if limit is not None:
+        q = q.limit(limit)
 
-    showcase_list = []
-    for pkg in q.all():
-        showcase_list.append(model_dictize.package_dictize(pkg, context))
+    showcase_ids = [id for (id,) in q.with_entities(model.Package.id)]
+    return _search_showcases(context, showcase_ids, include_private=True)
 
-    return showcase_list
+
+@toolkit.side_effect_free
+def showcase_autocomplete(context, data_dict):
+    '''Return a list of showcases whose title (or any word in it) or name
+    starts with the given string.
+
+    Results are cached for ``ckanext.showcase.autocomplete.cache_ttl``
+    seconds.
+
+    :param q: the string to search for
+    :type q: string
+
+    :param limit: the maximum number of showcases to return (optional,
+        default: 10, maximum: 100)
+    :type limit: int
+
+    :param package_id: id or name of a dataset, showcases already featuring
+        it are left out of the results (optional)
+    :type package_id: string
+
+    :rtype: list of dictionaries with the id, name and title of the showcases
+    '''
+
+    toolkit.check_access('ckanext_showcase_autocomplete', context, data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(data_dict,
+                                           showcase_autocomplete_schema(),
+                                           context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    q = validated_data_dict.get('q', '').strip()
+    if not q:
+        return []
+
+    limit = min(max(validated_data_dict.get('limit', 10), 1), 100)
+    package_id = validated_data_dict.get('package_id')
+
+    model = context['model']
+
+    def _search():
+        # The leading wildcard matching words in the title is served by the
+        # trigram indexes on the title and name of showcases, when pg_trgm
+        # is available
+        like = q.replace('\\', '\\\\') \
+            .replace('%', '\\%').replace('_', '\\_')
+        query = model.Session.query(model.Package.id,
+                                    model.Package.name,
+                                    model.Package.title) \
+            .filter(model.Package.type == 'showcase') \
+            .filter(model.Package.state == 'active') \
+            .filter(or_(
+                model.Package.title.ilike(like + '%', escape='\\'),
+                model.Package.title.ilike('% ' + like + '%', escape='\\'),
+                model.Package.name.ilike(like + '%', escape='\\')))
+
+        if package_id:
+            associated_showcase_ids = model.Session.query(
+                ShowcasePackageAssociation.showcase_id) \
+                .filter(ShowcasePackageAssociation.package_id == package_id)
+            query = query.filter(
+                ~model.Package.id.in_(associated_showcase_ids))
+
+        query = query.order_by(model.Package.title).limit(limit)
+
+        return [{'id': id, 'name': name, 'title': title or name}
+                for id, name, title in query]
+
+    key = '{0}:{1}:{2}'.format(
+        package_id or '', limit,
+        hashlib.md5(q.lower().encode('utf-8')).hexdigest())
+
+    return cache.get_or_set(
+        'autocomplete', key, _search,
+        cache.get_ttl('ckanext.showcase.autocomplete.cache_ttl', 300))
+
+
+@toolkit.side_effect_free
+def showcase_related(context, data_dict):
+    '''Return the showcases featuring the most similar sets of datasets to a
+    showcase, most similar first.
+
+    The similarity is the number of datasets two showcases share divided by
+    the number of datasets in either of them. It is updated when datasets
+    are added to or removed from showcases, and can be recomputed for every
+    showcase with ``ckan showcase build-related``.
+
+    :param id: id or name of the showcase
+    :type id: string
+
+    :param limit: the maximum number of showcases to return (optional,
+        default: 5, maximum: ``ckanext.showcase.related.max``)
+    :type limit: int
+
+    :rtype: list of dictionaries with the id, name, title, ``score`` and
+        number of ``shared_datasets`` of each showcase
+    '''
+    from ckanext.showcase import related
+
+    toolkit.check_access('ckanext_showcase_related', context, data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(data_dict,
+                                           showcase_related_schema(),
+                                           context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    limit = min(max(validated_data_dict.get('limit', 5), 1),
+                related.get_max_related())
+
+    return related.get_related(validated_data_dict['id'], limit)
 
 
 @toolkit.side_effect_free
 def showcase_package_list(context, data_dict):
-    '''List packages associated with a showcase.
+    '''List packages associated with a showcase, in the order set for the
+    showcase, then in the order they were added.
 
     :param showcase_id: id or name of the showcase
     :type showcase_id: string
 
+    :param limit: the maximum number of packages to return (optional,
+        default: 100, maximum: 1000)
+    :type limit: int
+
+    :param offset: the number of packages to skip, to page through them
+        (optional, default: 0)
+    :type offset: int
+
     :rtype: list of dictionaries
     '''
 
@@ -65,32 +368,117 @@ def showcase_package_list(context, data_dict):
     if errors:
         raise toolkit.ValidationError(errors)
 
-    # get a list of package ids associated with showcase id
-    pkg_id_list = ShowcasePackageAssociation.get_package_ids_for_showcase(
-        validated_data_dict['showcase_id'])
+    model = context['model']
+    limit = min(max(validated_data_dict.get('limit', 100), 1), 1000)
+    offset = validated_data_dict.get('offset', 0)
+
+    # get a page of the ids of the public, active packages in the showcase
+    query = model.Session.query(ShowcasePackageAssociation.package_id) \
+        .join(model.Package,
+              model.Package.id == ShowcasePackageAssociation.package_id) \
+        .filter(ShowcasePackageAssociation.showcase_id ==
+                validated_data_dict['showcase_id']) \
+        .filter(model.Package.state == 'active') \
+        .filter(model.Package.private.is_(False))
+    id_list = [pkg_id for (pkg_id,) in
+               ShowcasePackageAssociation.ordered(query)
+               .offset(offset).limit(limit)]
 
     pkg_list = []
-    if pkg_id_list:
-        # for each package id, get the package dict and append to list if
-        # active
-        id_list = []
-        for pkg_id in pkg_id_list:
-            id_list.append(pkg_id[0])
+    if id_list:
         q = 'id:(' + ' OR '.join(['{0}'.format(x) for x in id_list]) + ')'
         _pkg_list = toolkit.get_action('package_search')(
             context,
-            {'q': q, 'rows': 100})
-        pkg_list = _pkg_list['results']
+            {'q': q, 'rows': len(id_list)})
+        pkg_dicts = dict((pkg['id'], pkg) for pkg in _pkg_list['results'])
+        pkg_list = [pkg_dicts[id] for id in id_list if id in pkg_dicts]
     return pkg_list
 
 
+PACKAGE_SHOWCASE_LIST_ORDERS = ('created', 'title')
+
+
+def _encode_cursor(value, showcase_id):
+    if isinstance(value, datetime.datetime):
+        value = value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    return base64.urlsafe_b64encode(
+        json.dumps([value, showcase_id]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor, order_by):
+    try:
+        value, showcase_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        if order_by == 'created':
+            value = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+        return value, showcase_id
+    except (TypeError, ValueError, UnicodeError):
+        raise toolkit.ValidationError({'cursor': ['Invalid cursor']})
+
+
+def _search_showcases(context, showcase_ids, include_private=False):
+    """Return the search results for the given showcase ids, in that order,
+    leaving out those the user can't see."""
+    showcases = {}
+    # package_search returns at most 1000 rows by default
+    for i in range(0, len(showcase_ids), 1000):
+        batch = showcase_ids[i:i + 1000]
+        results = toolkit.get_action('package_search')(context, {
+            'q': 'id:(' + ' OR '.join(batch) + ')',
+            'fq': 'dataset_type:showcase',
+            'rows': len(batch),
+            'include_private': include_private})['results']
+        showcases.update((showcase['id'], showcase) for showcase in results)
+    return [showcases[id] for id in showcase_ids if id in showcases]
+
+
+def _package_showcases_query(context, validated_data_dict):
+    '''
+    Return the query of the (sort value, showcase id) of the active
+    showcases of a package, in the requested order, and that order.
+    '''
+    order_by = validated_data_dict.get('order_by', 'created')
+    if order_by not in PACKAGE_SHOWCASE_LIST_ORDERS:
+        raise toolkit.ValidationError({'order_by': [
+            'Must be one of: {0}'.format(
+                ', '.join(PACKAGE_SHOWCASE_LIST_ORDERS))]})
+
+    model = context['model']
+    if order_by == 'created':
+        sort_column = ShowcasePackageAssociation.created
+    else:
+        # Showcases without a title are displayed, and sorted, by name
+        sort_column = func.coalesce(func.nullif(model.Package.title, ''),
+                                    model.Package.name)
+
+    # The showcase ids come from the association table, which has an index
+    # on (package_id, created, showcase_id) for the default order
+    query = model.Session.query(sort_column,
+                                ShowcasePackageAssociation.showcase_id) \
+        .join(model.Package,
+              model.Package.id == ShowcasePackageAssociation.showcase_id) \
+        .filter(ShowcasePackageAssociation.package_id ==
+                validated_data_dict['package_id']) \
+        .filter(model.Package.type == 'showcase') \
+        .filter(model.Package.state == 'active') \
+        .order_by(sort_column, ShowcasePackageAssociation.showcase_id)
+    return query, sort_column, order_by
+
+
 @toolkit.side_effect_free
 def package_showcase_list(context, data_dict):
     '''List showcases associated with a package.
 
+    To page through them, use ``ckanext_package_showcase_page``.
+
     :param package_id: id or name of the package
     :type package_id: string
 
+    :param order_by: ``created`` to list the showcases in the order the
+        package was added to them, or ``title`` (optional, default:
+        ``created``)
+    :type order_by: string
+
     :rtype: list of dictionaries
     '''
 
@@ -104,25 +492,69 @@ def package_showcase_list(context, data_dict):
     if errors:
         raise toolkit.ValidationError(errors)
 
-    # get a list of showcase ids associated with the package id
-    showcase_id_list = ShowcasePackageAssociation.get_showcase_ids_for_package(
-        validated_data_dict['package_id'])
-    showcase_list = []
+    query, sort_column, order_by = _package_showcases_query(
+        context, validated_data_dict)
+    return _search_showcases(
+        context, [showcase_id for (value, showcase_id) in query])
 
-    q = ''
-    fq = ''
-    if showcase_id_list:
-        id_list = []
-        for showcase_id in showcase_id_list:
-            id_list.append(showcase_id[0])
-        fq = 'dataset_type:showcase'
-        q = 'id:(' + ' OR '.join(['{0}'.format(x) for x in id_list]) + ')'
-        _showcase_list = toolkit.get_action('package_search')(
-            context,
-            {'q': q, 'fq': fq, 'rows': 100})
-        showcase_list = _showcase_list['results']
 
-    return showcase_list
+@toolkit.side_effect_free
+def package_showcase_page(context, data_dict):
+    '''Return a page of the showcases associated with a package, along with
+    the cursor of the next page.
+
+    Pass the ``next_cursor`` of each response, with the same ``order_by``,
+    to the following call until ``has_more`` is false.
+
+    :param package_id: id or name of the package
+    :type package_id: string
+
+    :param order_by: ``created`` to list the showcases in the order the
+        package was added to them, or ``title`` (optional, default:
+        ``created``)
+    :type order_by: string
+
+    :param limit: the maximum number of showcases in a page (optional,
+        default: 100, maximum: 1000)
+    :type limit: int
+
+    :param cursor: return the page after this cursor (optional)
+    :type cursor: string
+
+    :rtype: dictionary with the list of showcases under ``results``, the
+        ``next_cursor`` and whether there are more showcases (``has_more``)
+    '''
+
+    toolkit.check_access('ckanext_package_showcase_page', context, data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(data_dict,
+                                           package_showcase_page_schema(),
+                                           context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    query, sort_column, order_by = _package_showcases_query(
+        context, validated_data_dict)
+    limit = min(max(validated_data_dict.get('limit', 100), 1), 1000)
+
+    if validated_data_dict.get('cursor'):
+        query = query.filter(
+            tuple_(sort_column, ShowcasePackageAssociation.showcase_id) >
+            _decode_cursor(validated_data_dict['cursor'], order_by))
+
+    # Fetch one more than needed to know if there are more
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+
+    return {
+        'results': _search_showcases(
+            context, [showcase_id for (value, showcase_id) in page]),
+        'next_cursor': _encode_cursor(*page[-1]) if page
+        else validated_data_dict.get('cursor'),
+        'has_more': len(rows) > limit,
+    }
 
 
 @toolkit.side_effect_free
@@ -183,3 +615,70 @@ def showcase_admin_list(context, data_dict):
         return showcase_admin_list
 
     return []
+
+
+@toolkit.side_effect_free
+def showcase_association_changes(context, data_dict):
+    '''Return the showcase/dataset associations created or deleted after a
+    cursor, oldest first, so they can be followed incrementally.
+
+    Start with no ``since``, then pass the ``next_cursor`` of each response
+    to the following call until ``has_more`` is false. Later changes will be
+    returned when calling again with the last ``next_cursor``.
+
+    Changes are only returned once they are older than
+    ``ckanext.showcase.association_changes.lag`` seconds (5 by default), so
+    that changes committed out of order are not skipped. A change whose
+    transaction takes longer than that to commit can still be missed.
+
+    Only the changes made through the showcase actions are recorded: soft
+    deleting a showcase records a ``delete`` per association, but restoring
+    it records nothing, and neither does deleting or purging a dataset
+    with the core actions (its associations are then hidden, or removed by
+    the database).
+
+    :param since: only return changes after this cursor (optional)
+    :type since: int
+
+    :param limit: the maximum number of changes to return (optional,
+        default: 100, maximum: 1000)
+    :type limit: int
+
+    :param showcase_id: id or name of a showcase, to only return its
+        changes (optional)
+    :type showcase_id: string
+
+    :rtype: dictionary with the list of ``changes`` (each with its ``id``,
+        ``event_type`` (``create`` or ``delete``), ``showcase_id``,
+        ``package_id``, ``organization_id``, ``user_id`` and
+        ``timestamp``), the ``next_cursor`` and whether there are more
+        changes (``has_more``)
+    '''
+
+    toolkit.check_access('ckanext_showcase_association_changes', context,
+                         data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(
+        data_dict, showcase_association_changes_schema(), context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    since = validated_data_dict.get('since', 0)
+    limit = min(max(validated_data_dict.get('limit', 100), 1), 1000)
+    lag = toolkit.asint(toolkit.config.get(
+        'ckanext.showcase.association_changes.lag', 5))
+
+    # Fetch one more than needed to know if there are more
+    events = ShowcaseAssociationEvent.get_since(
+        since, limit + 1, validated_data_dict.get('showcase_id'),
+        before=datetime.datetime.utcnow() - datetime.timedelta(seconds=lag))
+
+    changes = [event.as_dict() for event in events[:limit]]
+
+    return {
+        'changes': changes,
+        'next_cursor': changes[-1]['id'] if changes else since,
+        'has_more': len(events) > limit,
+    }
@@ -1,14 +1,20 @@
 import logging
 
-import ckan.lib.uploader as uploader
+from sqlalchemy import case, or_
+
 import ckan.plugins.toolkit as toolkit
+from ckan.lib.navl.dictization_functions import validate
 
+from ckanext.showcase.logic.schema import showcase_package_reorder_schema
+from ckanext.showcase.model import ShowcasePackageAssociation
 
 log = logging.getLogger(__name__)
 
 
 def showcase_update(context, data_dict):
 
+    import ckan.lib.uploader as uploader
+
     upload = uploader.get_uploader('showcase', data_dict['image_url'])
 
     upload.update_data_dict(data_dict, 'image_url',
@@ -19,3 +25,68 @@ def showcase_update(context, data_dict):
     pkg = toolkit.get_action('package_update')(context, data_dict)
 
     return pkg
+
+
+def showcase_package_reorder(context, data_dict):
+    '''Set the order of the datasets in a showcase.
+
+    The given datasets are placed first, in the given order, followed by any
+    other dataset of the showcase in its current order.
+
+    :param showcase_id: id or name of the showcase
+    :type showcase_id: string
+
+    :param package_ids: ids or names of datasets of the showcase
+    :type package_ids: list of strings
+
+    :rtype: list of the ids of all the datasets of the showcase, in order
+    '''
+
+    toolkit.check_access('ckanext_showcase_package_reorder', context,
+                         data_dict)
+
+    # validate the incoming data_dict
+    validated_data_dict, errors = validate(
+        data_dict, showcase_package_reorder_schema(), context)
+
+    if errors:
+        raise toolkit.ValidationError(errors)
+
+    model = context['model']
+    showcase_id = validated_data_dict['showcase_id']
+
+    current_ids = [
+        package_id for (package_id,) in ShowcasePackageAssociation.ordered(
+            model.Session.query(ShowcasePackageAssociation.package_id)
+            .filter(ShowcasePackageAssociation.showcase_id == showcase_id))]
+
+    # resolve all the ids and names with a single query
+    ids_or_names = validated_data_dict['package_ids']
+    resolved = {}
+    for id, name in model.Session.query(model.Package.id, model.Package.name) \
+            .filter(or_(model.Package.id.in_(ids_or_names),
+                        model.Package.name.in_(ids_or_names))):
+        resolved[id] = id
+        resolved.setdefault(name, id)
+
+    new_ids = []
+    for id_or_name in ids_or_names:
+        package_id = resolved.get(id_or_name)
+        if package_id is None or package_id not in current_ids:
+            raise toolkit.ValidationError({'package_ids': [
+                'Dataset {0} is not in the showcase'.format(id_or_name)]})
+        if package_id not in new_ids:
+            new_ids.append(package_id)
+    new_ids += [id for id in current_ids if id not in new_ids]
+
+    # A single UPDATE setting every position
+    model.Session.query(ShowcasePackageAssociation) \
+        .filter(ShowcasePackageAssociation.showcase_id == showcase_id) \
+        .update({'position': case(
+            dict((id, position) for position, id in enumerate(new_ids)),
+            value=ShowcasePackageAssociation.package_id)},
+            synchronize_session=False)
+    if not context.get('defer_commit'):
+        model.repo.commit()
+
+    return new_ids
@@ -1,6 +1,7 @@
 import ckan.plugins.toolkit as toolkit
 import ckan.model as model
 
+from ckanext.showcase import instrumentation
 from ckanext.showcase.model import ShowcaseAdmin
 
 import logging
@@ -8,22 +9,29 @@ log = logging.getLogger(__name__)
 
 
 def get_auth_functions():
-    return {
+    return instrumentation.instrument_all({
         'ckanext_showcase_create': create,
         'ckanext_showcase_update': update,
         'ckanext_showcase_delete': delete,
+        'ckanext_showcase_bulk_delete': bulk_delete,
         'ckanext_showcase_show': show,
+        'ckanext_showcase_show_many': show_many,
         'ckanext_showcase_list': showcase_list,
+        'ckanext_showcase_autocomplete': showcase_autocomplete,
+        'ckanext_showcase_association_changes': association_changes,
+        'ckanext_showcase_related': showcase_related,
         'ckanext_showcase_package_association_create': package_association_create,
         'ckanext_showcase_package_association_delete': package_association_delete,
         'ckanext_showcase_package_list': showcase_package_list,
+        'ckanext_showcase_package_reorder': package_reorder,
         'ckanext_package_showcase_list': package_showcase_list,
+        'ckanext_package_showcase_page': package_showcase_list,
         'ckanext_organization_showcase_list': organization_showcase_list,
         'ckanext_showcase_admin_add': add_showcase_admin,
         'ckanext_showcase_admin_remove': remove_showcase_admin,
         'ckanext_showcase_admin_list': showcase_admin_list,
         'ckanext_showcase_upload': showcase_upload,
-    }
+    }, 'auth')
 
 
 def _is_showcase_admin(context):
@@ -51,6 +59,14 @@ def delete(context, data_dict):
     return {'success': _is_showcase_admin(context)}
 
 
+def bulk_delete(context, data_dict):
+    '''Delete several Showcases.
+
+       Only sysadmin or users listed as Showcase Admins can delete Showcases.
+    '''
+    return {'success': _is_showcase_admin(context)}
+
+
 def update(context, data_dict):
     '''Update a Showcase.
 
@@ -65,12 +81,48 @@ def show(context, data_dict):
     return {'success': True}
 
 
+@toolkit.auth_allow_anonymous_access
+def show_many(context, data_dict):
+    '''All users can show several showcases at once, private showcases are
+    only returned to the users who can see them'''
+    return {'success': True}
+
+
 @toolkit.auth_allow_anonymous_access
 def showcase_list(context, data_dict):
     '''All users can access a showcase list'''
     return {'success': True}
 
 
+@toolkit.auth_allow_anonymous_access
+def showcase_autocomplete(context, data_dict):
+    '''All users can search showcases by title'''
+    return {'success': True}
+
+
+@toolkit.auth_allow_anonymous_access
+def showcase_related(context, data_dict):
+    '''All users can list the related showcases of a showcase'''
+    return {'success': True}
+
+
+def package_reorder(context, data_dict):
+    '''Set the order of the datasets of a showcase.
+
+       Only sysadmins or users listed as Showcase Admins can reorder them.
+    '''
+    return {'success': _is_showcase_admin(context)}
+
+
+def association_changes(context, data_dict):
+    '''List the changes to showcase associations.
+
+       Only sysadmins or users listed as Showcase Admins can list them, as
+       they include the users making the changes.
+    '''
+    return {'success': _is_showcase_admin(context)}
+
+
 def package_association_create(context, data_dict):
     '''Create a package showcase association.
 
@@ -36,14 +36,21 @@ def showcase_get_wysiwyg_editor():
     return tk.config.get('ckanext.showcase.editor', '')
 
 
+def showcase_profiling_enabled():
+    return tk.asbool(tk.config.get('ckanext.showcase.profiling', False))
+
+
 def get_recent_showcase_list(num=24):
     """Return a list of recent showcases."""
-    showcases = []
-    showcases = tk.get_action('ckanext_showcase_list')({},{})
-    sorted_showcases = sorted(
-        showcases, key=lambda k: k['metadata_modified'], reverse=True)
+    # showcase_list returns the most recently modified showcases first, so
+    # only the ones displayed need to be dictized
+    return tk.get_action('ckanext_showcase_list')({}, {'limit': num})
+
 
-    return sorted_showcases[:num]
+def get_popular_showcase_list(num=24):
+    """Return a list of the most viewed showcases."""
+    return tk.get_action('ckanext_showcase_list')(
+        {}, {'limit': num, 'order_by': 'popular'})
 
 
 def get_package_showcase_list(package_id):
@@ -56,6 +63,15 @@ def get_package_showcase_list(package_id):
     return showcases
 
 
+def get_related_showcases(showcase_id, limit=5):
+    '''The showcases featuring the most similar datasets to a showcase.'''
+    try:
+        return tk.get_action('ckanext_showcase_related')(
+            {}, {'id': showcase_id, 'limit': limit})
+    except (tk.ObjectNotFound, tk.NotAuthorized, tk.ValidationError):
+        return []
+
+
 def get_value_from_showcase_extras(extras, key):
     value = ''
     for item in extras:
@@ -20,7 +20,9 @@ empty = toolkit.get_validator("empty")
 if_empty_same_as = toolkit.get_validator("if_empty_same_as")
 ignore_missing = toolkit.get_validator("ignore_missing")
 ignore = toolkit.get_validator("ignore")
+natural_number_validator = toolkit.get_validator("natural_number_validator")
 keep_extras = toolkit.get_validator("keep_extras")
+list_of_strings = toolkit.get_validator("list_of_strings")
 
 package_id_not_changed = toolkit.get_validator("package_id_not_changed")
 name_validator = toolkit.get_validator("name_validator")
@@ -127,6 +129,13 @@ def showcase_show_schema():
     return schema
 
 
+def showcase_show_many_schema():
+    schema = {
+        'ids': [not_empty, list_of_strings]
+    }
+    return schema
+
+
 def showcase_package_association_create_schema():
     schema = {
         'package_id': [not_empty, unicode_safe,
@@ -146,7 +155,9 @@ def showcase_package_association_delete_schema():
 def showcase_package_list_schema():
     schema = {
         'showcase_id': [not_empty, unicode_safe,
-                        convert_package_name_or_id_to_id_for_type_showcase]
+                        convert_package_name_or_id_to_id_for_type_showcase],
+        'limit': [ignore_missing, natural_number_validator],
+        'offset': [ignore_missing, natural_number_validator]
     }
     return schema
 
@@ -154,11 +165,21 @@ def showcase_package_list_schema():
 def package_showcase_list_schema():
     schema = {
         'package_id': [not_empty, unicode_safe,
-                       convert_package_name_or_id_to_id_for_type_dataset]
+                       convert_package_name_or_id_to_id_for_type_dataset],
+        'order_by': [ignore_missing, unicode_safe]
     }
     return schema
 
 
+def package_showcase_page_schema():
+    schema = package_showcase_list_schema()
+    schema.update({
+        'limit': [ignore_missing, natural_number_validator],
+        'cursor': [ignore_missing, unicode_safe]
+    })
+    return schema
+
+
 def organization_showcase_list_schema():
     schema = {
         'organization_id': [not_empty, unicode_safe,
@@ -167,6 +188,52 @@ def organization_showcase_list_schema():
     return schema
 
 
+def showcase_list_schema():
+    schema = {
+        'limit': [ignore_missing, natural_number_validator],
+        'order_by': [ignore_missing, unicode_safe]
+    }
+    return schema
+
+
+def showcase_autocomplete_schema():
+    schema = {
+        'q': [ignore_missing, unicode_safe],
+        'limit': [ignore_missing, natural_number_validator],
+        'package_id': [ignore_missing, unicode_safe,
+                       convert_package_name_or_id_to_id_for_type_dataset]
+    }
+    return schema
+
+
+def showcase_association_changes_schema():
+    schema = {
+        'since': [ignore_missing, natural_number_validator],
+        'limit': [ignore_missing, natural_number_validator],
+        'showcase_id': [ignore_missing, unicode_safe,
+                        convert_package_name_or_id_to_id_for_type_showcase]
+    }
+    return schema
+
+
+def showcase_related_schema():
+    schema = {
+        'id': [not_empty, unicode_safe,
+               convert_package_name_or_id_to_id_for_type_showcase],
+        'limit': [ignore_missing, natural_number_validator]
+    }
+    return schema
+
+
+def showcase_package_reorder_schema():
+    schema = {
+        'showcase_id': [not_empty, unicode_safe,
+                        convert_package_name_or_id_to_id_for_type_showcase],
+        'package_ids': [not_empty, list_of_strings]
+    }
+    return schema
+
+
 def showcase_admin_add_schema():
     schema = {
         'username': [not_empty, user_id_or_name_exists, unicode_safe],
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import ckan.plugins.toolkit as tk
+
+log = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ckanext-showcase:metrics'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2,
+                5 * 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2)
+
+# name: (type, help, buckets)
+METRICS = {
+    'showcase_action_duration_seconds': (
+        'histogram', 'Duration of showcase actions.', LATENCY_BUCKETS),
+    'showcase_association_writes_total': (
+        'counter', 'Showcase/dataset associations created or deleted.', None),
+    'showcase_cache_requests_total': (
+        'counter', 'Showcase cache lookups, by cache and result.', None),
+    'showcase_upload_bytes': (
+        'histogram', 'Size of the images uploaded for showcases.',
+        SIZE_BUCKETS),
+    'showcase_upload_duration_seconds': (
+        'histogram', 'Duration of showcase image uploads.', LATENCY_BUCKETS),
+}
+
+
+def is_enabled():
+    return tk.asbool(tk.config.get('ckanext.showcase.metrics', False))
+
+
+def _connect():
+    from ckan.lib.redis import connect_to_redis
+    return connect_to_redis()
+
+
+def _key(name):
+    return '{0}:{1}'.format(KEY_PREFIX, name)
+
+
+def _format_labels(labels):
+    return ','.join('{0}="{1}"'.format(k, str(v).replace('"', '\\"'))
+                    for k, v in sorted((labels or {}).items()))
+
+
+def inc(name, labels=None, value=1):
+    '''Increment the counter `name`.'''
+    if not is_enabled():
+        return
+    try:
+        _connect().hincrbyfloat(_key(name), _format_labels(labels), value)
+    except Exception as e:
+        log.debug('Could not update metric %s: %r', name, e)
+
+
+def observe(name, value, labels=None):
+    '''Record `value` in the histogram `name`.'''
+    if not is_enabled():
+        return
+    label_str = _format_labels(labels)
+    try:
+        pipe = _connect().pipeline(transaction=False)
+        for bucket in METRICS[name][2]:
+            if value <= bucket:
+                pipe.hincrby(_key(name),
+                             '{0}|bucket|{1}'.format(label_str, bucket), 1)
+        pipe.hincrbyfloat(_key(name), '{0}|sum'.format(label_str), value)
+        pipe.hincrby(_key(name), '{0}|count'.format(label_str), 1)
+        pipe.execute()
+    except Exception as e:
+        log.debug('Could not update metric %s: %r', name, e)
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _join_labels(*label_strs):
+    label_str = ','.join(l for l in label_strs if l)
+    return '{{{0}}}'.format(label_str) if label_str else ''
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _render_counter(name, values):
+    for label_str, value in sorted(values.items()):
+        yield '{0}{1} {2}'.format(name, _join_labels(label_str),
+                                  _number(value))
+
+
+def _render_histogram(name, values, buckets):
+    series = {}
+    for field, value in values.items():
+        label_str, kind = field.split('|', 1)
+        series.setdefault(label_str, {})[kind] = value
+
+    for label_str, fields in sorted(series.items()):
+        count = fields.get('count', 0)
+        for bucket in buckets:
+            yield '{0}_bucket{1} {2}'.format(
+                name,
+                _join_labels(label_str, 'le="{0}"'.format(_number(bucket))),
+                _number(fields.get('bucket|{0}'.format(bucket), 0)))
+        yield '{0}_bucket{1} {2}'.format(
+            name, _join_labels(label_str, 'le="+Inf"'), _number(count))
+        yield '{0}_sum{1} {2}'.format(name, _join_labels(label_str),
+                                      _number(fields.get('sum', 0)))
+        yield '{0}_count{1} {2}'.format(name, _join_labels(label_str),
+                                        _number(count))
+
+
+def _totals():
+    import ckan.model as model
+    from ckanext.showcase.model import ShowcasePackageAssociation
+
+    showcases = model.Session.query(model.Package) \
+        .filter(model.Package.type == 'showcase') \
+        .filter(model.Package.state == 'active') \
+        .count()
+    associations = model.Session.query(ShowcasePackageAssociation).count()
+    return [
+        ('showcase_showcases', 'Number of active showcases.', showcases),
+        ('showcase_associations',
+         'Number of showcase/dataset associations.', associations),
+    ]
+
+
+def render():
+    '''Return all the metrics in the Prometheus text exposition format.'''
+    lines = []
+
+    try:
+        redis_conn = _connect()
+        stored = dict(
+            (name, redis_conn.hgetall(_key(name))) for name in METRICS)
+    except Exception as e:
+        log.warning('Could not read showcase metrics: %r', e)
+        stored = {}
+
+    for name, (metric_type, help, buckets) in sorted(METRICS.items()):
+        lines.append('# HELP {0} {1}'.format(name, help))
+        lines.append('# TYPE {0} {1}'.format(name, metric_type))
+        values = dict((_text(k), _text(v))
+                      for k, v in stored.get(name, {}).items())
+        if metric_type == 'histogram':
+            lines.extend(_render_histogram(name, values, buckets))
+        else:
+            lines.extend(_render_counter(name, values))
+
+    for name, help, value in _totals():
+        lines.append('# HELP {0} {1}'.format(name, help))
+        lines.append('# TYPE {0} gauge'.format(name))
+        lines.append('{0} {1}'.format(name, value))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,47 @@
+"""Backfill showcase_package_association.created and index it by package
+
+Revision ID: 3c8b1f6e2a95
+Revises: 9a4e7c2d1b3f
+Create Date: 2026-10-19 15:41:07.218304
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8b1f6e2a95'
+down_revision = '9a4e7c2d1b3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Associations made before created was added can't be older than the
+    # newest of their dataset and showcase
+    op.execute('''
+        UPDATE showcase_package_association AS a
+        SET created = GREATEST(package.metadata_created,
+                               showcase.metadata_created)
+        FROM package, package AS showcase
+        WHERE a.created IS NULL
+        AND package.id = a.package_id
+        AND showcase.id = a.showcase_id
+    ''')
+    op.execute('''
+        UPDATE showcase_package_association
+        SET created = now() AT TIME ZONE 'utc'
+        WHERE created IS NULL
+    ''')
+    op.alter_column('showcase_package_association', 'created',
+                    nullable=False)
+
+    op.create_index('idx_showcase_package_association_package_id_created',
+                    'showcase_package_association',
+                    ['package_id', 'created', 'showcase_id'])
+
+
+def downgrade():
+    op.drop_index('idx_showcase_package_association_package_id_created',
+                  table_name='showcase_package_association')
+    op.alter_column('showcase_package_association', 'created',
+                    nullable=True)
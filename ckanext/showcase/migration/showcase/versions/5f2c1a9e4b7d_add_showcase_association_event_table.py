@@ -0,0 +1,38 @@
+"""Add showcase_association_event table
+
+Revision ID: 5f2c1a9e4b7d
+Revises: 8d537c0d2fcb
+Create Date: 2026-10-19 10:12:40.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2c1a9e4b7d'
+down_revision = '8d537c0d2fcb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'showcase_association_event',
+        sa.Column('id', sa.types.Integer, primary_key=True,
+                  autoincrement=True),
+        sa.Column('event_type', sa.types.UnicodeText, nullable=False),
+        sa.Column('showcase_id', sa.types.UnicodeText, nullable=False),
+        sa.Column('package_id', sa.types.UnicodeText, nullable=False),
+        sa.Column('organization_id', sa.types.UnicodeText, nullable=True),
+        sa.Column('user_id', sa.types.UnicodeText, nullable=True),
+        sa.Column('timestamp', sa.types.DateTime, nullable=False),
+    )
+    op.create_index('idx_showcase_association_event_showcase_id_id',
+                    'showcase_association_event', ['showcase_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_showcase_association_event_showcase_id_id',
+                  table_name='showcase_association_event')
+    op.drop_table('showcase_association_event')
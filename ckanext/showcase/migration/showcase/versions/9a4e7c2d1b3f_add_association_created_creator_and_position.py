@@ -0,0 +1,61 @@
+"""Add created, creator_user_id and position to showcase_package_association
+
+Revision ID: 9a4e7c2d1b3f
+Revises: 5f2c1a9e4b7d
+Create Date: 2026-10-19 11:02:15.730461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e7c2d1b3f'
+down_revision = '5f2c1a9e4b7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'showcase_package_association',
+        sa.Column('created', sa.types.DateTime, nullable=True)
+    )
+    op.add_column(
+        'showcase_package_association',
+        sa.Column('creator_user_id',
+                  sa.types.UnicodeText,
+                  sa.ForeignKey('user.id', ondelete='SET NULL', onupdate='CASCADE'),
+                  nullable=True)
+    )
+    op.add_column(
+        'showcase_package_association',
+        sa.Column('position', sa.types.Integer, nullable=True)
+    )
+
+    # Number the existing datasets of each showcase in a stable order
+    op.execute('''
+        UPDATE showcase_package_association AS a
+        SET position = numbered.position
+        FROM (
+            SELECT package_id, showcase_id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY showcase_id ORDER BY package_id) - 1
+                       AS position
+            FROM showcase_package_association
+        ) AS numbered
+        WHERE a.package_id = numbered.package_id
+        AND a.showcase_id = numbered.showcase_id
+    ''')
+
+    op.create_index('idx_showcase_package_association_showcase_id_position',
+                    'showcase_package_association',
+                    ['showcase_id', 'position'])
+
+
+def downgrade():
+    op.drop_index('idx_showcase_package_association_showcase_id_position',
+                  table_name='showcase_package_association')
+    op.drop_column('showcase_package_association', 'position')
+    op.drop_column('showcase_package_association', 'creator_user_id')
+    op.drop_column('showcase_package_association', 'created')
@@ -0,0 +1,42 @@
+"""Add showcase_related table
+
+Revision ID: b71d4e0a9c26
+Revises: 3c8b1f6e2a95
+Create Date: 2026-10-19 16:20:51.604917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d4e0a9c26'
+down_revision = '3c8b1f6e2a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'showcase_related',
+        sa.Column('showcase_id',
+                  sa.types.UnicodeText,
+                  sa.ForeignKey('package.id', ondelete='CASCADE', onupdate='CASCADE'),
+                  primary_key=True,
+                  nullable=False),
+        sa.Column('related_showcase_id',
+                  sa.types.UnicodeText,
+                  sa.ForeignKey('package.id', ondelete='CASCADE', onupdate='CASCADE'),
+                  primary_key=True,
+                  nullable=False),
+        sa.Column('score', sa.types.Float, nullable=False),
+        sa.Column('shared', sa.types.Integer, nullable=False),
+    )
+    op.create_index('idx_showcase_related_showcase_id_score',
+                    'showcase_related', ['showcase_id', 'score'])
+
+
+def downgrade():
+    op.drop_index('idx_showcase_related_showcase_id_score',
+                  table_name='showcase_related')
+    op.drop_table('showcase_related')
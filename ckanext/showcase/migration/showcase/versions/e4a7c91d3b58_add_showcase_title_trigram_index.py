@@ -0,0 +1,48 @@
+"""Add trigram indexes on the title and name of showcases
+
+Revision ID: e4a7c91d3b58
+Revises: b71d4e0a9c26
+Create Date: 2026-10-19 18:02:44.631097
+
+"""
+import logging
+
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+log = logging.getLogger(__name__)
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c91d3b58'
+down_revision = 'b71d4e0a9c26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The autocomplete matches any word of the title, with a leading
+    # wildcard that only a trigram index can serve. Creating the extension
+    # needs enough privileges on the database: without it the autocomplete
+    # still works, by scanning the showcases.
+    bind = op.get_bind()
+    try:
+        with bind.begin_nested():
+            bind.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except DBAPIError as e:
+        log.warning('Could not create the pg_trgm extension, the showcase '
+                    'autocomplete will not be indexed: %r', e.orig)
+        return
+
+    for column in ('title', 'name'):
+        op.create_index(
+            'idx_package_showcase_{0}_trgm'.format(column), 'package',
+            [column], postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+            postgresql_where=text("type = 'showcase'"))
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS idx_package_showcase_title_trgm')
+    op.execute('DROP INDEX IF EXISTS idx_package_showcase_name_trgm')
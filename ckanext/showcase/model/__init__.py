@@ -1,7 +1,12 @@
-from sqlalchemy import Column, ForeignKey, types
+import datetime
+
+from sqlalchemy import Column, ForeignKey, Index, func, types
 
 from ckan.model.domain_object import DomainObject
 from ckan.model.meta import Session
+from ckan.model.group import Group, Member
+from ckan.model.package import Package
+from ckan.model.user import User
 
 import logging
 
@@ -35,10 +40,19 @@ class ShowcaseBaseModel(DomainObject):
         return instance
 
     @classmethod
-    def create(cls, **kwargs):
+    def create(cls, defer_commit=False, **kwargs):
+        """
+        Create and add a new instance to the session.
+
+        If defer_commit is True the instance is only flushed, leaving the
+        commit to the caller so several writes can share one transaction.
+        """
         instance = cls(**kwargs)
         Session.add(instance)
-        Session.commit()
+        if defer_commit:
+            Session.flush()
+        else:
+            Session.commit()
         return instance.as_dict()
 
 
@@ -64,7 +78,49 @@ class ShowcasePackageAssociation(ShowcaseBaseModel, BaseModel):
         primary_key=True,
         nullable=True,
     )
+    created = Column(
+        types.DateTime,
+        default=datetime.datetime.utcnow,
+        nullable=False,
+    )
+    creator_user_id = Column(
+        types.UnicodeText,
+        ForeignKey('user.id', ondelete='SET NULL', onupdate='CASCADE'),
+        nullable=True,
+    )
+    # Curated order of the datasets in the showcase, lowest first
+    position = Column(types.Integer, nullable=True)
 
+    __table_args__ = (
+        Index("idx_showcase_package_association_showcase_id_position",
+              "showcase_id", "position"),
+        # Covers paging through the showcases of a dataset by creation time
+        Index("idx_showcase_package_association_package_id_created",
+              "package_id", "created", "showcase_id"),
+    )
+
+    @classmethod
+    def get_next_position(cls, showcase_id):
+        """
+        Return the position for a dataset added at the end of a showcase.
+
+        The showcase row is locked until the end of the transaction, so
+        datasets added concurrently get distinct positions.
+        """
+        Session.query(Package.id).filter(Package.id == showcase_id) \
+            .with_for_update().scalar()
+        position = Session.query(func.max(cls.position)) \
+            .filter(cls.showcase_id == showcase_id).scalar()
+        return 0 if position is None else position + 1
+
+    @classmethod
+    def ordered(cls, query):
+        """
+        Order a query on associations by position, then by when they were
+        created, with the package id as a tie breaker so the order is stable.
+        """
+        return query.order_by(cls.position.is_(None), cls.position,
+                              cls.created, cls.package_id)
 
     @classmethod
     def get_package_ids_for_showcase(cls, showcase_id):
@@ -76,14 +132,82 @@ class ShowcasePackageAssociation(ShowcaseBaseModel, BaseModel):
         )
         return showcase_package_association_list
 
+    @classmethod
+    def _public_datasets(cls, query, showcase_id):
+        """
+        Restrict a query to the active, public datasets of a showcase.
+
+        The query is started from the association table, so entities joined
+        afterwards, eg groups, are joined to its datasets.
+        """
+        return query.select_from(cls) \
+            .join(Package, Package.id == cls.package_id) \
+            .filter(cls.showcase_id == showcase_id) \
+            .filter(Package.state == 'active') \
+            .filter(Package.private.is_(False))
+
+    @classmethod
+    def count_datasets(cls, showcase_ids):
+        """
+        Return a dict of showcase id to number of active, public datasets,
+        for the passed showcase_ids, with a single query. Showcases without
+        datasets are left out.
+        """
+        query = Session.query(cls.showcase_id, func.count()) \
+            .join(Package, Package.id == cls.package_id) \
+            .filter(cls.showcase_id.in_(showcase_ids)) \
+            .filter(Package.state == 'active') \
+            .filter(Package.private.is_(False)) \
+            .group_by(cls.showcase_id)
+        return dict(query.all())
+
+    @classmethod
+    def get_organization_names_for_showcase(cls, showcase_id):
+        """
+        Return the names of the organizations owning the public datasets of
+        the passed showcase_id.
+        """
+        query = cls._public_datasets(
+            Session.query(Group.name), showcase_id) \
+            .join(Group, Group.id == Package.owner_org) \
+            .filter(Group.state == 'active') \
+            .distinct()
+        return [name for (name,) in query]
+
+    @classmethod
+    def get_group_names_for_showcase(cls, showcase_id):
+        """
+        Return the names of the groups of the public datasets of the passed
+        showcase_id.
+        """
+        query = cls._public_datasets(
+            Session.query(Group.name), showcase_id) \
+            .join(Member, Member.table_id == Package.id) \
+            .join(Group, Group.id == Member.group_id) \
+            .filter(Member.table_name == 'package') \
+            .filter(Member.state == 'active') \
+            .filter(Group.state == 'active') \
+            .filter(Group.is_organization.is_(False)) \
+            .distinct()
+        return [name for (name,) in query]
+
+    @classmethod
+    def _without_deleted_showcases(cls, query):
+        """
+        Filter out the associations of soft deleted showcases, which are
+        kept in case the showcase is restored.
+        """
+        return query.join(Package, Package.id == cls.showcase_id) \
+            .filter(Package.state != 'deleted')
+
     @classmethod
     def get_showcase_ids_for_package(cls, package_id):
         """
         Return a list of showcase ids associated with the passed package_id.
         """
-        showcase_package_association_list = (
-            Session.query(cls.showcase_id).filter_by(package_id=package_id).all()
-        )
+        showcase_package_association_list = cls._without_deleted_showcases(
+            Session.query(cls.showcase_id).filter_by(package_id=package_id)
+        ).all()
         return showcase_package_association_list
 
     @classmethod
@@ -91,9 +215,9 @@ class ShowcasePackageAssociation(ShowcaseBaseModel, BaseModel):
         """
         Return a list of showcase ids associated with the passed organization_id.
         """
-        showcase_organization_association_list = (
-            Session.query(cls.showcase_id).filter_by(organization_id=organization_id).distinct()
-        )
+        showcase_organization_association_list = cls._without_deleted_showcases(
+            Session.query(cls.showcase_id).filter_by(organization_id=organization_id)
+        ).distinct()
         return showcase_organization_association_list
 
 
@@ -120,4 +244,106 @@ class ShowcaseAdmin(ShowcaseBaseModel, BaseModel):
         """
         Determine whether passed user is in the showcase admin list.
         """
-        return user.id in cls.get_showcase_admin_ids()
+        return cls.exists(user_id=user.id)
+
+
+class ShowcaseAssociationEvent(ShowcaseBaseModel, BaseModel):
+    """
+    Append-only log of the showcase/dataset associations created and
+    deleted, so other systems can follow the changes incrementally.
+
+    The ids are not foreign keys, so events outlive purged datasets,
+    showcases and users.
+    """
+    __tablename__ = "showcase_association_event"
+
+    id = Column(types.Integer, primary_key=True, autoincrement=True)
+    event_type = Column(types.UnicodeText, nullable=False)
+    showcase_id = Column(types.UnicodeText, nullable=False)
+    package_id = Column(types.UnicodeText, nullable=False)
+    organization_id = Column(types.UnicodeText, nullable=True)
+    user_id = Column(types.UnicodeText, nullable=True)
+    timestamp = Column(types.DateTime, nullable=False,
+                       default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_showcase_association_event_showcase_id_id",
+              "showcase_id", "id"),
+    )
+
+    @classmethod
+    def record(cls, event_type, associations, user=None):
+        """
+        Add an event for each of the passed association dicts (with
+        package_id, showcase_id and organization_id) to the session, with a
+        single statement, for the user with name or id `user`.
+
+        Committing is left to the caller, so events are only stored along
+        with the change they describe.
+        """
+        user_obj = User.get(user) if user else None
+        now = datetime.datetime.utcnow()
+        rows = [{
+            "event_type": event_type,
+            "showcase_id": association["showcase_id"],
+            "package_id": association["package_id"],
+            "organization_id": association.get("organization_id"),
+            "user_id": user_obj.id if user_obj else None,
+            "timestamp": now,
+        } for association in associations]
+        if rows:
+            Session.execute(cls.__table__.insert(), rows)
+
+    @classmethod
+    def get_since(cls, since, limit, showcase_id=None, before=None):
+        """
+        Return up to `limit` events with an id greater than `since`, oldest
+        first.
+
+        Ids are allocated when events are recorded, not when they are
+        committed, so an event can become visible after one with a greater
+        id. If `before` is given, events are only returned up to the first
+        one recorded at or after it, so that a cursor following them doesn't
+        move past events of transactions still in progress.
+        """
+        query = Session.query(cls).filter(cls.id > since)
+        if before is not None:
+            first_recent = Session.query(func.min(cls.id)) \
+                .filter(cls.id > since) \
+                .filter(cls.timestamp >= before) \
+                .scalar()
+            if first_recent is not None:
+                query = query.filter(cls.id < first_recent)
+        if showcase_id:
+            query = query.filter(cls.showcase_id == showcase_id)
+        return query.order_by(cls.id).limit(limit).all()
+
+
+class ShowcaseRelated(ShowcaseBaseModel, BaseModel):
+    """
+    Precomputed similarity between showcases, as the Jaccard index of the
+    sets of datasets they feature. Only the most similar showcases of each
+    showcase are kept, see `ckanext.showcase.related`.
+    """
+    __tablename__ = "showcase_related"
+
+    showcase_id = Column(
+        types.UnicodeText,
+        ForeignKey("package.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    related_showcase_id = Column(
+        types.UnicodeText,
+        ForeignKey("package.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    score = Column(types.Float, nullable=False)
+    # Number of datasets featured in both showcases
+    shared = Column(types.Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_showcase_related_showcase_id_score",
+              "showcase_id", "score"),
+    )
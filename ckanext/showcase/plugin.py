@@ -1,29 +1,55 @@
 # -*- coding: utf-8 -*-
 
 import os
-import sys
+import re
 import logging
 from collections import OrderedDict
 
 import ckan.plugins as plugins
 import ckan.plugins.toolkit as tk
 import ckan.lib.plugins as lib_plugins
-import ckan.lib.helpers as h
 
 
-from ckanext.showcase import cli
-from ckanext.showcase import utils
-from ckanext.showcase import views
-from ckanext.showcase.logic import auth, action
+from ckanext.showcase import cache
+from ckanext.showcase import instrumentation
 
-import ckanext.showcase.logic.schema as showcase_schema
-import ckanext.showcase.logic.helpers as showcase_helpers
+# The views, CLI commands, actions, auth functions, schemas, template helpers
+# and model are imported when first used rather than here, as they pull in large parts of
+# CKAN that are not needed to load the plugin, eg for unrelated CLI commands.
 
 _ = tk._
 
 log = logging.getLogger(__name__)
 
-DATASET_TYPE_NAME = utils.DATASET_TYPE_NAME
+DATASET_TYPE_NAME = 'showcase'
+
+
+# Matches a dataset_type:showcase clause, optionally prefixed with an
+# operator and/or with the value quoted, but not other fields whose name or
+# value happen to contain that string.
+_DATASET_TYPE_FILTER = re.compile(
+    r'(?:^|[\s(])[+\-!]?dataset_type:"?{0}"?(?=$|[\s)])'.format(
+        DATASET_TYPE_NAME))
+
+
+def _filters_dataset_type(fq):
+    return bool(fq) and bool(_DATASET_TYPE_FILTER.search(fq))
+
+
+I18N_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'i18n')
+_i18n_locales = None
+
+
+def _find_i18n_locales():
+    '''The locale directories under I18N_DIRECTORY, only listed once.'''
+    global _i18n_locales
+    if _i18n_locales is None:
+        _i18n_locales = [
+            d for d in os.listdir(I18N_DIRECTORY)
+            if not d.startswith('_') and
+            os.path.isdir(os.path.join(I18N_DIRECTORY, d))]
+    return _i18n_locales
 
 
 class ShowcasePlugin(plugins.SingletonPlugin, lib_plugins.DefaultDatasetForm):
@@ -41,11 +67,13 @@ class ShowcasePlugin(plugins.SingletonPlugin, lib_plugins.DefaultDatasetForm):
     # IBlueprint
 
     def get_blueprint(self):
+        from ckanext.showcase import views
         return views.get_blueprints()
 
     # IClick
 
     def get_commands(self):
+        from ckanext.showcase import cli
         return cli.get_commands()
 
     # IConfigurer
@@ -79,101 +107,151 @@ class ShowcasePlugin(plugins.SingletonPlugin, lib_plugins.DefaultDatasetForm):
         return 'showcase/new_package_form.html'
 
     def create_package_schema(self):
+        import ckanext.showcase.logic.schema as showcase_schema
         return showcase_schema.showcase_create_schema()
 
     def update_package_schema(self):
+        import ckanext.showcase.logic.schema as showcase_schema
         return showcase_schema.showcase_update_schema()
 
     def show_package_schema(self):
+        import ckanext.showcase.logic.schema as showcase_schema
         return showcase_schema.showcase_show_schema()
 
     # ITemplateHelpers
 
     def get_helpers(self):
+        import ckanext.showcase.logic.helpers as showcase_helpers
+
         return {
             'facet_remove_field': showcase_helpers.facet_remove_field,
             'get_site_statistics': showcase_helpers.get_site_statistics,
             'showcase_get_wysiwyg_editor': showcase_helpers.showcase_get_wysiwyg_editor,
+            'showcase_profiling_enabled': showcase_helpers.showcase_profiling_enabled,
             'get_recent_showcase_list': showcase_helpers.get_recent_showcase_list,
+            'get_popular_showcase_list': showcase_helpers.get_popular_showcase_list,
             'get_package_showcase_list': showcase_helpers.get_package_showcase_list,
+            'get_related_showcases': showcase_helpers.get_related_showcases,
             'get_value_from_showcase_extras': showcase_helpers.get_value_from_showcase_extras
         }
 
     # IFacets
 
     def dataset_facets(self, facets_dict, package_type):
-        '''Only show tags for Showcase search list.'''
+        '''
+        Only show tags, and the organizations and groups of the datasets in
+        the showcases, for Showcase search list.
+        '''
+        from ckanext.showcase.utils import (SHOWCASE_ORGANIZATIONS_FIELD,
+                                            SHOWCASE_GROUPS_FIELD)
+
         if package_type != DATASET_TYPE_NAME:
             return facets_dict
-        return OrderedDict({'tags': _('Tags')})
+        return OrderedDict([
+            ('tags', _('Tags')),
+            (SHOWCASE_ORGANIZATIONS_FIELD, _('Organizations')),
+            (SHOWCASE_GROUPS_FIELD, _('Groups')),
+        ])
 
     # IAuthFunctions
 
     def get_auth_functions(self):
+        from ckanext.showcase.logic import auth
         return auth.get_auth_functions()
 
     # IActions
 
     def get_actions(self):
+        from ckanext.showcase.logic import action
         return action.get_actions()
 
     # IPackageController
 
     def _add_to_pkg_dict(self, context, pkg_dict):
         '''Add key/values to pkg_dict and return it.'''
+        from ckanext.showcase.model import ShowcasePackageAssociation
+        from ckanext.showcase.utils import add_showcase_display_fields
 
         if pkg_dict['type'] != 'showcase':
             return pkg_dict
 
-        # Add a display url for the Showcase image to the pkg dict so template
-        # has access to it.
-        image_url = pkg_dict.get('image_url')
-        pkg_dict['image_display_url'] = image_url
-        if image_url and not image_url.startswith('http'):
-            pkg_dict['image_url'] = image_url
-            pkg_dict['image_display_url'] = \
-                h.url_for_static('uploads/{0}/{1}'
-                                 .format(DATASET_TYPE_NAME,
-                                         pkg_dict.get('image_url')),
-                                 qualified=True)
-
-        # Add dataset count
-        pkg_dict['num_datasets'] = len(
-            tk.get_action('ckanext_showcase_package_list')(
-                context, {'showcase_id': pkg_dict['id']}))
-
-        # Rendered notes
-        if showcase_helpers.showcase_get_wysiwyg_editor() == 'ckeditor':
-            pkg_dict['showcase_notes_formatted'] = pkg_dict['notes']
-        else:
-            pkg_dict['showcase_notes_formatted'] = \
-                h.render_markdown(pkg_dict['notes'])
-
-        # Add redirect_link flag
-        pkg_dict[u'redirect_link'] = pkg_dict.get('redirect_link', False)
-        return pkg_dict
+        num_datasets = ShowcasePackageAssociation.count_datasets(
+            [pkg_dict['id']]).get(pkg_dict['id'], 0)
+        return add_showcase_display_fields(pkg_dict, num_datasets)
 
     # CKAN >= 2.10
     def after_dataset_show(self, context, pkg_dict):
         '''Modify package_show pkg_dict.'''
         pkg_dict = self._add_to_pkg_dict(context, pkg_dict)
 
+    def after_dataset_create(self, context, pkg_dict):
+        if pkg_dict.get('type') == DATASET_TYPE_NAME:
+            cache.invalidate('autocomplete')
+
+    def after_dataset_update(self, context, pkg_dict):
+        if pkg_dict.get('type') == DATASET_TYPE_NAME:
+            cache.invalidate('autocomplete')
+            cache.invalidate('popular')
+
+    def after_dataset_delete(self, context, pkg_dict):
+        # Only the id is passed
+        package = context['model'].Package.get(pkg_dict.get('id'))
+        if package is not None and package.type == DATASET_TYPE_NAME:
+            cache.invalidate('autocomplete')
+            cache.invalidate('popular')
+
     def before_dataset_view(self, pkg_dict):
         '''Modify pkg_dict that is sent to templates.'''
         context = {'user': tk.c.user or tk.c.author}
 
         return self._add_to_pkg_dict(context, pkg_dict)
 
+    def before_dataset_index(self, pkg_dict):
+        '''
+        Index the ids of the showcases a dataset belongs to, so searches can
+        filter on them, and the organizations and groups of the datasets of
+        a showcase, so showcase searches can be faceted by them.
+        '''
+        from ckanext.showcase.model import ShowcasePackageAssociation
+        from ckanext.showcase.utils import (SHOWCASE_IDS_FIELD,
+                                            SHOWCASE_ORGANIZATIONS_FIELD,
+                                            SHOWCASE_GROUPS_FIELD)
+
+        if pkg_dict.get('type') != DATASET_TYPE_NAME:
+            pkg_dict[SHOWCASE_IDS_FIELD] = [
+                showcase_id for (showcase_id,) in
+                ShowcasePackageAssociation.get_showcase_ids_for_package(
+                    pkg_dict['id'])]
+        else:
+            pkg_dict[SHOWCASE_ORGANIZATIONS_FIELD] = \
+                ShowcasePackageAssociation.get_organization_names_for_showcase(
+                    pkg_dict['id'])
+            pkg_dict[SHOWCASE_GROUPS_FIELD] = \
+                ShowcasePackageAssociation.get_group_names_for_showcase(
+                    pkg_dict['id'])
+        return pkg_dict
+
     def before_dataset_search(self, search_params):
         '''
         Unless the query is already being filtered by this dataset_type
         (either positively, or negatively), exclude datasets of type
         `showcase`.
+
+        The exclusion is added as a separate filter query when possible, so
+        Solr can cache it independently of the rest of the filters.
         '''
+        instrumentation.count_package_search()
+
         fq = search_params.get('fq', '')
-        filter = 'dataset_type:{0}'.format(DATASET_TYPE_NAME)
-        if filter not in fq:
-            search_params.update({'fq': fq + " -" + filter})
+        fq_list = search_params.get('fq_list') or []
+        if any(_filters_dataset_type(f) for f in [fq] + list(fq_list)):
+            return search_params
+
+        filter = '-dataset_type:{0}'.format(DATASET_TYPE_NAME)
+        if tk.check_ckan_version(min_version='2.9'):
+            search_params['fq_list'] = list(fq_list) + [filter]
+        else:
+            search_params['fq'] = fq + ' ' + filter
         return search_params
 
     # CKAN < 2.10 (Remove when dropping support for 2.9)
@@ -181,10 +259,26 @@ class ShowcasePlugin(plugins.SingletonPlugin, lib_plugins.DefaultDatasetForm):
         '''Modify package_show pkg_dict.'''
         pkg_dict = self.after_dataset_show(context, pkg_dict)
 
+    def after_create(self, context, pkg_dict):
+        self.after_dataset_create(context, pkg_dict)
+
+    def after_update(self, context, pkg_dict):
+        self.after_dataset_update(context, pkg_dict)
+
+    def after_delete(self, context, pkg_dict):
+        self.after_dataset_delete(context, pkg_dict)
+
     def before_view(self, pkg_dict):
         '''Modify pkg_dict that is sent to templates.'''
         return self.before_dataset_view(pkg_dict)
 
+    def before_index(self, pkg_dict):
+        '''
+        Index the ids of the showcases a dataset belongs to, and the
+        organizations and groups of the datasets of a showcase.
+        '''
+        return self.before_dataset_index(pkg_dict)
+
     def before_search(self, search_params):
         '''
         Unless the query is already being filtered by this dataset_type
@@ -201,22 +295,20 @@ class ShowcasePlugin(plugins.SingletonPlugin, lib_plugins.DefaultDatasetForm):
         ckanext/myplugin/plugin.py and the translations are stored in
         i18n/
         '''
-        # assume plugin is called ckanext.<myplugin>.<...>.PluginClass
-        extension_module_name = '.'.join(self.__module__.split('.')[0:2])
-        module = sys.modules[extension_module_name]
-        return os.path.join(os.path.dirname(module.__file__), 'i18n')
+        return I18N_DIRECTORY
 
     def i18n_locales(self):
         '''Change the list of locales that this plugin handles
 
         By default the will assume any directory in subdirectory in the
         directory defined by self.directory() is a locale handled by this
-        plugin
+        plugin. The directory is only listed once per process, and not at all
+        if the locales are set in ``ckanext.showcase.i18n_locales``.
         '''
-        directory = self.i18n_directory()
-        return [d for
-                d in os.listdir(directory)
-                if os.path.isdir(os.path.join(directory, d))]
+        locales = tk.aslist(tk.config.get('ckanext.showcase.i18n_locales'))
+        if locales:
+            return locales
+        return list(_find_i18n_locales())
 
     def i18n_domain(self):
         '''Change the gettext domain handled by this plugin
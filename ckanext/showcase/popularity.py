@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import logging
+
+from sqlalchemy import Date, Integer, column, func, inspect, table
+
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase import cache
+from ckanext.showcase.utils import DATASET_TYPE_NAME
+
+log = logging.getLogger(__name__)
+
+# Only the columns used here. The table is created by CKAN's tracking
+# (part of core before 2.11, the tracking plugin since), and filled by
+# ``ckan tracking update``.
+tracking_summary = table(
+    'tracking_summary',
+    column('package_id'),
+    column('tracking_date', Date),
+    column('count', Integer),
+)
+
+
+def get_days():
+    '''Showcases are ranked by their views over this many days.'''
+    return tk.asint(tk.config.get('ckanext.showcase.popular.days', 14))
+
+
+def get_size():
+    '''Number of showcases kept in the cached ranking.'''
+    return tk.asint(tk.config.get('ckanext.showcase.popular.size', 24))
+
+
+def get_cache_ttl():
+    return cache.get_ttl('ckanext.showcase.popular.cache_ttl', 86400)
+
+
+def has_tracking_summary():
+    '''Whether the tracking summary table exists.'''
+    return inspect(model.meta.engine).has_table('tracking_summary')
+
+
+def popular_showcase_ids(limit, days=None):
+    '''
+    Return (id, views) pairs of the `limit` active, public showcases viewed
+    the most over the last `days`, most viewed first.
+
+    Showcases without any views are left out. If the tracking tables do not
+    exist an empty list is returned.
+    '''
+    if not has_tracking_summary():
+        log.warning('The tracking summary table does not exist, enable '
+                    'tracking to rank the popular showcases')
+        return []
+
+    if days is None:
+        days = get_days()
+    since = datetime.date.today() - datetime.timedelta(days=days)
+
+    views = func.sum(tracking_summary.c.count)
+    query = model.Session.query(model.Package.id, views) \
+        .join(tracking_summary,
+              tracking_summary.c.package_id == model.Package.id) \
+        .filter(model.Package.type == DATASET_TYPE_NAME) \
+        .filter(model.Package.state == 'active') \
+        .filter(model.Package.private.is_(False)) \
+        .filter(tracking_summary.c.tracking_date >= since) \
+        .group_by(model.Package.id) \
+        .having(views > 0) \
+        .order_by(views.desc(), model.Package.id) \
+        .limit(limit)
+    return [(id, int(count)) for id, count in query]
+
+
+def _rank(limit):
+    return [[id, views] for id, views in popular_showcase_ids(limit)]
+
+
+def get_popular(limit=None):
+    '''
+    Return the (id, views) pairs of the `limit` most viewed showcases, most
+    viewed first, from the cache. ``ckanext_showcase_list`` turns them into
+    showcase dicts, as for the other orders.
+
+    The ranking is cached until `update` runs again, or for
+    ``ckanext.showcase.popular.cache_ttl`` seconds, so reading it is a
+    single cache lookup.
+    '''
+    if limit is None:
+        limit = get_size()
+    return cache.get_or_set('popular', str(limit),
+                            lambda: _rank(limit), get_cache_ttl())
+
+
+def update():
+    '''
+    Recompute the ranking of the most viewed showcases and store it in the
+    cache. Meant to run periodically, after ``ckan tracking update``.
+    Returns the (id, views) pairs of the ranked showcases.
+    '''
+    cache.invalidate('popular')
+    ranked = get_popular()
+    log.info('Ranked %d popular showcases', len(ranked))
+    return ranked
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import ckan.plugins.toolkit as tk
+
+log = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r'^\d{8}T\d{6}-[0-9a-f]{8}$')
+
+
+def is_enabled():
+    return tk.asbool(tk.config.get('ckanext.showcase.profiling', False))
+
+
+def get_threshold():
+    '''Requests taking at least this many milliseconds are kept.'''
+    return tk.asint(
+        tk.config.get('ckanext.showcase.profiling.threshold', 1000))
+
+
+def get_sample_rate():
+    return float(
+        tk.config.get('ckanext.showcase.profiling.sample_rate', 1.0))
+
+
+def get_buffer_size():
+    return tk.asint(
+        tk.config.get('ckanext.showcase.profiling.buffer_size', 20))
+
+
+def get_directory():
+    directory = tk.config.get('ckanext.showcase.profiling.directory')
+    if not directory:
+        storage_path = tk.config.get('ckan.storage_path')
+        directory = os.path.join(storage_path or tempfile.gettempdir(),
+                                 'showcase_profiles')
+    return directory
+
+
+def before_request():
+    if not is_enabled() or random.random() >= get_sample_rate():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this thread
+        return
+    tk.g.showcase_profiler = (profiler, time.perf_counter())
+
+
+def after_request(response):
+    '''
+    Stop the profiler started in `before_request` and save its output if
+    the request took longer than the threshold.
+    '''
+    started = getattr(tk.g, 'showcase_profiler', None)
+    if not started:
+        return response
+    profiler, start = started
+    profiler.disable()
+    tk.g.showcase_profiler = None
+
+    duration = (time.perf_counter() - start) * 1000
+    if duration < get_threshold():
+        return response
+
+    metadata = {
+        'method': tk.request.method,
+        'path': tk.request.full_path.rstrip('?'),
+        'endpoint': tk.request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(duration, 2),
+        'user': getattr(tk.g, 'user', None) or None,
+        'pid': os.getpid(),
+    }
+    try:
+        save_profile(profiler, metadata)
+    except (IOError, OSError) as e:
+        log.warning('Could not save showcase profile: %r', e)
+    return response
+
+
+def save_profile(profiler, metadata):
+    '''
+    Store the stats of `profiler` and its request `metadata` in the profiles
+    directory, and drop the oldest profiles beyond the buffer size.
+
+    The directory is the ring buffer, so it is shared by all the processes
+    of the site. Returns the id of the new profile.
+    '''
+    directory = get_directory()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    now = datetime.utcnow()
+    profile_id = '{0}-{1}'.format(now.strftime('%Y%m%dT%H%M%S'),
+                                  uuid.uuid4().hex[:8])
+    metadata = dict(metadata, id=profile_id, timestamp=now.isoformat())
+
+    profiler.dump_stats(os.path.join(directory, profile_id + '.prof'))
+    with open(os.path.join(directory, profile_id + '.json'), 'w') as f:
+        json.dump(metadata, f)
+
+    _prune(directory, get_buffer_size())
+    return profile_id
+
+
+def _profile_ids(directory):
+    '''Ids of the stored profiles, newest first.'''
+    if not os.path.isdir(directory):
+        return []
+    ids = [name[:-len('.json')] for name in os.listdir(directory)
+           if name.endswith('.json')]
+    return sorted((id for id in ids if PROFILE_ID.match(id)), reverse=True)
+
+
+def _prune(directory, size):
+    for profile_id in _profile_ids(directory)[size:]:
+        for extension in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, profile_id + extension))
+            except OSError:
+                # Already removed by another process
+                pass
+
+
+def list_profiles():
+    '''Metadata of the stored profiles, newest first.'''
+    directory = get_directory()
+    profiles = []
+    for profile_id in _profile_ids(directory):
+        try:
+            with open(os.path.join(directory, profile_id + '.json')) as f:
+                profiles.append(json.load(f))
+        except (IOError, OSError, ValueError):
+            continue
+    return profiles
+
+
+def get_profile_path(profile_id):
+    '''Path of the stats file of `profile_id`, or None if there is none.'''
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(get_directory(), profile_id + '.prof')
+    return path if os.path.exists(path) else None
+
+
+def get_profile(profile_id, sort='cumulative', limit=50):
+    '''
+    Return the metadata of `profile_id`, with the `limit` top functions by
+    `sort` formatted by pstats under ``stats``, or None if it doesn't exist.
+    '''
+    path = get_profile_path(profile_id)
+    if not path:
+        return None
+    try:
+        with open(os.path.join(get_directory(), profile_id + '.json')) as f:
+            metadata = json.load(f)
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats(sort).print_stats(limit)
+    except (IOError, OSError, ValueError):
+        return None
+    metadata['stats'] = stream.getvalue()
+    return metadata
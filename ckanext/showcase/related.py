@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from sqlalchemy import Float, and_, cast, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+
+from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseRelated
+from ckanext.showcase.utils import DATASET_TYPE_NAME
+
+log = logging.getLogger(__name__)
+
+# Key of the transaction level advisory lock serialising the updates of the
+# related showcases table
+LOCK_KEY = 0x73686f7763617365
+
+
+def get_max_related():
+    '''Number of related showcases stored for each showcase.'''
+    return tk.asint(tk.config.get('ckanext.showcase.related.max', 20))
+
+
+def _live_associations():
+    '''The associations of active, public datasets with active showcases.
+    Private datasets are left out, as the number of shared datasets is
+    shown to everyone.'''
+    showcase = aliased(model.Package)
+    package = aliased(model.Package)
+    return model.Session.query(ShowcasePackageAssociation.showcase_id,
+                               ShowcasePackageAssociation.package_id) \
+        .join(showcase, showcase.id == ShowcasePackageAssociation.showcase_id) \
+        .join(package, package.id == ShowcasePackageAssociation.package_id) \
+        .filter(showcase.type == DATASET_TYPE_NAME) \
+        .filter(showcase.state == 'active') \
+        .filter(package.state == 'active') \
+        .filter(package.private.is_(False)) \
+        .subquery('live')
+
+
+def _ranked_pairs(showcase_ids, max_related):
+    '''
+    Select the `max_related` most similar showcases of each showcase, or
+    only of those in `showcase_ids` if given.
+
+    The similarity of two showcases is the number of datasets they share
+    divided by the number of datasets in either of them. Only the pairs
+    sharing datasets are considered, found by joining the associations with
+    themselves on the dataset, so the work is proportional to the overlaps
+    rather than to the square of the number of showcases.
+    '''
+    live = _live_associations()
+    sizes = model.Session.query(live.c.showcase_id,
+                                func.count().label('size')) \
+        .group_by(live.c.showcase_id) \
+        .subquery('sizes')
+
+    a = live.alias('a')
+    b = live.alias('b')
+    size_a = sizes.alias('size_a')
+    size_b = sizes.alias('size_b')
+
+    shared = func.count()
+    score = cast(shared, Float) / (size_a.c.size + size_b.c.size - shared)
+    pairs = model.Session.query(
+        a.c.showcase_id.label('showcase_id'),
+        b.c.showcase_id.label('related_showcase_id'),
+        score.label('score'),
+        shared.label('shared'),
+        func.row_number().over(
+            partition_by=a.c.showcase_id,
+            order_by=(score.desc(), b.c.showcase_id)).label('rank')) \
+        .select_from(a) \
+        .join(b, and_(b.c.package_id == a.c.package_id,
+                      b.c.showcase_id != a.c.showcase_id)) \
+        .join(size_a, size_a.c.showcase_id == a.c.showcase_id) \
+        .join(size_b, size_b.c.showcase_id == b.c.showcase_id) \
+        .group_by(a.c.showcase_id, b.c.showcase_id,
+                  size_a.c.size, size_b.c.size)
+    if showcase_ids is not None:
+        pairs = pairs.filter(a.c.showcase_id.in_(showcase_ids))
+    pairs = pairs.subquery('pairs')
+
+    return model.Session.query(pairs.c.showcase_id,
+                               pairs.c.related_showcase_id,
+                               pairs.c.score,
+                               pairs.c.shared) \
+        .filter(pairs.c.rank <= max_related)
+
+
+def _store(showcase_ids=None, max_related=None):
+    '''
+    Replace the related showcases of `showcase_ids`, or of every showcase,
+    with a DELETE and an INSERT ... SELECT, so nothing is loaded in Python.
+    Returns the number of rows stored.
+
+    Concurrent updates would insert the same pairs twice, so they are
+    serialised with an advisory lock held until the commit.
+    '''
+    if max_related is None:
+        max_related = get_max_related()
+
+    model.Session.query(func.pg_advisory_xact_lock(LOCK_KEY)).scalar()
+
+    delete = model.Session.query(ShowcaseRelated)
+    if showcase_ids is not None:
+        delete = delete.filter(ShowcaseRelated.showcase_id.in_(showcase_ids))
+    delete.delete(synchronize_session=False)
+
+    table = ShowcaseRelated.__table__
+    result = model.Session.execute(table.insert().from_select(
+        ['showcase_id', 'related_showcase_id', 'score', 'shared'],
+        _ranked_pairs(showcase_ids, max_related).statement))
+    model.repo.commit()
+    return result.rowcount
+
+
+def build(max_related=None):
+    '''
+    Compute the related showcases of every showcase. Returns the number of
+    pairs stored.
+    '''
+    count = _store(max_related=max_related)
+    log.info('Stored %d related showcases', count)
+    return count
+
+
+def refresh(showcase_id):
+    '''
+    Recompute the related showcases of a showcase whose datasets changed.
+
+    Its similarity with every showcase it shares datasets with, before or
+    after the change, is different now, which can change their most similar
+    showcases too, so those are recomputed as well.
+
+    This runs after the association change has been committed, so failing
+    here (eg if one of the showcases is purged meanwhile) is only logged:
+    the related showcases are brought up to date by the next refresh or
+    ``showcase build-related``.
+    '''
+    live = _live_associations()
+    neighbours = model.Session.query(live.c.showcase_id) \
+        .filter(live.c.package_id.in_(
+            model.Session.query(ShowcasePackageAssociation.package_id)
+            .filter(ShowcasePackageAssociation.showcase_id == showcase_id)))
+    previous = model.Session.query(ShowcaseRelated.showcase_id) \
+        .filter(or_(ShowcaseRelated.related_showcase_id == showcase_id,
+                    ShowcaseRelated.showcase_id == showcase_id))
+
+    showcase_ids = set([showcase_id])
+    showcase_ids.update(id for (id,) in neighbours)
+    showcase_ids.update(id for (id,) in previous)
+    try:
+        _store(sorted(showcase_ids))
+    except IntegrityError as e:
+        model.Session.rollback()
+        log.warning('Could not refresh the related showcases of %s: %r',
+                    showcase_id, e.orig)
+
+
+def get_related(showcase_id, limit):
+    '''
+    Return the id, name, title, score and number of shared datasets of the
+    `limit` showcases most similar to `showcase_id`, that are active and
+    public, most similar first.
+    '''
+    query = model.Session.query(model.Package.id,
+                                model.Package.name,
+                                model.Package.title,
+                                ShowcaseRelated.score,
+                                ShowcaseRelated.shared) \
+        .join(model.Package,
+              model.Package.id == ShowcaseRelated.related_showcase_id) \
+        .filter(ShowcaseRelated.showcase_id == showcase_id) \
+        .filter(model.Package.state == 'active') \
+        .filter(model.Package.private.is_(False)) \
+        .order_by(ShowcaseRelated.score.desc(),
+                  ShowcaseRelated.related_showcase_id) \
+        .limit(limit)
+    return [{'id': id, 'name': name, 'title': title or name,
+             'score': score, 'shared_datasets': shared}
+            for id, name, title, score, shared in query]
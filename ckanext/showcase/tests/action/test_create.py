@@ -181,6 +181,28 @@ class TestCreateShowcasePackageAssociation(object):
         assert association_dict.get("showcase_id") == showcase["id"]
         assert association_dict.get("package_id") == package["id"]
 
+    def test_association_create_metadata(self):
+        """
+        Associations record when and by whom they were created, and are
+        placed after the datasets already in the showcase.
+        """
+        sysadmin = factories.User(sysadmin=True)
+        org = factories.Organization()
+        packages = [factories.Dataset(owner_org=org["id"]) for i in range(2)]
+        showcase = factories.Dataset(type="showcase")
+
+        context = {"user": sysadmin["name"]}
+        association_dicts = [helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context=context,
+            package_id=package["id"],
+            showcase_id=showcase["id"],
+        ) for package in packages]
+
+        assert [a["position"] for a in association_dicts] == [0, 1]
+        assert association_dicts[0]["creator_user_id"] == sysadmin["id"]
+        assert association_dicts[0]["created"]
+
     def test_association_create_existing(self):
         """
         Attempt to create association with existing details returns Validation
@@ -210,6 +232,31 @@ class TestCreateShowcasePackageAssociation(object):
                 organization_id=organization_id
             )
 
+    def test_association_create_defer_commit(self):
+        """
+        With defer_commit in the context, the association is flushed but not
+        committed, so a rollback discards it.
+        """
+        sysadmin = factories.User(sysadmin=True)
+        organization_id = factories.Organization()["id"]
+        package_id = factories.Dataset(owner_org=organization_id)["id"]
+        showcase_id = factories.Dataset(type="showcase")["id"]
+
+        context = {"user": sysadmin["name"], "defer_commit": True}
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context=context,
+            package_id=package_id,
+            showcase_id=showcase_id,
+            organization_id=organization_id
+        )
+
+        assert model.Session.query(ShowcasePackageAssociation).count() == 1
+
+        model.Session.rollback()
+
+        assert model.Session.query(ShowcasePackageAssociation).count() == 0
+
 
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_session")
 class TestCreateShowcaseAdmin(object):
@@ -5,6 +5,7 @@ import ckan.plugins.toolkit as toolkit
 
 from ckan.tests import factories, helpers
 
+from ckanext.showcase import jobs
 from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseAdmin
 from ckan.model.package import Package
 
@@ -124,6 +125,190 @@ class TestDeleteShowcase(object):
         assert model.Session.query(ShowcasePackageAssociation).count() == 0
 
 
+def _showcase_with_datasets(context, num_datasets=2, **kwargs):
+    org = factories.Organization()
+    showcase = factories.Dataset(type="showcase", **kwargs)
+    datasets = [factories.Dataset(owner_org=org["id"])
+                for i in range(num_datasets)]
+    for dataset in datasets:
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context=context,
+            package_id=dataset["id"],
+            showcase_id=showcase["id"],
+        )
+    return showcase, datasets
+
+
+def _search_showcase_ids():
+    return [p["id"] for p in helpers.call_action(
+        "package_search", fq="dataset_type:showcase")["results"]]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestSoftDeleteShowcase(object):
+    def test_showcase_delete_soft(self):
+        """
+        With purge false the showcase is marked as deleted, its associations
+        are kept but it is no longer listed for its datasets.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase, datasets = _showcase_with_datasets(context)
+
+        helpers.call_action(
+            "ckanext_showcase_delete", context=context, id=showcase["id"],
+            purge=False
+        )
+
+        assert model.Package.get(showcase["id"]).state == "deleted"
+        assert model.Session.query(ShowcasePackageAssociation).count() == 2
+        assert _search_showcase_ids() == []
+        assert helpers.call_action(
+            "ckanext_package_showcase_list", package_id=datasets[0]["id"]
+        ) == []
+
+    @pytest.mark.ckan_config("ckanext.showcase.soft_delete", "true")
+    def test_showcase_delete_soft_by_default(self):
+        """
+        Showcases are soft deleted by default when configured to.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase, datasets = _showcase_with_datasets(context)
+
+        helpers.call_action(
+            "ckanext_showcase_delete", context=context, id=showcase["id"]
+        )
+
+        assert model.Package.get(showcase["id"]).state == "deleted"
+        assert model.Session.query(ShowcasePackageAssociation).count() == 2
+
+    def test_showcase_purge_defer_commit(self):
+        """
+        With defer_commit in the context, a purge isn't committed, and the
+        showcase stays indexed until the caller runs after_showcases_deleted.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase, datasets = _showcase_with_datasets(context)
+
+        helpers.call_action(
+            "ckanext_showcase_delete",
+            context={"user": sysadmin["name"], "defer_commit": True},
+            id=showcase["id"]
+        )
+        assert _search_showcase_ids() == [showcase["id"]]
+        model.repo.commit()
+        jobs.after_showcases_deleted(
+            {}, [showcase["id"]], [d["id"] for d in datasets])
+
+        assert model.Package.get(showcase["id"]) is None
+        assert _search_showcase_ids() == []
+
+    def test_showcase_delete_removes_from_index(self):
+        """
+        Purged showcases are removed from the search index.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase = factories.Dataset(type="showcase")
+        assert _search_showcase_ids() == [showcase["id"]]
+
+        helpers.call_action(
+            "ckanext_showcase_delete", context=context, id=showcase["id"]
+        )
+
+        assert _search_showcase_ids() == []
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestBulkDeleteShowcase(object):
+    def test_bulk_delete(self):
+        """
+        All the given showcases, by id or name, and their associations are
+        purged and removed from the index.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase_one, datasets = _showcase_with_datasets(context)
+        showcase_two, datasets = _showcase_with_datasets(context)
+        showcase_kept = factories.Dataset(type="showcase")
+
+        helpers.call_action(
+            "ckanext_showcase_bulk_delete", context=context,
+            ids=[showcase_one["id"], showcase_two["name"]]
+        )
+
+        assert model.Session.query(ShowcasePackageAssociation).count() == 0
+        assert [p.id for p in model.Session.query(Package).filter(
+            Package.type == "showcase")] == [showcase_kept["id"]]
+        assert _search_showcase_ids() == [showcase_kept["id"]]
+
+    def test_bulk_delete_soft(self):
+        """
+        With purge false the showcases are only marked as deleted.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase_one, datasets = _showcase_with_datasets(context)
+        showcase_two = factories.Dataset(type="showcase")
+
+        helpers.call_action(
+            "ckanext_showcase_bulk_delete", context=context,
+            ids=[showcase_one["id"], showcase_two["id"]], purge=False
+        )
+
+        assert set(p.state for p in model.Session.query(Package).filter(
+            Package.type == "showcase")) == {"deleted"}
+        assert model.Session.query(ShowcasePackageAssociation).count() == 2
+        assert _search_showcase_ids() == []
+
+    def test_bulk_delete_not_found(self):
+        """
+        Unknown showcases, or datasets, raise ObjectNotFound and nothing is
+        deleted.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset()
+
+        for ids in ([showcase["id"], "blah-blah"], [dataset["id"]]):
+            with pytest.raises(toolkit.ObjectNotFound):
+                helpers.call_action(
+                    "ckanext_showcase_bulk_delete", context=context, ids=ids
+                )
+
+        assert model.Package.get(showcase["id"]).state == "active"
+
+    def test_bulk_delete_no_ids(self):
+        """
+        Calling bulk delete without ids raises a ValidationError.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_showcase_bulk_delete", context=context
+            )
+
+    def test_bulk_delete_normal_user(self):
+        """
+        Normal users can't bulk delete showcases.
+        """
+        user = factories.User()
+        showcase = factories.Dataset(type="showcase")
+
+        with pytest.raises(toolkit.NotAuthorized):
+            helpers.call_action(
+                "ckanext_showcase_bulk_delete",
+                context={"user": user["name"], "ignore_auth": False},
+                ids=[showcase["id"]]
+            )
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db")
 class TestDeletePackage(object):
     def test_package_delete_retains_associations(self):
@@ -260,6 +445,35 @@ class TestDeleteShowcasePackageAssociation(object):
             organization_id=organization_id
         )
 
+    def test_association_delete_defer_commit(self):
+        """
+        With defer_commit in the context, the association delete isn't
+        committed, so a rollback restores it.
+        """
+        sysadmin = factories.User(sysadmin=True)
+        organization_id = factories.Organization()["id"]
+        package_id = factories.Dataset(owner_org=organization_id)["id"]
+        showcase_id = factories.Dataset(type="showcase")["id"]
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=package_id,
+            showcase_id=showcase_id,
+            organization_id=organization_id
+        )
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_delete",
+            context={"user": sysadmin["name"], "defer_commit": True},
+            package_id=package_id,
+            showcase_id=showcase_id,
+        )
+
+        model.Session.rollback()
+
+        assert model.Session.query(ShowcasePackageAssociation).count() == 1
+
     def test_association_delete_attempt_with_non_existent_association(self):
         """
         Attempting to delete a non-existent association (package ids exist,
@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
 
+import datetime
+
 import pytest
 
+import ckan.model as model
 from ckan.tests import factories, helpers
+import ckan.plugins as plugins
 import ckan.plugins.toolkit as toolkit
 
+from ckanext.showcase.model import ShowcaseAssociationEvent
+from ckanext.showcase.utils import (SHOWCASE_IDS_FIELD,
+                                    SHOWCASE_ORGANIZATIONS_FIELD,
+                                    SHOWCASE_GROUPS_FIELD)
+
 
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestShowcaseShow(object):
@@ -213,6 +222,156 @@ class TestShowcaseShow(object):
         app.get("/dataset", status=200)
 
 
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcaseShowUseCache(object):
+
+    """Tests for ckanext_showcase_show with use_cache"""
+
+    def _change_title(self, showcase, title, bump_modified):
+        pkg = model.Package.get(showcase["id"])
+        pkg.title = title
+        if bump_modified:
+            pkg.metadata_modified = datetime.datetime.utcnow()
+        model.Session.commit()
+
+    def test_use_cache_reads_index(self):
+        """
+        An up to date showcase is read from the search index, with its
+        display fields.
+        """
+        showcase = factories.Dataset(type="showcase", title="Indexed")
+        # Changed in the database only, without touching metadata_modified
+        self._change_title(showcase, "Not indexed", bump_modified=False)
+
+        showcase_shown = helpers.call_action(
+            "ckanext_showcase_show", id=showcase["name"], use_cache=True)
+
+        assert showcase_shown["title"] == "Indexed"
+        assert showcase_shown["num_datasets"] == 0
+        assert "showcase_notes_formatted" in showcase_shown
+
+    def test_use_cache_stale(self):
+        """
+        A showcase modified after it was indexed is read from the database.
+        """
+        showcase = factories.Dataset(type="showcase", title="Indexed")
+        self._change_title(showcase, "Modified", bump_modified=True)
+
+        showcase_shown = helpers.call_action(
+            "ckanext_showcase_show", id=showcase["id"], use_cache=True)
+
+        assert showcase_shown["title"] == "Modified"
+
+    def test_use_cache_private(self):
+        """
+        Private showcases are not returned from the index to users who
+        can't see them.
+        """
+        showcase = factories.Dataset(
+            type="showcase", private=True,
+            owner_org=factories.Organization()["id"])
+
+        with pytest.raises(toolkit.NotAuthorized):
+            helpers.call_action(
+                "ckanext_showcase_show",
+                context={"user": factories.User()["name"],
+                         "ignore_auth": False},
+                id=showcase["id"], use_cache=True)
+
+    def test_use_cache_not_found(self):
+        """
+        Unknown showcases raise ObjectNotFound, as without use_cache.
+        """
+        with pytest.raises(toolkit.ObjectNotFound):
+            helpers.call_action(
+                "ckanext_showcase_show", id="not-there", use_cache=True)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcaseShowMany(object):
+
+    """Tests for ckanext_showcase_show_many"""
+
+    def test_showcase_show_many(self):
+        """
+        Showcases are returned in the order asked for, by id or name, with
+        their display fields, and unknown ids and datasets are reported as
+        missing.
+        """
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(2)]
+        showcase_one = factories.Dataset(type="showcase")
+        showcase_two = factories.Dataset(type="showcase")
+        for dataset in datasets:
+            helpers.call_action(
+                "ckanext_showcase_package_association_create",
+                context={"user": sysadmin["name"]},
+                package_id=dataset["id"],
+                showcase_id=showcase_two["id"],
+            )
+
+        result = helpers.call_action(
+            "ckanext_showcase_show_many",
+            ids=[showcase_two["name"], "not-there", showcase_one["id"],
+                 datasets[0]["id"]])
+
+        assert [s["id"] for s in result["results"]] == [
+            showcase_two["id"], showcase_one["id"]]
+        assert result["missing"] == ["not-there", datasets[0]["id"]]
+        assert result["results"][0]["num_datasets"] == 2
+        assert result["results"][1]["num_datasets"] == 0
+        assert "image_display_url" in result["results"][0]
+        assert "showcase_notes_formatted" in result["results"][0]
+
+    def test_showcase_show_many_private(self):
+        """
+        Private showcases are only returned to the users who can see them.
+        """
+        user = factories.User()
+        org = factories.Organization(
+            users=[{"name": user["name"], "capacity": "member"}])
+        showcase = factories.Dataset(type="showcase", owner_org=org["id"],
+                                     private=True)
+
+        anonymous = helpers.call_action(
+            "ckanext_showcase_show_many", context={"user": ""},
+            ids=[showcase["id"]])
+        member = helpers.call_action(
+            "ckanext_showcase_show_many", context={"user": user["name"]},
+            ids=[showcase["id"]])
+
+        assert anonymous["results"] == []
+        assert anonymous["missing"] == [showcase["id"]]
+        assert [s["id"] for s in member["results"]] == [showcase["id"]]
+
+    def test_showcase_show_many_too_many(self):
+        """
+        Asking for too many showcases raises a ValidationError.
+        """
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_showcase_show_many",
+                ids=["showcase-{0}".format(i) for i in range(101)])
+
+    def test_showcase_show_many_query_count(self, count_queries):
+        """
+        The number of queries doesn't grow with the number of showcases.
+        """
+        showcases = [factories.Dataset(type="showcase") for i in range(10)]
+
+        with count_queries() as few:
+            helpers.call_action(
+                "ckanext_showcase_show_many",
+                ids=[s["id"] for s in showcases[:2]])
+        with count_queries() as many:
+            helpers.call_action(
+                "ckanext_showcase_show_many",
+                ids=[s["id"] for s in showcases])
+
+        assert many.count == few.count
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestShowcaseList(object):
     def test_showcase_list(self):
@@ -265,6 +424,174 @@ class TestShowcaseList(object):
             dataset_two["id"],
         ) not in showcase_list_name_id
 
+    def test_showcase_list_limit(self):
+        """
+        Only the most recently modified showcases are returned with a limit.
+        """
+        factories.Dataset(type="showcase")
+        showcase_two = factories.Dataset(type="showcase")
+
+        showcase_list = helpers.call_action("ckanext_showcase_list", limit=1)
+
+        assert [s["id"] for s in showcase_list] == [showcase_two["id"]]
+
+    @pytest.mark.parametrize("limit", ["-1", "many"])
+    def test_showcase_list_invalid_limit(self, limit):
+        """
+        Negative or non numeric limits raise a ValidationError.
+        """
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action("ckanext_showcase_list", limit=limit)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcaseAutocomplete(object):
+
+    """Tests for ckanext_showcase_autocomplete"""
+
+    def test_showcase_autocomplete_matches_title_prefix(self):
+        """
+        Showcases whose title, or a word in it, starts with q are returned,
+        ordered by title.
+        """
+        factories.Dataset(type="showcase", title="Bike lanes")
+        factories.Dataset(type="showcase", title="Better bikes")
+        factories.Dataset(type="showcase", title="Rainfall")
+        factories.Dataset(title="Bike counts")
+
+        results = helpers.call_action("ckanext_showcase_autocomplete", q="bik")
+
+        assert [r["title"] for r in results] == ["Better bikes", "Bike lanes"]
+        assert sorted(results[0].keys()) == ["id", "name", "title"]
+
+    def test_showcase_autocomplete_no_q(self):
+        """
+        An empty q returns no results.
+        """
+        factories.Dataset(type="showcase")
+
+        assert helpers.call_action("ckanext_showcase_autocomplete") == []
+
+    def test_showcase_autocomplete_limit(self):
+        """
+        No more than limit showcases are returned.
+        """
+        for i in range(0, 5):
+            factories.Dataset(type="showcase", title="Showcase {0}".format(i))
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="showcase", limit=2
+        )
+
+        assert len(results) == 2
+
+    def test_showcase_autocomplete_excludes_package_showcases(self):
+        """
+        Showcases already featuring package_id are left out.
+        """
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase_one = factories.Dataset(type="showcase", title="Maps one")
+        showcase_two = factories.Dataset(type="showcase", title="Maps two")
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=dataset["id"],
+            showcase_id=showcase_one["id"],
+        )
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="maps", package_id=dataset["id"]
+        )
+
+        assert [r["id"] for r in results] == [showcase_two["id"]]
+
+    def test_showcase_autocomplete_cache_invalidated_on_create(self):
+        """
+        A cached result is refreshed when a new showcase is created.
+        """
+        factories.Dataset(type="showcase", title="Transit one")
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="transit"
+        )
+        assert len(results) == 1
+
+        factories.Dataset(type="showcase", title="Transit two")
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="transit"
+        )
+        assert len(results) == 2
+
+    def test_showcase_autocomplete_cache_invalidated_on_delete(self):
+        """
+        A cached result is refreshed when a showcase is deleted with
+        package_delete.
+        """
+        showcase = factories.Dataset(type="showcase", title="Transit one")
+        factories.Dataset(type="showcase", title="Transit two")
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="transit"
+        )
+        assert len(results) == 2
+
+        helpers.call_action("package_delete", id=showcase["id"])
+
+        results = helpers.call_action(
+            "ckanext_showcase_autocomplete", q="transit"
+        )
+        assert len(results) == 1
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcaseRelated(object):
+
+    """Tests for ckanext_showcase_related"""
+
+    def test_showcase_related(self):
+        """
+        The showcases sharing datasets with a showcase are returned, most
+        similar first, up to the limit.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(3)]
+        showcase = factories.Dataset(type="showcase")
+        close = factories.Dataset(type="showcase")
+        far = factories.Dataset(type="showcase")
+        for showcase_id, dataset_ids in [
+                (showcase, datasets), (close, datasets[:2]),
+                (far, datasets[2:])]:
+            for dataset in dataset_ids:
+                helpers.call_action(
+                    "ckanext_showcase_package_association_create",
+                    context=context, showcase_id=showcase_id["id"],
+                    package_id=dataset["id"])
+
+        result = helpers.call_action(
+            "ckanext_showcase_related", id=showcase["name"])
+        limited = helpers.call_action(
+            "ckanext_showcase_related", id=showcase["name"], limit=1)
+
+        assert [r["name"] for r in result] == [close["name"], far["name"]]
+        assert result[0]["shared_datasets"] == 2
+        assert [r["name"] for r in limited] == [close["name"]]
+
+    def test_showcase_related_not_a_showcase(self):
+        """
+        Calling ckanext_showcase_related with a dataset raises a
+        ValidationError.
+        """
+        dataset = factories.Dataset()
+
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action("ckanext_showcase_related", id=dataset["id"])
+
 
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestShowcasePackageList(object):
@@ -460,6 +787,61 @@ class TestShowcasePackageList(object):
             )
 
 
+    def _showcase_with_packages(self, num_packages):
+        sysadmin = factories.User(sysadmin=True)
+        org = factories.Organization()
+        packages = [factories.Dataset(owner_org=org["id"])
+                    for i in range(num_packages)]
+        showcase_id = factories.Dataset(type="showcase")["id"]
+        for package in packages:
+            helpers.call_action(
+                "ckanext_showcase_package_association_create",
+                context={"user": sysadmin["name"]},
+                package_id=package["id"],
+                showcase_id=showcase_id,
+            )
+        return showcase_id, packages
+
+    def test_showcase_package_list_in_order_added(self):
+        """
+        Packages are listed in the order they were added to the showcase.
+        """
+        showcase_id, packages = self._showcase_with_packages(4)
+
+        pkg_list = helpers.call_action(
+            "ckanext_showcase_package_list", showcase_id=showcase_id
+        )
+
+        assert [p["id"] for p in pkg_list] == [p["id"] for p in packages]
+
+    def test_showcase_package_list_paging(self):
+        """
+        Packages can be paged through with limit and offset.
+        """
+        showcase_id, packages = self._showcase_with_packages(5)
+
+        pages = [helpers.call_action(
+            "ckanext_showcase_package_list", showcase_id=showcase_id,
+            limit=2, offset=offset
+        ) for offset in (0, 2, 4)]
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert [p["id"] for page in pages for p in page] == \
+            [p["id"] for p in packages]
+
+    def test_showcase_package_list_bad_limit(self):
+        """
+        An invalid limit raises a ValidationError.
+        """
+        showcase_id = factories.Dataset(type="showcase")["id"]
+
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_showcase_package_list", showcase_id=showcase_id,
+                limit="many"
+            )
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestPackageShowcaseList(object):
 
@@ -597,6 +979,125 @@ class TestPackageShowcaseList(object):
             )
 
 
+    def _package_in_showcases(self, titles):
+        sysadmin = factories.User(sysadmin=True)
+        package = factories.Dataset(owner_org=factories.Organization()["id"])
+        showcases = [factories.Dataset(type="showcase", title=title)
+                     for title in titles]
+        for showcase in showcases:
+            helpers.call_action(
+                "ckanext_showcase_package_association_create",
+                context={"user": sysadmin["name"]},
+                package_id=package["id"],
+                showcase_id=showcase["id"],
+            )
+        return package, showcases
+
+    def test_package_showcase_list_more_than_100(self):
+        """
+        All the showcases are returned, even if there are more than a
+        search page.
+        """
+        package, showcases = self._package_in_showcases(
+            ["Showcase {0}".format(i) for i in range(105)])
+
+        showcase_list = helpers.call_action(
+            "ckanext_package_showcase_list", package_id=package["id"]
+        )
+
+        assert [s["id"] for s in showcase_list] == [s["id"] for s in showcases]
+
+    def test_package_showcase_list_pages(self):
+        """
+        Following next_cursor pages through the showcases in the order the
+        package was added to them.
+        """
+        package, showcases = self._package_in_showcases(
+            ["C", "A", "E", "B", "D"])
+
+        pages = []
+        data_dict = {"package_id": package["id"], "limit": 2}
+        while True:
+            page = helpers.call_action(
+                "ckanext_package_showcase_page", **data_dict)
+            pages.append([s["id"] for s in page["results"]])
+            if not page["has_more"]:
+                break
+            data_dict["cursor"] = page["next_cursor"]
+
+        ids = [s["id"] for s in showcases]
+        assert pages == [ids[0:2], ids[2:4], ids[4:]]
+
+    def test_package_showcase_list_pages_by_title(self):
+        """
+        Showcases can be paged through by title.
+        """
+        package, showcases = self._package_in_showcases(["C", "A", "B"])
+
+        first = helpers.call_action(
+            "ckanext_package_showcase_page", package_id=package["id"],
+            order_by="title", limit=2)
+        second = helpers.call_action(
+            "ckanext_package_showcase_page", package_id=package["id"],
+            order_by="title", limit=2, cursor=first["next_cursor"])
+
+        assert [s["title"] for s in first["results"]] == ["A", "B"]
+        assert first["has_more"]
+        assert [s["title"] for s in second["results"]] == ["C"]
+        assert not second["has_more"]
+
+    def test_package_showcase_list_pages_by_title_without_title(self):
+        """
+        Showcases without a title are sorted, and paged through, by name.
+        """
+        package, showcases = self._package_in_showcases(["c", "a"])
+        untitled = factories.Dataset(type="showcase", name="b", title="")
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": factories.Sysadmin()["name"]},
+            package_id=package["id"], showcase_id=untitled["id"])
+
+        first = helpers.call_action(
+            "ckanext_package_showcase_page", package_id=package["id"],
+            order_by="title", limit=2)
+        second = helpers.call_action(
+            "ckanext_package_showcase_page", package_id=package["id"],
+            order_by="title", limit=2, cursor=first["next_cursor"])
+
+        assert [s["id"] for s in first["results"]] == \
+            [showcases[1]["id"], untitled["id"]]
+        assert [s["id"] for s in second["results"]] == [showcases[0]["id"]]
+
+    def test_package_showcase_list_always_a_list(self):
+        """
+        ckanext_package_showcase_list ignores paging parameters and always
+        returns a list.
+        """
+        package, showcases = self._package_in_showcases(["A", "B"])
+
+        showcase_list = helpers.call_action(
+            "ckanext_package_showcase_list", package_id=package["id"],
+            limit=1)
+
+        assert [s["id"] for s in showcase_list] == \
+            [s["id"] for s in showcases]
+
+    def test_package_showcase_list_bad_cursor(self):
+        """
+        An invalid cursor or order raises a ValidationError.
+        """
+        package_id = factories.Dataset()["id"]
+
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_package_showcase_page", package_id=package_id,
+                cursor="not-a-cursor")
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_package_showcase_list", package_id=package_id,
+                order_by="popularity")
+
+
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestShowcaseAdminList(object):
 
@@ -722,6 +1223,195 @@ class TestPackageSearchBeforeSearch(object):
         assert "custom" not in types
         assert "dataset" not in types
 
+    def test_package_search_filter_value_containing_dataset_type(self):
+        """
+        A filter on another field whose value merely contains
+        'dataset_type:showcase' still excludes showcases.
+        """
+        factories.Dataset(notes="dataset_type:showcase")
+        factories.Dataset(type="showcase", notes="dataset_type:showcase")
+
+        search_results = helpers.call_action(
+            "package_search", context={}, fq='notes:"dataset_type:showcase"'
+        )["results"]
+
+        assert [r["type"] for r in search_results] == ["dataset"]
+
+    def test_before_search_adds_separate_filter(self):
+        """
+        The showcase exclusion is added to fq_list, leaving fq untouched.
+        """
+        plugin = plugins.get_plugin("showcase")
+
+        search_params = plugin.before_dataset_search(
+            {"fq": "+organization:my-org"})
+
+        assert search_params["fq"] == "+organization:my-org"
+        assert search_params["fq_list"] == ["-dataset_type:showcase"]
+
+    def test_before_search_already_filtered_in_fq_list(self):
+        """
+        No exclusion is added when fq_list already filters on showcases.
+        """
+        plugin = plugins.get_plugin("showcase")
+
+        search_params = plugin.before_dataset_search(
+            {"fq_list": ["+dataset_type:showcase"]})
+
+        assert search_params["fq_list"] == ["+dataset_type:showcase"]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestPackageIndexShowcaseIds(object):
+
+    """
+    Extension uses the `before_index` method to index the showcases of each
+    dataset.
+    """
+
+    def test_package_search_exclude_showcase_datasets(self):
+        """
+        Datasets of a showcase can be filtered out with a single clause.
+        """
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        dataset_one = factories.Dataset(owner_org=org["id"])
+        dataset_two = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=dataset_one["id"],
+            showcase_id=showcase["id"],
+        )
+
+        search_results = helpers.call_action(
+            "package_search",
+            context={},
+            fq='-{0}:"{1}"'.format(SHOWCASE_IDS_FIELD, showcase["id"]),
+        )["results"]
+
+        assert [r["id"] for r in search_results] == [dataset_two["id"]]
+
+    def test_package_search_association_delete_reindexes_dataset(self):
+        """
+        A dataset removed from a showcase is no longer filtered out.
+        """
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        context = {"user": sysadmin["name"]}
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context=context,
+            package_id=dataset["id"],
+            showcase_id=showcase["id"],
+        )
+        helpers.call_action(
+            "ckanext_showcase_package_association_delete",
+            context=context,
+            package_id=dataset["id"],
+            showcase_id=showcase["id"],
+        )
+
+        search_results = helpers.call_action(
+            "package_search",
+            context={},
+            fq='-{0}:"{1}"'.format(SHOWCASE_IDS_FIELD, showcase["id"]),
+        )["results"]
+
+        assert [r["id"] for r in search_results] == [dataset["id"]]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcaseIndexOrganizationsAndGroups(object):
+
+    """
+    Extension uses the `before_index` method to index the organizations and
+    groups of the datasets of each showcase.
+    """
+
+    def _showcase_with(self, *datasets):
+        sysadmin = factories.Sysadmin()
+        showcase = factories.Dataset(type="showcase")
+        for dataset in datasets:
+            helpers.call_action(
+                "ckanext_showcase_package_association_create",
+                context={"user": sysadmin["name"]},
+                package_id=dataset["id"],
+                showcase_id=showcase["id"],
+            )
+        return showcase
+
+    def _search(self, fq):
+        return helpers.call_action(
+            "package_search", context={},
+            fq="dataset_type:showcase " + fq,
+            **{"facet.field": [SHOWCASE_ORGANIZATIONS_FIELD,
+                               SHOWCASE_GROUPS_FIELD]})
+
+    def test_filter_showcases_by_organization(self):
+        """
+        Showcases can be filtered by the organizations of their datasets.
+        """
+        org_one = factories.Organization()
+        org_two = factories.Organization()
+        showcase_one = self._showcase_with(
+            factories.Dataset(owner_org=org_one["id"]))
+        self._showcase_with(factories.Dataset(owner_org=org_two["id"]))
+
+        results = self._search('{0}:"{1}"'.format(
+            SHOWCASE_ORGANIZATIONS_FIELD, org_one["name"]))
+
+        assert [r["id"] for r in results["results"]] == [showcase_one["id"]]
+
+    def test_organization_and_group_facets(self):
+        """
+        The organizations and groups of the datasets are returned as facets
+        of the showcase search.
+        """
+        org = factories.Organization()
+        group = factories.Group()
+        dataset_one = factories.Dataset(owner_org=org["id"],
+                                        groups=[{"id": group["id"]}])
+        dataset_two = factories.Dataset(owner_org=org["id"])
+        self._showcase_with(dataset_one, dataset_two)
+        self._showcase_with(dataset_two)
+
+        facets = self._search("")["facets"]
+
+        assert facets[SHOWCASE_ORGANIZATIONS_FIELD] == {org["name"]: 2}
+        assert facets[SHOWCASE_GROUPS_FIELD] == {group["name"]: 1}
+
+    def test_private_datasets_not_indexed(self):
+        """
+        The organizations of private datasets are not indexed.
+        """
+        org = factories.Organization()
+        self._showcase_with(
+            factories.Dataset(owner_org=org["id"], private=True))
+
+        facets = self._search("")["facets"]
+
+        assert facets[SHOWCASE_ORGANIZATIONS_FIELD] == {}
+
+    def test_showcase_facets(self):
+        """
+        The showcase search has the organization and group facets, other
+        dataset types are left alone.
+        """
+        plugin = plugins.get_plugin("showcase")
+
+        facets = plugin.dataset_facets({"groups": "Groups"}, "showcase")
+
+        assert list(facets.keys()) == [
+            "tags", SHOWCASE_ORGANIZATIONS_FIELD, SHOWCASE_GROUPS_FIELD]
+        assert plugin.dataset_facets({"groups": "Groups"}, "dataset") == \
+            {"groups": "Groups"}
+
 
 @pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestUserShowBeforeSearch(object):
@@ -752,3 +1442,159 @@ class TestUserShowBeforeSearch(object):
         assert len(search_results) == 3
         assert "showcase" not in types
         assert "custom" in types
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.ckan_config("ckanext.showcase.association_changes.lag", "0")
+class TestShowcaseAssociationChanges(object):
+
+    """Tests for ckanext_showcase_association_changes"""
+
+    def _setup(self, num_datasets=3):
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        datasets = [factories.Dataset(owner_org=org["id"])
+                    for i in range(num_datasets)]
+        context = {"user": sysadmin["name"]}
+        for dataset in datasets:
+            helpers.call_action(
+                "ckanext_showcase_package_association_create",
+                context=context,
+                package_id=dataset["id"],
+                showcase_id=showcase["id"],
+            )
+        return sysadmin, org, showcase, datasets
+
+    def test_association_changes_create_and_delete(self):
+        """
+        Creating and deleting associations records events, oldest first,
+        with the user making the change.
+        """
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=1)
+        helpers.call_action(
+            "ckanext_showcase_package_association_delete",
+            context={"user": sysadmin["name"]},
+            package_id=datasets[0]["id"],
+            showcase_id=showcase["id"],
+        )
+
+        result = helpers.call_action("ckanext_showcase_association_changes")
+
+        changes = result["changes"]
+        assert [c["event_type"] for c in changes] == ["create", "delete"]
+        assert changes[0]["showcase_id"] == showcase["id"]
+        assert changes[0]["package_id"] == datasets[0]["id"]
+        assert changes[0]["organization_id"] == org["id"]
+        assert changes[0]["user_id"] == sysadmin["id"]
+        assert changes[0]["timestamp"]
+        assert result["next_cursor"] == changes[-1]["id"]
+        assert result["has_more"] is False
+
+    def test_association_changes_pagination(self):
+        """
+        Changes are paged through with the returned cursor.
+        """
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=3)
+
+        first = helpers.call_action(
+            "ckanext_showcase_association_changes", limit=2)
+        second = helpers.call_action(
+            "ckanext_showcase_association_changes",
+            since=first["next_cursor"], limit=2)
+        third = helpers.call_action(
+            "ckanext_showcase_association_changes",
+            since=second["next_cursor"], limit=2)
+
+        assert len(first["changes"]) == 2
+        assert first["has_more"] is True
+        assert [c["package_id"] for c in first["changes"] + second["changes"]] \
+            == [d["id"] for d in datasets]
+        assert second["has_more"] is False
+        assert third["changes"] == []
+        assert third["next_cursor"] == second["next_cursor"]
+
+    def test_association_changes_showcase_filter(self):
+        """
+        Changes can be restricted to a showcase.
+        """
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=2)
+        other_showcase = factories.Dataset(type="showcase")
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=datasets[0]["id"],
+            showcase_id=other_showcase["id"],
+        )
+
+        result = helpers.call_action(
+            "ckanext_showcase_association_changes",
+            showcase_id=other_showcase["name"])
+
+        assert len(result["changes"]) == 1
+        assert result["changes"][0]["showcase_id"] == other_showcase["id"]
+
+    def test_association_changes_showcase_purge(self):
+        """
+        Purging a showcase records a delete event per association.
+        """
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=2)
+        helpers.call_action(
+            "ckanext_showcase_delete",
+            context={"user": sysadmin["name"]},
+            id=showcase["id"],
+        )
+
+        result = helpers.call_action("ckanext_showcase_association_changes")
+
+        assert [c["event_type"] for c in result["changes"]] == \
+            ["create", "create", "delete", "delete"]
+
+    def test_association_changes_showcase_soft_delete(self):
+        """
+        Soft deleting a showcase records a delete event per association.
+        """
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=2)
+        helpers.call_action(
+            "ckanext_showcase_delete",
+            context={"user": sysadmin["name"]},
+            id=showcase["id"],
+            purge=False,
+        )
+
+        result = helpers.call_action("ckanext_showcase_association_changes")
+
+        assert [c["event_type"] for c in result["changes"]] == \
+            ["create", "create", "delete", "delete"]
+
+    def test_association_changes_lag(self, ckan_config, monkeypatch):
+        """
+        Recent changes, and any change after them, are held back, and the
+        cursor doesn't move past them.
+        """
+        monkeypatch.setitem(
+            ckan_config, "ckanext.showcase.association_changes.lag", "60")
+        sysadmin, org, showcase, datasets = self._setup(num_datasets=3)
+        events = model.Session.query(ShowcaseAssociationEvent) \
+            .order_by(ShowcaseAssociationEvent.id).all()
+        old = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+        events[0].timestamp = old
+        events[2].timestamp = old
+        model.repo.commit()
+
+        result = helpers.call_action("ckanext_showcase_association_changes")
+
+        assert [c["id"] for c in result["changes"]] == [events[0].id]
+        assert result["next_cursor"] == events[0].id
+        assert result["has_more"] is False
+
+    def test_association_changes_normal_user(self):
+        """
+        Normal users can't list the changes.
+        """
+        user = factories.User()
+
+        with pytest.raises(toolkit.NotAuthorized):
+            helpers.call_action(
+                "ckanext_showcase_association_changes",
+                context={"user": user["name"], "ignore_auth": False})
@@ -0,0 +1,103 @@
+import pytest
+
+import ckan.plugins.toolkit as toolkit
+
+from ckan.tests import factories, helpers
+
+
+def _showcase_with_packages(sysadmin, num_packages):
+    org = factories.Organization()
+    packages = [factories.Dataset(owner_org=org["id"])
+                for i in range(num_packages)]
+    showcase = factories.Dataset(type="showcase")
+    for package in packages:
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=package["id"],
+            showcase_id=showcase["id"],
+        )
+    return showcase, packages
+
+
+def _listed_ids(showcase_id):
+    return [p["id"] for p in helpers.call_action(
+        "ckanext_showcase_package_list", showcase_id=showcase_id)]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestShowcasePackageReorder(object):
+    def test_reorder(self):
+        """
+        The given datasets come first, in order, followed by the others in
+        their previous order.
+        """
+        sysadmin = factories.Sysadmin()
+        showcase, packages = _showcase_with_packages(sysadmin, 4)
+        ids = [p["id"] for p in packages]
+
+        result = helpers.call_action(
+            "ckanext_showcase_package_reorder",
+            context={"user": sysadmin["name"]},
+            showcase_id=showcase["name"],
+            package_ids=[ids[3], packages[1]["name"]],
+        )
+
+        expected = [ids[3], ids[1], ids[0], ids[2]]
+        assert result == expected
+        assert _listed_ids(showcase["id"]) == expected
+
+    def test_reorder_then_add(self):
+        """
+        Datasets added after reordering go last.
+        """
+        sysadmin = factories.Sysadmin()
+        showcase, packages = _showcase_with_packages(sysadmin, 2)
+        helpers.call_action(
+            "ckanext_showcase_package_reorder",
+            context={"user": sysadmin["name"]},
+            showcase_id=showcase["id"],
+            package_ids=[packages[1]["id"], packages[0]["id"]],
+        )
+        new_package = factories.Dataset(owner_org=packages[0]["owner_org"])
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=new_package["id"],
+            showcase_id=showcase["id"],
+        )
+
+        assert _listed_ids(showcase["id"]) == [
+            packages[1]["id"], packages[0]["id"], new_package["id"]]
+
+    def test_reorder_dataset_not_in_showcase(self):
+        """
+        Datasets that are not in the showcase raise a ValidationError.
+        """
+        sysadmin = factories.Sysadmin()
+        showcase, packages = _showcase_with_packages(sysadmin, 1)
+        other = factories.Dataset()
+
+        with pytest.raises(toolkit.ValidationError):
+            helpers.call_action(
+                "ckanext_showcase_package_reorder",
+                context={"user": sysadmin["name"]},
+                showcase_id=showcase["id"],
+                package_ids=[other["id"]],
+            )
+
+    def test_reorder_normal_user(self):
+        """
+        Normal users can't reorder datasets.
+        """
+        sysadmin = factories.Sysadmin()
+        user = factories.User()
+        showcase, packages = _showcase_with_packages(sysadmin, 1)
+
+        with pytest.raises(toolkit.NotAuthorized):
+            helpers.call_action(
+                "ckanext_showcase_package_reorder",
+                context={"user": user["name"], "ignore_auth": False},
+                showcase_id=showcase["id"],
+                package_ids=[packages[0]["id"]],
+            )
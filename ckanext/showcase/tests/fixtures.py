@@ -1,7 +1,15 @@
+import contextlib
+
 import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 import ckan.model as model
+from ckan.lib import search
 from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.showcase.model import ShowcasePackageAssociation
 
 
 @pytest.fixture
@@ -15,3 +23,97 @@ def clean_session():
     if toolkit.check_ckan_version(max_version="2.9.0"):
         if hasattr(model.Session, "revision"):
             model.Session.revision = None
+
+
+class QueryCounter(object):
+    '''Collects the SQL statements executed while it is listening.'''
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextlib.contextmanager
+def _count_queries():
+    counter = QueryCounter()
+    event.listen(Engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def count_queries():
+    '''
+    Context manager counting the SQL statements run within it:
+
+        with count_queries() as counter:
+            ...
+        assert counter.count <= 10
+    '''
+    return _count_queries
+
+
+@pytest.fixture
+def seed_showcases(clean_db, clean_index):
+    '''
+    Factory creating `num_showcases` showcases and `num_datasets` datasets,
+    with `num_associations` datasets added to each showcase.
+
+    Associations are written in a single transaction and indexed once, so
+    large sites can be seeded reasonably fast. Returns a dict with the
+    created showcase and dataset dicts.
+    '''
+    def seed(num_showcases, num_datasets, num_associations):
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"])
+                    for i in range(num_datasets)]
+        showcases = [factories.Dataset(type="showcase")
+                     for i in range(num_showcases)]
+
+        for i, showcase in enumerate(showcases):
+            for j in range(min(num_associations, num_datasets)):
+                dataset = datasets[(i + j) % num_datasets]
+                ShowcasePackageAssociation.create(
+                    package_id=dataset["id"],
+                    showcase_id=showcase["id"],
+                    organization_id=org["id"],
+                    defer_commit=True)
+        model.repo.commit()
+
+        search.rebuild(
+            package_ids=[p["id"] for p in showcases + datasets],
+            defer_commit=True)
+        search.commit()
+
+        return {"organization": org,
+                "showcases": showcases,
+                "datasets": datasets}
+
+    return seed
+
+
+@pytest.fixture
+def assert_max_queries():
+    '''
+    Context manager failing the test if more than `max_queries` SQL
+    statements are run within it:
+
+        with assert_max_queries(10) as counter:
+            ...
+    '''
+    @contextlib.contextmanager
+    def check(max_queries):
+        with _count_queries() as counter:
+            yield counter
+        assert counter.count <= max_queries, \
+            "{0} SQL statements were run, the maximum is {1}:\n{2}".format(
+                counter.count, max_queries, "\n".join(counter.statements))
+    return check
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmarks of the showcase actions and views, run with pytest-benchmark.
+
+They are skipped when pytest-benchmark is not installed, and deselected on
+CI with ``-m "not benchmark"``. To store a JSON baseline and compare later
+runs against it:
+
+    pytest --ckan-ini=test.ini ckanext/showcase/tests/test_benchmarks.py \
+        --benchmark-only --benchmark-autosave
+    pytest --ckan-ini=test.ini ckanext/showcase/tests/test_benchmarks.py \
+        --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:20%
+
+The size of the seeded site can be changed with the
+SHOWCASE_BENCHMARK_SHOWCASES, SHOWCASE_BENCHMARK_DATASETS and
+SHOWCASE_BENCHMARK_ASSOCIATIONS environment variables.
+'''
+
+import os
+
+import pytest
+
+from ckan.lib.helpers import url_for
+from ckan.tests import factories, helpers
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.benchmark
+
+NUM_SHOWCASES = int(os.environ.get("SHOWCASE_BENCHMARK_SHOWCASES", 20))
+NUM_DATASETS = int(os.environ.get("SHOWCASE_BENCHMARK_DATASETS", 50))
+NUM_ASSOCIATIONS = int(os.environ.get("SHOWCASE_BENCHMARK_ASSOCIATIONS", 10))
+
+# Maximum number of SQL statements per call, whatever the size of the site
+QUERY_BUDGETS = {
+    "ckanext_showcase_list": 10,
+    "ckanext_showcase_package_list": 20,
+    "ckanext_package_showcase_list": 20,
+    "ckanext_organization_showcase_list": 10,
+    "package_show": 60,
+    "read": 150,
+    "index": 100,
+    "manage_datasets": 200,
+}
+
+
+@pytest.fixture
+def site(seed_showcases):
+    return seed_showcases(NUM_SHOWCASES, NUM_DATASETS, NUM_ASSOCIATIONS)
+
+
+def _check_budget(name, count_queries, func):
+    with count_queries() as counter:
+        func()
+    assert counter.count <= QUERY_BUDGETS[name], \
+        "{0} ran {1} queries, budget is {2}".format(
+            name, counter.count, QUERY_BUDGETS[name])
+
+
+@pytest.mark.usefixtures("with_plugins")
+@pytest.mark.benchmark(group="actions")
+class TestActionBenchmarks(object):
+    def test_showcase_list(self, benchmark, site, count_queries):
+        def run():
+            return helpers.call_action("ckanext_showcase_list")
+
+        assert len(benchmark(run)) == NUM_SHOWCASES
+        _check_budget("ckanext_showcase_list", count_queries, run)
+
+    def test_showcase_package_list(self, benchmark, site, count_queries):
+        showcase_id = site["showcases"][0]["id"]
+
+        def run():
+            return helpers.call_action(
+                "ckanext_showcase_package_list", showcase_id=showcase_id)
+
+        assert len(benchmark(run)) == min(NUM_ASSOCIATIONS, NUM_DATASETS)
+        _check_budget("ckanext_showcase_package_list", count_queries, run)
+
+    def test_package_showcase_list(self, benchmark, site, count_queries):
+        package_id = site["datasets"][0]["id"]
+
+        def run():
+            return helpers.call_action(
+                "ckanext_package_showcase_list", package_id=package_id)
+
+        benchmark(run)
+        _check_budget("ckanext_package_showcase_list", count_queries, run)
+
+    def test_organization_showcase_list(self, benchmark, site,
+                                        count_queries):
+        organization_id = site["organization"]["id"]
+
+        def run():
+            return helpers.call_action(
+                "ckanext_organization_showcase_list",
+                organization_id=organization_id)
+
+        assert len(benchmark(run)) == NUM_SHOWCASES
+        _check_budget("ckanext_organization_showcase_list", count_queries,
+                      run)
+
+    def test_package_show_showcase(self, benchmark, site, count_queries):
+        showcase_id = site["showcases"][0]["id"]
+
+        def run():
+            return helpers.call_action("package_show", id=showcase_id)
+
+        assert benchmark(run)["num_datasets"] == min(NUM_ASSOCIATIONS,
+                                                     NUM_DATASETS)
+        _check_budget("package_show", count_queries, run)
+
+
+@pytest.mark.usefixtures("with_plugins")
+@pytest.mark.benchmark(group="views")
+class TestViewBenchmarks(object):
+    def test_read(self, app, benchmark, site, count_queries):
+        url = url_for("showcase_blueprint.read",
+                      id=site["showcases"][0]["name"])
+
+        def run():
+            return app.get(url, status=200)
+
+        benchmark(run)
+        _check_budget("read", count_queries, run)
+
+    def test_index(self, app, benchmark, site, count_queries):
+        url = url_for("showcase_blueprint.index")
+
+        def run():
+            return app.get(url, status=200)
+
+        benchmark(run)
+        _check_budget("index", count_queries, run)
+
+    def test_manage_datasets(self, app, benchmark, site, count_queries):
+        sysadmin = factories.Sysadmin()
+        env = {"REMOTE_USER": str(sysadmin["name"])}
+        url = url_for("showcase_blueprint.manage_datasets",
+                      id=site["showcases"][0]["name"])
+
+        def run():
+            return app.get(url, extra_environ=env, status=200)
+
+        benchmark(run)
+        _check_budget("manage_datasets", count_queries, run)
@@ -0,0 +1,100 @@
+import pytest
+
+import ckan.model as model
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import consistency
+from ckanext.showcase.model import ShowcasePackageAssociation
+
+
+def _associate(showcase_id, package_id, organization_id):
+    ShowcasePackageAssociation.create(showcase_id=showcase_id,
+                                      package_id=package_id,
+                                      organization_id=organization_id)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestConsistency(object):
+    def test_no_problems(self):
+        """
+        Valid associations aren't reported.
+        """
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase["id"], dataset["id"], org["id"])
+
+        problems = consistency.find_problems()
+
+        assert all(p["count"] == 0 for p in problems.values())
+
+    def test_find_problems(self):
+        """
+        Each kind of invalid association is reported.
+        """
+        org = factories.Organization()
+        other_org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        deleted_dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        deleted_showcase = factories.Dataset(type="showcase")
+
+        _associate(deleted_showcase["id"], dataset["id"], org["id"])
+        _associate(showcase["id"], deleted_dataset["id"], org["id"])
+        _associate(dataset["id"], deleted_dataset["id"], org["id"])
+        _associate(showcase["id"], dataset["id"], other_org["id"])
+        helpers.call_action("package_delete", id=deleted_dataset["id"])
+        helpers.call_action("package_delete", id=deleted_showcase["id"])
+
+        problems = consistency.find_problems()
+
+        assert problems["deleted_showcase"]["count"] == 1
+        assert problems["deleted_package"]["count"] == 2
+        assert problems["not_a_showcase"]["count"] == 1
+        assert problems["not_a_showcase"]["rows"][0]["showcase_id"] == \
+            dataset["id"]
+        assert problems["organization_mismatch"]["count"] == 1
+        assert problems["organization_mismatch"]["rows"][0]["owner_org"] == \
+            org["id"]
+
+    def test_fix_problems(self):
+        """
+        Invalid associations are deleted and organizations corrected, in
+        batches.
+        """
+        org = factories.Organization()
+        other_org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(3)]
+        deleted_dataset = factories.Dataset(owner_org=org["id"])
+        for dataset in datasets:
+            _associate(showcase["id"], dataset["id"], other_org["id"])
+        _associate(showcase["id"], deleted_dataset["id"], org["id"])
+        helpers.call_action("package_delete", id=deleted_dataset["id"])
+
+        fixed = consistency.fix_problems(batch_size=2)
+
+        assert fixed["deleted_package"] == 1
+        assert fixed["organization_mismatch"] == 3
+        assert all(p["count"] == 0
+                   for p in consistency.find_problems().values())
+
+        associations = model.Session.query(ShowcasePackageAssociation).all()
+        assert len(associations) == 3
+        assert set(a.organization_id for a in associations) == {org["id"]}
+
+    @pytest.mark.ckan_config("ckanext.showcase.soft_delete", "true")
+    def test_soft_deleted_showcases_not_reported(self):
+        """
+        Associations of soft deleted showcases are kept on purpose.
+        """
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase["id"], dataset["id"], org["id"])
+        helpers.call_action("package_delete", id=showcase["id"])
+
+        problems = consistency.find_problems()
+
+        assert "deleted_showcase" not in problems
+        assert all(p["count"] == 0 for p in problems.values())
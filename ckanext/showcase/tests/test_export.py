@@ -0,0 +1,115 @@
+import csv
+import io
+import os
+
+import pytest
+
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import export
+from ckanext.showcase.model import ShowcasePackageAssociation
+
+
+def _associate(showcase, dataset):
+    ShowcasePackageAssociation.create(showcase_id=showcase["id"],
+                                      package_id=dataset["id"],
+                                      organization_id=dataset["owner_org"])
+
+
+def _read_csv(directory, name):
+    with io.open(os.path.join(directory, name + ".csv"),
+                 newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def graph():
+    org = factories.Organization()
+    other_org = factories.Organization()
+    factories.Organization()
+    datasets = [factories.Dataset(owner_org=org["id"]),
+                factories.Dataset(owner_org=other_org["id"])]
+    factories.Dataset(owner_org=org["id"])
+    showcases = [factories.Dataset(type="showcase") for i in range(2)]
+    _associate(showcases[0], datasets[0])
+    _associate(showcases[0], datasets[1])
+    _associate(showcases[1], datasets[1])
+
+    # Neither the dataset only in a deleted showcase nor its organization
+    # are exported
+    deleted_showcase = factories.Dataset(type="showcase")
+    _associate(deleted_showcase, datasets[0])
+    _associate(deleted_showcase, factories.Dataset(
+        owner_org=factories.Organization()["id"]))
+    helpers.call_action("package_delete", id=deleted_showcase["id"])
+
+    return {"organizations": [org, other_org], "datasets": datasets,
+            "showcases": showcases}
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestExportGraph(object):
+    def test_export_csv(self, graph, tmpdir):
+        """
+        The associations of active showcases and datasets are exported as
+        edges, along with the showcases, the datasets in active showcases
+        and their organizations.
+        """
+        directory = str(tmpdir)
+
+        counts = export.export_graph(directory, batch_size=2)
+
+        assert counts == {"edges": 3, "showcases": 2, "datasets": 2,
+                          "organizations": 2}
+
+        edges = _read_csv(directory, "edges")
+        assert sorted((e["showcase_id"], e["dataset_id"],
+                       e["organization_id"]) for e in edges) == sorted([
+            (graph["showcases"][0]["id"], graph["datasets"][0]["id"],
+             graph["organizations"][0]["id"]),
+            (graph["showcases"][0]["id"], graph["datasets"][1]["id"],
+             graph["organizations"][1]["id"]),
+            (graph["showcases"][1]["id"], graph["datasets"][1]["id"],
+             graph["organizations"][1]["id"]),
+        ])
+        assert sorted(s["name"] for s in _read_csv(directory, "showcases")) \
+            == sorted(s["name"] for s in graph["showcases"])
+        assert sorted(d["id"] for d in _read_csv(directory, "datasets")) \
+            == sorted(d["id"] for d in graph["datasets"])
+        assert sorted(o["name"] for o in
+                      _read_csv(directory, "organizations")) \
+            == sorted(o["name"] for o in graph["organizations"])
+
+    def test_export_parquet(self, graph, tmpdir):
+        """
+        The graph can be exported as Parquet when pyarrow is installed.
+        """
+        pq = pytest.importorskip("pyarrow.parquet")
+        directory = str(tmpdir)
+
+        export.export_graph(directory, format="parquet", batch_size=2)
+
+        edges = pq.read_table(os.path.join(directory, "edges.parquet"))
+        datasets = pq.read_table(os.path.join(directory, "datasets.parquet"))
+        assert edges.num_rows == 3
+        assert edges.column_names == [
+            "showcase_id", "dataset_id", "organization_id"]
+        assert datasets.column("private").to_pylist() == [False, False]
+
+    def test_export_empty(self, tmpdir):
+        """
+        Without showcases, the files only have their header.
+        """
+        directory = str(tmpdir)
+
+        counts = export.export_graph(directory)
+
+        assert set(counts.values()) == {0}
+        assert _read_csv(directory, "edges") == []
+
+    def test_unknown_format(self, tmpdir):
+        """
+        Unknown formats raise a ValueError.
+        """
+        with pytest.raises(ValueError):
+            export.export_graph(str(tmpdir), format="xlsx")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+'''
+Checks that loading the plugin stays cheap.
+
+Imports are run in a fresh interpreter, as by the time the tests run
+everything has already been imported. The time budget for the showcase
+modules themselves can be changed with SHOWCASE_MAX_IMPORT_MS.
+'''
+
+import os
+import subprocess
+import sys
+
+MAX_IMPORT_MS = float(os.environ.get("SHOWCASE_MAX_IMPORT_MS", 100))
+
+# Only needed once a view, command, action, auth function, schema, template
+# helper or the model is used. Core CKAN modules are not checked, as the
+# plugin toolkit and the dataset form base class already import most of CKAN.
+LAZY_MODULES = [
+    "ckanext.showcase.cli",
+    "ckanext.showcase.utils",
+    "ckanext.showcase.views",
+    "ckanext.showcase.logic.action",
+    "ckanext.showcase.logic.auth",
+    "ckanext.showcase.logic.schema",
+    "ckanext.showcase.logic.helpers",
+    "ckanext.showcase.model",
+]
+
+
+def _run(code, *args):
+    return subprocess.run(
+        [sys.executable] + list(args) + ["-c", code],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+
+
+def _import_times(module):
+    '''
+    Return the self import time, in microseconds, of every module imported
+    by `module`, as reported by ``python -X importtime``.
+    '''
+    output = _run("import {0}".format(module), "-X", "importtime").stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = int(self_time)
+    return times
+
+
+class TestImports(object):
+    def test_plugin_import_is_lazy(self):
+        """
+        Importing the plugin doesn't import the views, CLI commands, actions,
+        auth functions, schemas, template helpers or model.
+        """
+        output = _run(
+            "import sys, ckanext.showcase.plugin\n"
+            "print('\\n'.join(sys.modules))").stdout
+        imported = set(output.splitlines())
+
+        assert "ckanext.showcase.plugin" in imported
+        for module in LAZY_MODULES:
+            assert module not in imported, \
+                "{0} is imported with the plugin".format(module)
+
+    def test_plugin_import_time(self):
+        """
+        The showcase modules imported with the plugin load within budget.
+        """
+        times = _import_times("ckanext.showcase.plugin")
+
+        showcase_times = dict((name, t) for name, t in times.items()
+                              if name.startswith("ckanext.showcase"))
+        total_ms = sum(showcase_times.values()) / 1000.0
+
+        assert "ckanext.showcase.plugin" in showcase_times
+        assert total_ms <= MAX_IMPORT_MS, \
+            "Showcase modules took {0:.1f}ms to import: {1}".format(
+                total_ms, sorted(showcase_times.items(),
+                                 key=lambda item: -item[1]))
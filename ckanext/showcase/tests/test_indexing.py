@@ -0,0 +1,168 @@
+import datetime
+
+import pytest
+
+import ckan.model as model
+from ckan.lib import search
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import indexing
+from ckanext.showcase.model import ShowcasePackageAssociation
+
+
+def _associate(showcase, dataset):
+    ShowcasePackageAssociation.create(showcase_id=showcase["id"],
+                                      package_id=dataset["id"],
+                                      organization_id=dataset["owner_org"])
+
+
+def _search_count(fq):
+    return helpers.call_action("package_search", fq=fq)["count"]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestIndexing(object):
+    def test_showcase_ids(self):
+        """
+        Only active showcases are selected.
+        """
+        factories.Dataset()
+        showcase = factories.Dataset(type="showcase")
+        deleted = factories.Dataset(type="showcase")
+        helpers.call_action("package_delete", id=deleted["id"])
+
+        assert indexing.showcase_ids() == [showcase["id"]]
+
+    def test_dataset_ids_for_showcases(self):
+        """
+        The datasets of the given showcases, by id or name, are selected.
+        """
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(3)]
+        showcase1 = factories.Dataset(type="showcase")
+        showcase2 = factories.Dataset(type="showcase")
+        _associate(showcase1, datasets[0])
+        _associate(showcase1, datasets[1])
+        _associate(showcase2, datasets[1])
+        _associate(showcase2, datasets[2])
+
+        ids = indexing.dataset_ids_for_showcases(
+            [showcase1["name"], showcase2["id"]])
+
+        assert sorted(ids) == sorted(d["id"] for d in datasets)
+
+    def test_dataset_ids_for_missing_showcase(self):
+        """
+        Unknown showcases, or datasets given as showcases, raise an error.
+        """
+        dataset = factories.Dataset()
+
+        with pytest.raises(ValueError):
+            indexing.dataset_ids_for_showcases(["not-a-showcase"])
+        with pytest.raises(ValueError):
+            indexing.dataset_ids_for_showcases([dataset["id"]])
+
+    def test_ids_modified_since(self):
+        """
+        Showcases modified since the date and their datasets are selected,
+        but not older ones.
+        """
+        org = factories.Organization()
+        old_dataset = factories.Dataset(owner_org=org["id"])
+        old_showcase = factories.Dataset(type="showcase")
+        _associate(old_showcase, old_dataset)
+        since = datetime.datetime.utcnow()
+        model.Session.query(model.Package).update(
+            {"metadata_modified": since - datetime.timedelta(days=1)})
+        model.repo.commit()
+
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase, old_dataset)
+        _associate(old_showcase, dataset)
+
+        ids = indexing.ids_modified_since(since)
+
+        assert sorted(ids) == sorted([
+            old_dataset["id"], old_showcase["id"],
+            dataset["id"], showcase["id"]])
+
+    def test_ids_modified_since_nothing(self):
+        """
+        Nothing is selected when nothing changed.
+        """
+        factories.Dataset(type="showcase")
+
+        assert indexing.ids_modified_since(
+            datetime.datetime.utcnow() + datetime.timedelta(days=1)) == []
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_reindex(self, workers):
+        """
+        The given packages are indexed again, in batches.
+        """
+        showcases = [factories.Dataset(type="showcase") for i in range(5)]
+        search.clear_all()
+        assert _search_count("dataset_type:showcase") == 0
+
+        progress = []
+        done, failed = indexing.reindex(
+            [s["id"] for s in showcases], batch_size=2, workers=workers,
+            progress=progress.append)
+
+        assert done == 5
+        assert failed == []
+        assert progress[-1] == 5
+        assert len(progress) == 3
+        assert _search_count("dataset_type:showcase") == 5
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_reindex_failures(self, workers):
+        """
+        Packages that can't be indexed are reported, and the rest of their
+        batch is still indexed.
+        """
+        showcases = [factories.Dataset(type="showcase") for i in range(3)]
+        search.clear_all()
+
+        done, failed = indexing.reindex(
+            [showcases[0]["id"], "not-a-package", showcases[1]["id"],
+             showcases[2]["id"]], batch_size=2, workers=workers)
+
+        assert done == 3
+        assert failed == ["not-a-package"]
+        assert _search_count("dataset_type:showcase") == 3
+
+    def test_ids_modified_since_association_changes(self):
+        """
+        Showcases and datasets whose associations were created or deleted
+        since the date are selected, even if they were not modified.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        org = factories.Organization()
+        added = factories.Dataset(owner_org=org["id"])
+        removed = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        helpers.call_action(
+            "ckanext_showcase_package_association_create", context=context,
+            showcase_id=showcase["id"], package_id=removed["id"])
+        since = datetime.datetime.utcnow()
+        model.Session.query(model.Package).update(
+            {"metadata_modified": since - datetime.timedelta(days=1)})
+        model.repo.commit()
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create", context=context,
+            showcase_id=showcase["id"], package_id=added["id"])
+        helpers.call_action(
+            "ckanext_showcase_package_association_delete", context=context,
+            showcase_id=showcase["id"], package_id=removed["id"])
+        model.Session.query(model.Package).update(
+            {"metadata_modified": since - datetime.timedelta(days=1)})
+        model.repo.commit()
+
+        ids = indexing.ids_modified_since(since)
+
+        assert sorted(ids) == sorted(
+            [showcase["id"], added["id"], removed["id"]])
@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+
+from ckan.lib.helpers import url_for
+from ckan.tests import factories, helpers
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.ckan_config("ckanext.showcase.instrumentation", "true")
+class TestInstrumentation(object):
+    def test_action_call_is_logged(self, caplog):
+        """
+        Instrumented actions log their duration, SQL statement and
+        package_search counts.
+        """
+        showcase = factories.Dataset(type="showcase")
+
+        with caplog.at_level(logging.INFO,
+                             logger="ckanext.showcase.instrumentation"):
+            helpers.call_action(
+                "ckanext_showcase_package_list", showcase_id=showcase["id"])
+
+        messages = [r.getMessage() for r in caplog.records]
+        action_lines = [
+            m for m in messages
+            if m.startswith("showcase_action name=ckanext_showcase_package_list")]
+        assert len(action_lines) == 1
+        assert "duration_ms=" in action_lines[0]
+        assert "sql=" in action_lines[0]
+        assert "package_search=" in action_lines[0]
+
+        assert any(
+            m.startswith("showcase_auth name=ckanext_showcase_package_list")
+            for m in messages)
+
+    def test_server_timing_header(self, app):
+        """
+        Showcase views return a Server-Timing header.
+        """
+        showcase = factories.Dataset(type="showcase")
+
+        response = app.get(
+            url_for("showcase_blueprint.read", id=showcase["name"]))
+
+        server_timing = response.headers["Server-Timing"]
+        assert server_timing.startswith("total;dur=")
+        assert "sql;desc=" in server_timing
+        assert "ckanext_showcase_package_list;dur=" in server_timing
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestInstrumentationDisabled(object):
+    def test_no_server_timing_header(self, app):
+        """
+        No Server-Timing header is added unless instrumentation is enabled.
+        """
+        response = app.get(url_for("showcase_blueprint.index"))
+
+        assert "Server-Timing" not in response.headers
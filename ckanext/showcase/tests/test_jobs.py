@@ -0,0 +1,118 @@
+import pytest
+
+import ckan.model as model
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import jobs
+
+
+def _create_association(showcase_id, package_id, **context):
+    sysadmin = factories.Sysadmin()
+    context["user"] = sysadmin["name"]
+    helpers.call_action(
+        "ckanext_showcase_package_association_create",
+        context=context,
+        package_id=package_id,
+        showcase_id=showcase_id,
+    )
+
+
+def _indexed_num_datasets():
+    results = helpers.call_action(
+        "package_search", fq="dataset_type:showcase"
+    )["results"]
+    return results[0]["num_datasets"]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestRefreshAssociation(object):
+    def test_association_create_reindexes_showcase(self):
+        """
+        Creating an association refreshes the indexed num_datasets of the
+        showcase.
+        """
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset(owner_org=org["id"])
+
+        _create_association(showcase["id"], dataset["id"])
+
+        assert _indexed_num_datasets() == 1
+
+    def test_refresh_association_after_deferred_commit(self):
+        """
+        Deferred writes are picked up by calling refresh_association once
+        they have been committed.
+        """
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset(owner_org=org["id"])
+
+        _create_association(showcase["id"], dataset["id"], defer_commit=True)
+        model.repo.commit()
+
+        assert _indexed_num_datasets() == 0
+
+        jobs.refresh_association(showcase["id"], [dataset["id"]])
+
+        assert _indexed_num_datasets() == 1
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.ckan_config("ckanext.showcase.background_jobs", "true")
+class TestBackgroundJobs(object):
+    def setup_method(self):
+        helpers.call_action("job_clear")
+
+    def test_association_create_enqueues_job(self):
+        """
+        With background jobs enabled, the association refresh is enqueued
+        instead of being run within the action.
+        """
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset(owner_org=org["id"])
+
+        _create_association(showcase["id"], dataset["id"])
+
+        job_list = helpers.call_action("job_list")
+        assert len(job_list) == 1
+        assert job_list[0]["title"] == "Refresh showcase {0}".format(
+            showcase["id"])
+
+    def test_association_create_defer_commit_enqueues_nothing(self):
+        """
+        Deferred writes leave the refresh to the caller.
+        """
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset(owner_org=org["id"])
+
+        _create_association(showcase["id"], dataset["id"], defer_commit=True)
+
+        assert helpers.call_action("job_list") == []
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestReindexPackages(object):
+    def test_purged_dataset_skipped(self):
+        """
+        A dataset purged after the job was enqueued doesn't stop the others
+        from being reindexed.
+        """
+        org = factories.Organization()
+        showcase = factories.Dataset(type="showcase")
+        dataset = factories.Dataset(owner_org=org["id"])
+        purged = factories.Dataset(owner_org=org["id"])
+        _create_association(showcase["id"], dataset["id"])
+        model.Session.query(model.Package) \
+            .filter(model.Package.id == showcase["id"]) \
+            .one().title = "Renamed"
+        model.repo.commit()
+        helpers.call_action("dataset_purge", id=purged["id"])
+
+        jobs.reindex_packages([purged["id"], showcase["id"]])
+
+        assert helpers.call_action(
+            "package_search", fq="dataset_type:showcase"
+        )["results"][0]["title"] == "Renamed"
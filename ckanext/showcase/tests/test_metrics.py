@@ -0,0 +1,108 @@
+import pytest
+
+from ckan.lib.redis import connect_to_redis
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import metrics
+
+
+@pytest.fixture
+def clean_metrics():
+    redis_conn = connect_to_redis()
+    for key in redis_conn.keys("{0}:*".format(metrics.KEY_PREFIX)):
+        redis_conn.delete(key)
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index",
+                         "clean_metrics")
+@pytest.mark.ckan_config("ckanext.showcase.metrics", "true")
+class TestMetrics(object):
+    def test_metrics_sysadmin(self, app):
+        """
+        Sysadmins can read the metrics, which include the totals.
+        """
+        sysadmin = factories.Sysadmin()
+        factories.Dataset(type="showcase")
+
+        response = app.get(
+            "/showcase/metrics",
+            status=200,
+            extra_environ={"REMOTE_USER": str(sysadmin["name"])},
+        )
+
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "# TYPE showcase_action_duration_seconds histogram" in \
+            response.body
+        assert "showcase_showcases 1\n" in response.body
+        assert "showcase_associations 0\n" in response.body
+
+    def test_metrics_normal_user(self, app):
+        """
+        Normal users can't read the metrics.
+        """
+        user = factories.User()
+
+        app.get(
+            "/showcase/metrics",
+            status=401,
+            extra_environ={"REMOTE_USER": str(user["name"])},
+        )
+
+    @pytest.mark.ckan_config("ckanext.showcase.metrics.token", "s3cr3t")
+    def test_metrics_token(self, app):
+        """
+        The configured token gives access to the metrics.
+        """
+        app.get(
+            "/showcase/metrics",
+            status=200,
+            headers={"Authorization": "Bearer s3cr3t"},
+        )
+
+    @pytest.mark.ckan_config("ckanext.showcase.metrics.token", "s3cr3t")
+    def test_metrics_token_non_ascii(self, app):
+        """
+        A wrong token with non ASCII characters is refused, not an error.
+        """
+        app.get(
+            "/showcase/metrics",
+            status=401,
+            headers={"Authorization": u"Bearer s3cr3t\u00e9"},
+        )
+
+    def test_metrics_association_writes_and_latency(self):
+        """
+        Association writes are counted and action durations recorded.
+        """
+        sysadmin = factories.Sysadmin()
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create",
+            context={"user": sysadmin["name"]},
+            package_id=dataset["id"],
+            showcase_id=showcase["id"],
+        )
+
+        output = metrics.render()
+
+        assert 'showcase_association_writes_total{operation="create"} 1' \
+            in output
+        assert ('showcase_action_duration_seconds_count'
+                '{action="ckanext_showcase_package_association_create"} 1'
+                in output)
+        assert "showcase_associations 1\n" in output
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db")
+class TestMetricsDisabled(object):
+    def test_metrics_not_found(self, app):
+        sysadmin = factories.Sysadmin()
+
+        app.get(
+            "/showcase/metrics",
+            status=404,
+            extra_environ={"REMOTE_USER": str(sysadmin["name"])},
+        )
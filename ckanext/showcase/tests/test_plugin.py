@@ -4,6 +4,7 @@ from bs4 import BeautifulSoup
 from ckan.lib.helpers import url_for
 
 
+import ckan.plugins as plugins
 from ckan.plugins import toolkit as tk
 import ckan.model as model
 
@@ -224,9 +225,9 @@ class TestDatasetView(object):
         assert "my-second-showcase" in response
         assert "my-third-showcase" not in response
 
-    def test_dataset_showcase_page_add_to_showcase_dropdown_list(self, app):
+    def test_dataset_showcase_page_add_to_showcase_autocomplete(self, app):
         """
-        Add to showcase dropdown only lists showcases that aren't already
+        Add to showcase field only suggests showcases that aren't already
         associated with dataset.
         """
         sysadmin = factories.Sysadmin()
@@ -251,14 +252,30 @@ class TestDatasetView(object):
             organization_id=org["id"]
         )
 
+        env = {"REMOTE_USER": str(sysadmin["name"])}
         response = app.get(
             url=url_for("showcase_blueprint.dataset_showcase_list", id=dataset["id"]),
-            extra_environ={"REMOTE_USER": str(sysadmin["name"])},
+            extra_environ=env,
+        )
+
+        autocomplete_url = url_for(
+            "showcase_blueprint.autocomplete", package_id=dataset["id"])
+        assert autocomplete_url in response.body
+
+        response = app.get(
+            url=url_for(
+                "showcase_blueprint.autocomplete",
+                package_id=dataset["id"],
+                q="my",
+            ),
+            extra_environ=env,
         )
+        showcase_ids = [
+            r["id"] for r in response.json["ResultSet"]["Result"]]
 
-        assert f'<option value="{showcase_one["id"]}' not in response.body
-        assert f'<option value="{showcase_two["id"]}' in response.body
-        assert f'<option value="{showcase_three["id"]}' in response.body
+        assert showcase_one["id"] not in showcase_ids
+        assert showcase_two["id"] in showcase_ids
+        assert showcase_three["id"] in showcase_ids
 
     def test_dataset_showcase_page_add_showcase_button_submit(self, app):
         """
@@ -450,3 +467,29 @@ class TestCKEditor(object):
             url=url_for("showcase_blueprint.read", id="my-showcase",), extra_environ=env,
         )
         assert '<div class="ck-content">' in response.body
+
+
+@pytest.mark.usefixtures("with_plugins")
+class TestTranslation(object):
+    def test_i18n_locales_from_directory(self):
+        """
+        Locales are the subdirectories of the i18n directory.
+        """
+        plugin = plugins.get_plugin("showcase")
+
+        locales = plugin.i18n_locales()
+
+        assert "es" in locales
+        assert "__pycache__" not in locales
+        assert plugin.i18n_directory().endswith("i18n")
+
+    @pytest.mark.ckan_config("ckanext.showcase.i18n_locales", "es fr")
+    def test_i18n_locales_from_config(self, monkeypatch):
+        """
+        Locales set in the config are used without listing the directory.
+        """
+        plugin = plugins.get_plugin("showcase")
+        monkeypatch.setattr(
+            "os.listdir", lambda path: pytest.fail("Directory was listed"))
+
+        assert plugin.i18n_locales() == ["es", "fr"]
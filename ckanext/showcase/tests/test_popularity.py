@@ -0,0 +1,108 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+import ckan.model as model
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import popularity
+
+
+def _track(package, count, days_ago=0):
+    model.Session.execute(text(
+        "INSERT INTO tracking_summary "
+        "(url, package_id, tracking_type, count, running_total, "
+        "recent_views, tracking_date) "
+        "VALUES (:url, :package_id, 'page', :count, 0, 0, :date)"), {
+            "url": "/showcase/" + package["name"],
+            "package_id": package["id"],
+            "count": count,
+            "date": datetime.date.today() - datetime.timedelta(days=days_ago),
+    })
+    model.Session.commit()
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index",
+                         "clean_redis")
+class TestPopularity(object):
+    def test_popular_showcase_ids(self):
+        """
+        Showcases are ranked by their views over the last days, and
+        datasets, unviewed and private showcases are left out.
+        """
+        first = factories.Dataset(type="showcase")
+        second = factories.Dataset(type="showcase")
+        factories.Dataset(type="showcase")
+        private = factories.Dataset(type="showcase", private=True,
+                                    owner_org=factories.Organization()["id"])
+        dataset = factories.Dataset()
+        _track(first, 5)
+        _track(first, 5, days_ago=3)
+        _track(second, 7)
+        _track(second, 100, days_ago=30)
+        _track(private, 50)
+        _track(dataset, 50)
+
+        assert popularity.popular_showcase_ids(10) == [
+            (first["id"], 10), (second["id"], 7)]
+        assert popularity.popular_showcase_ids(1) == [(first["id"], 10)]
+
+    def test_no_tracking_summary(self, monkeypatch):
+        """
+        Without the tracking tables nothing is ranked, and the session is
+        left usable.
+        """
+        showcase = factories.Dataset(type="showcase")
+        monkeypatch.setattr(popularity, "has_tracking_summary", lambda: False)
+
+        assert popularity.popular_showcase_ids(10) == []
+        assert model.Package.get(showcase["id"]) is not None
+
+    @pytest.mark.ckan_config("ckanext.showcase.popular.size", "2")
+    def test_update(self):
+        """
+        The ranking is computed by update and read back from the cache until
+        the next update.
+        """
+        first = factories.Dataset(type="showcase")
+        second = factories.Dataset(type="showcase")
+        _track(first, 5)
+
+        assert popularity.update() == [[first["id"], 5]]
+
+        _track(second, 10)
+        assert popularity.get_popular() == [[first["id"], 5]]
+
+        assert popularity.update() == [[second["id"], 10], [first["id"], 5]]
+
+    def test_showcase_list_popular(self):
+        """
+        ckanext_showcase_list returns the most viewed showcases when ordered
+        by popularity.
+        """
+        first = factories.Dataset(type="showcase")
+        second = factories.Dataset(type="showcase")
+        _track(first, 1)
+        _track(second, 2)
+
+        showcase_list = helpers.call_action(
+            "ckanext_showcase_list", order_by="popular", limit=1)
+
+        assert [s["name"] for s in showcase_list] == [second["name"]]
+        assert showcase_list[0]["views_recent"] == 2
+
+    def test_showcase_list_same_shape(self):
+        """
+        Popular showcases have the same fields as the recent ones, plus
+        their number of views.
+        """
+        showcase = factories.Dataset(type="showcase")
+        _track(showcase, 1)
+
+        popular = helpers.call_action(
+            "ckanext_showcase_list", order_by="popular")
+        recent = helpers.call_action("ckanext_showcase_list")
+
+        assert set(popular[0]) - set(recent[0]) == {"views_recent"}
+        assert set(recent[0]) - set(popular[0]) == set()
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from ckan.lib.helpers import url_for
+from ckan.tests import factories
+
+from ckanext.showcase import profiling
+
+
+@pytest.fixture
+def profiles_dir(ckan_config, monkeypatch, tmp_path):
+    monkeypatch.setitem(ckan_config, "ckanext.showcase.profiling.directory",
+                        str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.ckan_config("ckanext.showcase.profiling", "true")
+@pytest.mark.ckan_config("ckanext.showcase.profiling.threshold", "0")
+class TestProfiling(object):
+    def test_slow_request_is_profiled(self, app, profiles_dir):
+        """
+        Requests slower than the threshold get a profile with their metadata.
+        """
+        showcase = factories.Dataset(type="showcase")
+
+        app.get(url_for("showcase_blueprint.read", id=showcase["name"]))
+
+        profiles = profiling.list_profiles()
+        assert len(profiles) == 1
+        assert profiles[0]["path"] == "/showcase/{0}".format(showcase["name"])
+        assert profiles[0]["endpoint"] == "showcase_blueprint.read"
+        assert profiles[0]["status"] == 200
+        assert os.path.exists(
+            str(profiles_dir / (profiles[0]["id"] + ".prof")))
+
+    @pytest.mark.ckan_config("ckanext.showcase.profiling.threshold", "60000")
+    def test_fast_request_is_not_profiled(self, app, profiles_dir):
+        """
+        Requests faster than the threshold are not stored.
+        """
+        app.get(url_for("showcase_blueprint.index"))
+
+        assert profiling.list_profiles() == []
+
+    @pytest.mark.ckan_config("ckanext.showcase.profiling.buffer_size", "2")
+    def test_ring_buffer(self, app, profiles_dir):
+        """
+        Only the most recent profiles are kept.
+        """
+        for i in range(4):
+            app.get(url_for("showcase_blueprint.index"))
+
+        assert len(profiling.list_profiles()) == 2
+        assert len(os.listdir(str(profiles_dir))) == 4
+
+    def test_profiles_page(self, app, profiles_dir):
+        """
+        Sysadmins can list and view the stored profiles.
+        """
+        sysadmin = factories.Sysadmin()
+        env = {"REMOTE_USER": str(sysadmin["name"])}
+        app.get(url_for("showcase_blueprint.index"))
+        profile_id = profiling.list_profiles()[0]["id"]
+
+        response = app.get(url_for("showcase_blueprint.profiles"),
+                           extra_environ=env, status=200)
+        assert url_for("showcase_blueprint.profile",
+                       profile_id=profile_id) in response.body
+
+        response = app.get(
+            url_for("showcase_blueprint.profile", profile_id=profile_id,
+                    sort="tottime"),
+            extra_environ=env, status=200)
+        assert "function calls" in response.body
+
+    def test_profiles_page_normal_user(self, app, profiles_dir):
+        """
+        Normal users can't see the profiles.
+        """
+        user = factories.User()
+
+        app.get(url_for("showcase_blueprint.profiles"),
+                extra_environ={"REMOTE_USER": str(user["name"])},
+                status=401)
+
+    def test_profile_not_found(self, app, profiles_dir):
+        """
+        Unknown or malformed profile ids give a 404.
+        """
+        sysadmin = factories.Sysadmin()
+
+        app.get(url_for("showcase_blueprint.profile",
+                        profile_id="../../etc/passwd"),
+                extra_environ={"REMOTE_USER": str(sysadmin["name"])},
+                status=404)
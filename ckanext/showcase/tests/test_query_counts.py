@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+Guards against N+1 query patterns in the showcase hot paths.
+
+Each test measures the number of SQL statements of a code path, grows the
+site (more showcases, datasets or associations), and checks the number of
+statements stays the same, as well as under a fixed maximum.
+'''
+
+import pytest
+
+import ckan.model as model
+import ckan.plugins as plugins
+import ckan.plugins.toolkit as toolkit
+from ckan.lib.helpers import url_for
+from ckan.tests import factories, helpers
+
+from ckanext.showcase.logic import helpers as showcase_helpers
+from ckanext.showcase.model import ShowcasePackageAssociation
+
+
+def _associate(showcase_id, datasets):
+    for dataset in datasets:
+        ShowcasePackageAssociation.create(
+            package_id=dataset["id"],
+            showcase_id=showcase_id,
+            organization_id=dataset["owner_org"],
+            defer_commit=True)
+    model.repo.commit()
+
+
+def _measure(count_queries, func):
+    # Warm up, so one-off work doesn't count
+    func()
+    with count_queries() as counter:
+        func()
+    return counter.count
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestQueryCounts(object):
+    def _assert_constant(self, count_queries, assert_max_queries, func,
+                         grow, max_queries):
+        small = _measure(count_queries, func)
+        grow()
+        large = _measure(count_queries, func)
+
+        assert large <= small, \
+            "Query count grew from {0} to {1}".format(small, large)
+        with assert_max_queries(max_queries):
+            func()
+
+    def test_add_to_pkg_dict(self, count_queries, assert_max_queries):
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(10)]
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase["id"], datasets[:1])
+
+        plugin = plugins.get_plugin("showcase")
+        pkg_dict = helpers.call_action("package_show", id=showcase["id"])
+
+        def run():
+            plugin._add_to_pkg_dict(
+                {"model": model, "session": model.Session}, dict(pkg_dict))
+
+        self._assert_constant(
+            count_queries, assert_max_queries, run,
+            lambda: _associate(showcase["id"], datasets[1:]), 15)
+
+    def test_read_view(self, app, count_queries, assert_max_queries):
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(10)]
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase["id"], datasets[:1])
+        url = url_for("showcase_blueprint.read", id=showcase["name"])
+
+        self._assert_constant(
+            count_queries, assert_max_queries,
+            lambda: app.get(url, status=200),
+            lambda: _associate(showcase["id"], datasets[1:]), 100)
+
+    def test_manage_datasets_view(self, app, count_queries,
+                                  assert_max_queries):
+        sysadmin = factories.Sysadmin()
+        env = {"REMOTE_USER": str(sysadmin["name"])}
+        org = factories.Organization()
+        datasets = [factories.Dataset(owner_org=org["id"]) for i in range(10)]
+        showcase = factories.Dataset(type="showcase")
+        _associate(showcase["id"], datasets[:1])
+        url = url_for("showcase_blueprint.manage_datasets",
+                      id=showcase["name"])
+
+        self._assert_constant(
+            count_queries, assert_max_queries,
+            lambda: app.get(url, extra_environ=env, status=200),
+            lambda: _associate(showcase["id"], datasets[1:]), 150)
+
+    def test_dataset_showcase_list(self, app, count_queries,
+                                   assert_max_queries):
+        sysadmin = factories.Sysadmin()
+        env = {"REMOTE_USER": str(sysadmin["name"])}
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        showcases = [factories.Dataset(type="showcase") for i in range(10)]
+        _associate(showcases[0]["id"], [dataset])
+        url = url_for("showcase_blueprint.dataset_showcase_list",
+                      id=dataset["name"])
+
+        def grow():
+            for showcase in showcases[1:]:
+                _associate(showcase["id"], [dataset])
+            for i in range(10):
+                factories.Dataset(type="showcase")
+
+        self._assert_constant(
+            count_queries, assert_max_queries,
+            lambda: app.get(url, extra_environ=env, status=200),
+            grow, 100)
+
+    def test_get_recent_showcase_list(self, count_queries,
+                                      assert_max_queries):
+        for i in range(3):
+            factories.Dataset(type="showcase")
+
+        def grow():
+            for i in range(20):
+                factories.Dataset(type="showcase")
+
+        self._assert_constant(
+            count_queries, assert_max_queries,
+            lambda: showcase_helpers.get_recent_showcase_list(num=3),
+            grow, 60)
+
+    def test_auth_functions(self, count_queries, assert_max_queries):
+        user = factories.User()
+        helpers.call_action(
+            "ckanext_showcase_admin_add", context={}, username=user["name"])
+        context = {"model": model, "user": user["name"]}
+
+        def run():
+            for auth in ["ckanext_showcase_create",
+                         "ckanext_showcase_update",
+                         "ckanext_showcase_delete",
+                         "ckanext_showcase_package_association_create",
+                         "ckanext_showcase_package_association_delete",
+                         "ckanext_showcase_upload"]:
+                toolkit.check_access(auth, dict(context), {})
+
+        def grow():
+            for i in range(10):
+                helpers.call_action(
+                    "ckanext_showcase_admin_add", context={},
+                    username=factories.User()["name"])
+                factories.Dataset(type="showcase")
+
+        self._assert_constant(
+            count_queries, assert_max_queries, run, grow, 30)
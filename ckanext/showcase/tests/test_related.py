@@ -0,0 +1,122 @@
+import pytest
+
+from ckan.tests import factories, helpers
+
+from ckanext.showcase import related
+from ckanext.showcase.model import ShowcasePackageAssociation, ShowcaseRelated
+
+
+def _associate(showcase, *datasets):
+    for dataset in datasets:
+        ShowcasePackageAssociation.create(showcase_id=showcase["id"],
+                                          package_id=dataset["id"],
+                                          organization_id=dataset["owner_org"])
+
+
+def _related_ids(showcase):
+    return [r["id"] for r in related.get_related(showcase["id"], 10)]
+
+
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+class TestRelated(object):
+    def test_build(self):
+        """
+        Showcases are related by the Jaccard index of their datasets, most
+        similar first, and showcases sharing nothing are not related.
+        """
+        org = factories.Organization()
+        d = [factories.Dataset(owner_org=org["id"]) for i in range(5)]
+        showcase = factories.Dataset(type="showcase")
+        close = factories.Dataset(type="showcase")
+        far = factories.Dataset(type="showcase")
+        unrelated = factories.Dataset(type="showcase")
+        _associate(showcase, d[0], d[1], d[2])
+        _associate(close, d[0], d[1])
+        _associate(far, d[2], d[3])
+        _associate(unrelated, d[4])
+
+        assert related.build() == 4
+
+        result = related.get_related(showcase["id"], 10)
+        assert [r["id"] for r in result] == [close["id"], far["id"]]
+        assert result[0]["score"] == pytest.approx(2.0 / 3)
+        assert result[0]["shared_datasets"] == 2
+        assert result[1]["score"] == pytest.approx(1.0 / 4)
+        assert _related_ids(unrelated) == []
+
+    def test_build_keeps_max_related(self):
+        """
+        Only the most similar showcases are stored for each showcase.
+        """
+        dataset = factories.Dataset()
+        showcases = [factories.Dataset(type="showcase") for i in range(4)]
+        for showcase in showcases:
+            _associate(showcase, dataset)
+
+        related.build(max_related=2)
+
+        assert ShowcaseRelated.filter(
+            showcase_id=showcases[0]["id"]).count() == 2
+
+    def test_deleted_showcases_and_datasets_ignored(self):
+        """
+        Deleted showcases and datasets don't make showcases related.
+        """
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"])
+        deleted_dataset = factories.Dataset(owner_org=org["id"])
+        showcase = factories.Dataset(type="showcase")
+        other = factories.Dataset(type="showcase")
+        deleted_showcase = factories.Dataset(type="showcase")
+        _associate(showcase, dataset, deleted_dataset)
+        _associate(other, deleted_dataset)
+        _associate(deleted_showcase, dataset)
+        helpers.call_action("package_delete", id=deleted_dataset["id"])
+        helpers.call_action("package_delete", id=deleted_showcase["id"])
+
+        related.build()
+
+        assert _related_ids(showcase) == []
+
+    def test_refresh_on_association_change(self):
+        """
+        Adding or removing datasets updates the related showcases of the
+        showcase and of its neighbours.
+        """
+        sysadmin = factories.Sysadmin()
+        context = {"user": sysadmin["name"]}
+        dataset = factories.Dataset()
+        showcase = factories.Dataset(type="showcase")
+        other = factories.Dataset(type="showcase")
+        _associate(other, dataset)
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_create", context=context,
+            showcase_id=showcase["id"], package_id=dataset["id"])
+
+        assert _related_ids(showcase) == [other["id"]]
+        assert _related_ids(other) == [showcase["id"]]
+
+        helpers.call_action(
+            "ckanext_showcase_package_association_delete", context=context,
+            showcase_id=showcase["id"], package_id=dataset["id"])
+
+        assert _related_ids(showcase) == []
+        assert _related_ids(other) == []
+
+    def test_private_datasets_ignored(self):
+        """
+        Private datasets don't make showcases related, as the number of
+        shared datasets is public.
+        """
+        org = factories.Organization()
+        dataset = factories.Dataset(owner_org=org["id"], private=True)
+        showcase = factories.Dataset(type="showcase")
+        other = factories.Dataset(type="showcase")
+        _associate(showcase, dataset)
+        _associate(other, dataset)
+
+        related.build()
+
+        assert _related_ids(showcase) == []
+        assert _related_ids(other) == []
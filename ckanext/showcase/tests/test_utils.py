@@ -5,10 +5,10 @@ import pytest
 from ckan.lib import helpers
 from ckan.tests import factories, helpers as test_helpers
 
-from ckanext.showcase.utils import markdown_to_html
+from ckanext.showcase.utils import markdown_to_html, seed_load_test_data
 
 
-@pytest.mark.usefixtures("with_plugins", "clean_db")
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
 class TestUtils(object):
 
     def test_markdown_to_html(self):
@@ -39,3 +39,25 @@ class TestUtils(object):
             )
 
         assert migrated_showcase2['notes'] == helpers.render_markdown(showcase2['notes'])
+
+    def test_seed_load_test_data(self):
+        result = seed_load_test_data(3, 5, 2, prefix='lt')
+
+        assert result['organization']['name'] == 'lt-org'
+        assert [s['name'] for s in result['showcases']] == \
+            ['lt-showcase-0', 'lt-showcase-1', 'lt-showcase-2']
+        assert len(result['datasets']) == 5
+
+        packages = test_helpers.call_action(
+            'ckanext_showcase_package_list', showcase_id='lt-showcase-2')
+        assert sorted(p['name'] for p in packages) == \
+            ['lt-dataset-2', 'lt-dataset-3']
+
+    def test_seed_load_test_data_is_repeatable(self):
+        first = seed_load_test_data(2, 3, 2, prefix='lt')
+        second = seed_load_test_data(2, 3, 2, prefix='lt')
+
+        assert [s['id'] for s in first['showcases']] == \
+            [s['id'] for s in second['showcases']]
+        assert len(test_helpers.call_action(
+            'ckanext_showcase_package_list', showcase_id='lt-showcase-0')) == 2
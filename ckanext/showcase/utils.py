@@ -1,18 +1,22 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import print_function
+import hmac
 import json
 import logging
 
 from collections import OrderedDict
 from urllib.parse import urlencode
 
+from flask import Response, jsonify, send_file
+
 import ckan.model as model
 import ckan.plugins as p
 import ckan.logic as logic
 import ckan.lib.navl.dictization_functions as dict_fns
 import ckan.lib.helpers as h
 import ckan.plugins.toolkit as tk
+from ckanext.showcase import cache, jobs, metrics, profiling
 from ckanext.showcase.model import ShowcasePackageAssociation
 
 _ = tk._
@@ -21,6 +25,51 @@ abort = tk.abort
 log = logging.getLogger(__name__)
 DATASET_TYPE_NAME = 'showcase'
 
+# Search index field holding the ids of the showcases a dataset belongs to.
+# The vocab_ prefix maps it to the multi-valued string dynamic field of the
+# CKAN Solr schema, so no schema changes are needed.
+SHOWCASE_IDS_FIELD = 'vocab_showcase_ids'
+
+# Search index fields holding the names of the organizations and groups of
+# the datasets in a showcase, used as facets of the showcase search.
+SHOWCASE_ORGANIZATIONS_FIELD = 'vocab_showcase_organizations'
+SHOWCASE_GROUPS_FIELD = 'vocab_showcase_groups'
+
+
+def add_showcase_display_fields(pkg_dict, num_datasets):
+    '''
+    Add the fields used to display a showcase to its pkg_dict: the display
+    url of its image, its number of datasets, its rendered notes and its
+    redirect_link flag. Returns the pkg_dict.
+    '''
+    from ckanext.showcase.logic.helpers import showcase_get_wysiwyg_editor
+
+    # Add a display url for the Showcase image to the pkg dict so template
+    # has access to it.
+    image_url = pkg_dict.get('image_url')
+    pkg_dict['image_display_url'] = image_url
+    if image_url and not image_url.startswith('http'):
+        pkg_dict['image_url'] = image_url
+        pkg_dict['image_display_url'] = \
+            h.url_for_static('uploads/{0}/{1}'
+                             .format(DATASET_TYPE_NAME,
+                                     pkg_dict.get('image_url')),
+                             qualified=True)
+
+    # Add dataset count
+    pkg_dict['num_datasets'] = num_datasets
+
+    # Rendered notes
+    if showcase_get_wysiwyg_editor() == 'ckeditor':
+        pkg_dict['showcase_notes_formatted'] = pkg_dict['notes']
+    else:
+        pkg_dict['showcase_notes_formatted'] = \
+            h.render_markdown(pkg_dict['notes'])
+
+    # Add redirect_link flag
+    pkg_dict[u'redirect_link'] = pkg_dict.get('redirect_link', False)
+    return pkg_dict
+
 
 def check_edit_view_auth(id):
     context = {
@@ -130,12 +179,18 @@ def manage_datasets_view(id):
             if param.startswith('dataset_'):
                 dataset_ids.append(param[8:])
         if dataset_ids:
+            # Remove all the associations in one transaction and refresh
+            # the showcase once afterwards
+            bulk_context = dict(context, defer_commit=True)
             for dataset_id in dataset_ids:
                 tk.get_action('ckanext_showcase_package_association_delete')(
-                    context, {
+                    bulk_context, {
                         'showcase_id': pkg_dict['id'],
                         'package_id': dataset_id
                     })
+            model.repo.commit()
+            jobs.after_association_change(context, pkg_dict['id'],
+                                          dataset_ids)
             h.flash_success(
                 tk.ungettext(
                     "The dataset has been removed from the showcase.",
@@ -155,11 +210,14 @@ def manage_datasets_view(id):
                 dataset_ids.append(param[8:])
         if dataset_ids:
             successful_adds = []
+            # Add all the associations in one transaction and refresh the
+            # showcase once afterwards
+            bulk_context = dict(context, defer_commit=True)
             for dataset_id in dataset_ids:
                 try:
                     tk.get_action(
                         'ckanext_showcase_package_association_create')(
-                            context, {
+                            bulk_context, {
                                 'showcase_id': pkg_dict['id'],
                                 'package_id': dataset_id
                             })
@@ -168,6 +226,9 @@ def manage_datasets_view(id):
                 else:
                     successful_adds.append(dataset_id)
             if successful_adds:
+                model.repo.commit()
+                jobs.after_association_change(context, pkg_dict['id'],
+                                              successful_adds)
                 h.flash_success(
                     tk.ungettext(
                         "The dataset has been added to the showcase.",
@@ -307,14 +368,9 @@ def _add_dataset_search(showcase_id, showcase_name):
             fq += ' +dataset_type:{type}'.format(type=package_type)
 
         # Only search for packages that aren't already associated with the
-        # Showcase
-        associated_package_ids = ShowcasePackageAssociation.get_package_ids_for_showcase(
-            showcase_id)
-        # flatten resulting list to space separated string
-        if associated_package_ids:
-            associated_package_ids_str = \
-                ' OR '.join([id[0] for id in associated_package_ids])
-            fq += ' !id:({0})'.format(associated_package_ids_str)
+        # Showcase. Datasets are indexed with the ids of their showcases, so
+        # this is a single clause however many datasets are associated.
+        fq += ' -{0}:"{1}"'.format(SHOWCASE_IDS_FIELD, showcase_id)
 
         facets = OrderedDict()
 
@@ -505,16 +561,10 @@ def dataset_showcase_list(id):
         return h.redirect_to(
             h.url_for(list_route, id=pkg_dict['name']))
 
-    pkg_showcase_ids = [showcase['id'] for showcase in showcase_list]
-    site_showcases = tk.get_action('ckanext_showcase_list')(context, {})
-
-    showcase_dropdown = [[showcase['id'], showcase['title']]
-                           for showcase in site_showcases
-                           if showcase['id'] not in pkg_showcase_ids]
-
+    # The 'Add to showcase' field queries showcase_autocomplete as the user
+    # types, so there's no need to load all the showcases of the site here.
     extra_vars = {
         'pkg_dict': pkg_dict,
-        'showcase_dropdown': showcase_dropdown,
         'showcase_list': showcase_list,
     }
 
@@ -522,6 +572,65 @@ def dataset_showcase_list(id):
                      extra_vars=extra_vars)
 
 
+def showcase_autocomplete():
+    '''
+    Return the showcases matching the `q` request parameter, in the format
+    expected by CKAN's autocomplete javascript module.
+    '''
+    context = {
+        'model': model,
+        'session': model.Session,
+        'user': tk.g.user or tk.g.author,
+        'auth_user_obj': tk.g.userobj
+    }
+    data_dict = {
+        'q': tk.request.args.get('q', ''),
+        'limit': tk.request.args.get('limit', 10),
+    }
+    if tk.request.args.get('package_id'):
+        data_dict['package_id'] = tk.request.args['package_id']
+
+    try:
+        showcases = tk.get_action('ckanext_showcase_autocomplete')(
+            context, data_dict)
+    except tk.NotAuthorized:
+        return tk.abort(401, _('Unauthorized to search showcases'))
+    except tk.ValidationError as e:
+        return tk.abort(400, str(e.error_dict))
+
+    return jsonify({'ResultSet': {'Result': showcases}})
+
+
+def metrics_view():
+    '''
+    Export the showcase metrics in the Prometheus text format.
+
+    Only available to sysadmins, or to clients sending the token set in
+    ``ckanext.showcase.metrics.token`` as a bearer token.
+    '''
+    if not metrics.is_enabled():
+        return tk.abort(404, _('Metrics are not enabled'))
+
+    token = tk.config.get('ckanext.showcase.metrics.token')
+    authorization = tk.request.headers.get('Authorization', '')
+    # compare_digest only accepts ASCII strings, so compare bytes instead
+    if not (token and hmac.compare_digest(
+            authorization.encode('utf-8'),
+            'Bearer {0}'.format(token).encode('utf-8'))):
+        context = {
+            'model': model,
+            'session': model.Session,
+            'user': tk.g.user or tk.g.author
+        }
+        try:
+            tk.check_access('sysadmin', context, {})
+        except tk.NotAuthorized:
+            return tk.abort(401, _('User not authorized to view page'))
+
+    return Response(metrics.render(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def manage_showcase_admins():
     context = {
         'model': model,
@@ -562,6 +671,62 @@ def manage_showcase_admins():
                      extra_vars={'showcase_admins': showcase_admins})
 
 
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+
+def _check_sysadmin():
+    context = {
+        'model': model,
+        'session': model.Session,
+        'user': tk.g.user or tk.g.author
+    }
+
+    try:
+        tk.check_access('sysadmin', context, {})
+    except tk.NotAuthorized:
+        return tk.abort(401, _('User not authorized to view page'))
+
+
+def showcase_profiles_view():
+    '''
+    List the profiles of the slow showcase requests.
+    '''
+    _check_sysadmin()
+
+    return tk.render('admin/showcase_profiles.html',
+                     extra_vars={
+                         'profiles': profiling.list_profiles(),
+                         'profiling_enabled': profiling.is_enabled(),
+                         'threshold': profiling.get_threshold(),
+                     })
+
+
+def showcase_profile_view(profile_id):
+    '''
+    Show the top functions of a profile, or download its stats file.
+    '''
+    _check_sysadmin()
+
+    if tk.request.args.get('download'):
+        path = profiling.get_profile_path(profile_id)
+        if not path:
+            return tk.abort(404, _('Profile not found'))
+        return send_file(path, mimetype='application/octet-stream',
+                         as_attachment=True)
+
+    sort = tk.request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        sort = 'cumulative'
+    profile = profiling.get_profile(profile_id, sort=sort)
+    if not profile:
+        return tk.abort(404, _('Profile not found'))
+
+    return tk.render('admin/showcase_profile.html',
+                     extra_vars={'profile': profile,
+                                 'sort': sort,
+                                 'sort_keys': PROFILE_SORT_KEYS})
+
+
 def remove_showcase_admin():
     '''
     Remove a user from the Showcase Admin list.
@@ -636,6 +801,84 @@ def markdown_to_html():
     log.info('All notes were migrated successfully.')
 
 
+def _get_or_create(context, show_action, create_action, data_dict):
+    try:
+        return tk.get_action(show_action)(
+            dict(context), {'id': data_dict['name']})
+    except tk.ObjectNotFound:
+        return tk.get_action(create_action)(dict(context), data_dict)
+
+
+def seed_load_test_data(num_showcases, num_datasets, num_associations,
+                        prefix='loadtest'):
+    ''' Creates an organization, datasets and showcases to load test.
+
+    Names are derived from `prefix` and the position of each object, and
+    existing objects are reused, so running it again with the same arguments
+    gives the same site. Dataset ``i + j`` (modulo `num_datasets`) is added
+    to showcase ``i``, for ``j`` up to `num_associations`.
+    '''
+    site_user = tk.get_action('get_site_user')({
+        'model': model,
+        'ignore_auth': True},
+        {}
+    )
+    context = {
+        'model': model,
+        'session': model.Session,
+        'ignore_auth': True,
+        'user': site_user['name'],
+    }
+
+    org = _get_or_create(context, 'organization_show', 'organization_create', {
+        'name': '{0}-org'.format(prefix),
+        'title': 'Load test organization',
+    })
+
+    datasets = []
+    for i in range(num_datasets):
+        datasets.append(_get_or_create(
+            context, 'package_show', 'package_create', {
+                'name': '{0}-dataset-{1}'.format(prefix, i),
+                'title': 'Load test dataset {0}'.format(i),
+                'owner_org': org['id'],
+                'notes': 'Dataset {0} seeded for load testing.'.format(i),
+            }))
+
+    showcases = []
+    for i in range(num_showcases):
+        showcases.append(_get_or_create(
+            context, 'package_show', 'ckanext_showcase_create', {
+                'name': '{0}-showcase-{1}'.format(prefix, i),
+                'title': 'Load test showcase {0}'.format(i),
+                'notes': 'Showcase {0} seeded for load testing.'.format(i),
+            }))
+
+    association_context = dict(context, defer_commit=True)
+    for i, showcase in enumerate(showcases):
+        linked = set(row[0] for row in
+                     ShowcasePackageAssociation.get_package_ids_for_showcase(
+                         showcase['id']))
+        for j in range(min(num_associations, num_datasets)):
+            dataset = datasets[(i + j) % num_datasets]
+            if dataset['id'] in linked:
+                continue
+            tk.get_action('ckanext_showcase_package_association_create')(
+                dict(association_context),
+                {'showcase_id': showcase['id'], 'package_id': dataset['id']})
+    model.repo.commit()
+
+    cache.invalidate('autocomplete')
+    from ckan.lib import search
+    search.rebuild(package_ids=[p['id'] for p in showcases + datasets],
+                   defer_commit=True)
+    search.commit()
+
+    log.info('Seeded %d showcases and %d datasets with prefix "%s".',
+             len(showcases), len(datasets), prefix)
+    return {'organization': org, 'showcases': showcases, 'datasets': datasets}
+
+
 def upload():
     if not tk.request.method == 'POST':
         tk.abort(409, _('Only Posting is availiable'))
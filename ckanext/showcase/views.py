@@ -8,8 +8,14 @@ import ckan.plugins.toolkit as tk
 import ckan.views.dataset as dataset
 
 import ckanext.showcase.utils as utils
+from ckanext.showcase import instrumentation, profiling
 
 showcase = Blueprint('showcase_blueprint', __name__)
+# Registered first so the profile covers the other request hooks
+showcase.before_request(profiling.before_request)
+showcase.after_request(profiling.after_request)
+showcase.before_request(instrumentation.before_request)
+showcase.after_request(instrumentation.after_request)
 
 
 def index():
@@ -106,10 +112,26 @@ def dataset_showcase_list(id):
     return utils.dataset_showcase_list(id)
 
 
+def autocomplete():
+    return utils.showcase_autocomplete()
+
+
+def metrics():
+    return utils.metrics_view()
+
+
 def admins():
     return utils.manage_showcase_admins()
 
 
+def profiles():
+    return utils.showcase_profiles_view()
+
+
+def profile(profile_id):
+    return utils.showcase_profile_view(profile_id)
+
+
 def admin_remove():
     return utils.remove_showcase_admin()
 
@@ -119,6 +141,12 @@ def upload():
 
 
 showcase.add_url_rule('/showcase', view_func=index, endpoint="index")
+showcase.add_url_rule('/showcase/autocomplete',
+                      view_func=autocomplete,
+                      endpoint="autocomplete")
+showcase.add_url_rule('/showcase/metrics',
+                      view_func=metrics,
+                      endpoint="metrics")
 showcase.add_url_rule('/showcase/new', view_func=CreateView.as_view('new'), endpoint="new")
 showcase.add_url_rule('/showcase/delete/<id>',
                       view_func=delete,
@@ -145,6 +173,12 @@ showcase.add_url_rule('/ckan-admin/showcase_admin_remove',
                       view_func=admin_remove,
                       methods=['GET', 'POST'],
                       endpoint='admin_remove')
+showcase.add_url_rule('/ckan-admin/showcase_profiles',
+                      view_func=profiles,
+                      endpoint='profiles')
+showcase.add_url_rule('/ckan-admin/showcase_profiles/<profile_id>',
+                      view_func=profile,
+                      endpoint='profile')
 showcase.add_url_rule('/showcase_upload',
                       view_func=upload,
                       methods=['POST'])
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+'''
+Locust scenarios for the showcase pages and actions.
+
+Seed the site first, eg:
+
+    ckan -c /etc/ckan/default/ckan.ini showcase seed --showcases 100 \
+        --datasets 500 --associations 10
+
+and then run, against a local CKAN with its own Solr and PostgreSQL:
+
+    locust -f loadtest/locustfile.py --host http://127.0.0.1:5000 \
+        --headless --users 20 --spawn-rate 5 --run-time 5m \
+        --csv loadtest/results/showcase
+
+Set SHOWCASE_LOADTEST_API_TOKEN to the API token of a sysadmin (or showcase
+admin) to include the manage datasets page. SHOWCASE_LOADTEST_PREFIX must
+match the --prefix given to the seed command.
+'''
+
+import os
+import random
+
+import requests
+from gevent.lock import Semaphore
+from locust import HttpUser, between, stats, task
+
+# p50/p95/p99 (and max) in the console summary and the CSV files
+stats.PERCENTILES_TO_REPORT = [0.50, 0.95, 0.99, 1.0]
+
+PREFIX = os.environ.get('SHOWCASE_LOADTEST_PREFIX', 'loadtest')
+API_TOKEN = os.environ.get('SHOWCASE_LOADTEST_API_TOKEN')
+
+_site = {}
+_site_lock = Semaphore()
+
+
+def _action(client, action, data, name=None):
+    response = client.post('/api/3/action/{0}'.format(action), json=data,
+                           name=name or '/api/3/action/{0}'.format(action))
+    response.raise_for_status()
+    return response.json()['result']
+
+
+def _setup_action(session, host, action, data):
+    response = session.post('{0}/api/3/action/{1}'.format(host, action),
+                            json=data)
+    response.raise_for_status()
+    return response.json()['result']
+
+
+def discover_site(host):
+    '''
+    Look up the names of the seeded showcases and datasets, once per
+    process, so it also happens on each worker when running distributed.
+
+    A plain requests session is used, so these calls are not part of the
+    reported stats.
+    '''
+    with _site_lock:
+        if _site:
+            return
+        session = requests.Session()
+        search = _setup_action(session, host, 'package_search', {
+            'q': 'name:{0}-dataset-*'.format(PREFIX),
+            'fl': 'name',
+            'rows': 1000,
+        })
+        datasets = [p['name'] for p in search['results']]
+        showcases = [
+            s['name'] for s in _setup_action(
+                session, host, 'ckanext_showcase_list', {})
+            if s['name'].startswith(PREFIX + '-showcase-')]
+
+        if not (datasets and showcases):
+            raise RuntimeError(
+                'No seeded showcases or datasets found for prefix "{0}", run '
+                '"ckan showcase seed" first'.format(PREFIX))
+        _site['datasets'] = datasets
+        _site['showcases'] = showcases
+
+
+class ShowcaseVisitor(HttpUser):
+    '''An anonymous user browsing showcases and calling the API.'''
+
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        discover_site(self.host)
+
+    def _showcase(self):
+        return random.choice(_site['showcases'])
+
+    def _dataset(self):
+        return random.choice(_site['datasets'])
+
+    @task(5)
+    def index(self):
+        self.client.get('/showcase', name='/showcase')
+
+    @task(2)
+    def search(self):
+        self.client.get('/showcase?q=showcase&sort=title_string+asc',
+                        name='/showcase?q=')
+
+    @task(5)
+    def read(self):
+        self.client.get('/showcase/{0}'.format(self._showcase()),
+                        name='/showcase/<id>')
+
+    @task(3)
+    def dataset_showcase_list(self):
+        self.client.get('/dataset/showcases/{0}'.format(self._dataset()),
+                        name='/dataset/showcases/<id>')
+
+    @task(2)
+    def api_showcase_show(self):
+        _action(self.client, 'ckanext_showcase_show',
+                {'id': self._showcase()})
+
+    @task(2)
+    def api_showcase_package_list(self):
+        _action(self.client, 'ckanext_showcase_package_list',
+                {'showcase_id': self._showcase()})
+
+    @task(2)
+    def api_package_showcase_list(self):
+        _action(self.client, 'ckanext_package_showcase_list',
+                {'package_id': self._dataset()})
+
+    @task(1)
+    def api_showcase_list(self):
+        _action(self.client, 'ckanext_showcase_list', {})
+
+
+class ShowcaseAdmin(HttpUser):
+    '''A showcase admin managing the datasets of showcases.'''
+
+    wait_time = between(2, 5)
+    # Only run when there are credentials to use
+    abstract = not API_TOKEN
+
+    def on_start(self):
+        discover_site(self.host)
+        self.client.headers['Authorization'] = API_TOKEN
+
+    @task(3)
+    def manage_datasets(self):
+        self.client.get(
+            '/showcase/manage_datasets/{0}'.format(
+                random.choice(_site['showcases'])),
+            name='/showcase/manage_datasets/<id>')
+
+    @task(1)
+    def add_and_remove_dataset(self):
+        data = {'showcase_id': random.choice(_site['showcases']),
+                'package_id': random.choice(_site['datasets'])}
+        with self.client.post(
+                '/api/3/action/ckanext_showcase_package_association_create',
+                json=data, catch_response=True,
+                name='/api/3/action/'
+                     'ckanext_showcase_package_association_create'
+                ) as response:
+            # Datasets already in the showcase give a validation error
+            if response.status_code == 409:
+                response.success()
+                return
+            if not response.ok:
+                return
+        _action(self.client, 'ckanext_showcase_package_association_delete',
+                data)